@@ -0,0 +1,38 @@
+#-*- coding: utf-8 -*-
+"""
+BM25 index of 30k MCP servers: build time and the latency of a top 10 query.
+
+    uv run python benchmarks/bm25_search.py
+"""
+import random
+import time
+
+from nacos_mcp_router.bm25 import Bm25Index
+from nacos_mcp_router.router_types import McpServer
+
+SERVERS = 30000
+VOCABULARY = [f"term{i}" for i in range(5000)] + ["地图", "天气", "文件", "数据库", "搜索", "翻译"]
+QUERIES = ["term42 地图", "term7 term8 term9", "数据库 搜索 term100", "term4999"]
+ROUNDS = 10
+
+
+def main() -> None:
+    rng = random.Random(11)
+    index = Bm25Index()
+    start = time.perf_counter()
+    for i in range(SERVERS):
+        name = f"server-{i}"
+        index.add(name, McpServer(name=name, description=" ".join(rng.choices(VOCABULARY, k=25)),
+                                  agentConfig={}, id=name, version="1.0.0"))
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for query in QUERIES:
+            index.search(query, 10)
+    per_query = (time.perf_counter() - start) / (ROUNDS * len(QUERIES))
+    print(f"bm25 index of {SERVERS} servers built in {build:.1f} s, top 10 query: {per_query * 1000:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
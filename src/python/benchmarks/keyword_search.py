@@ -0,0 +1,58 @@
+#-*- coding: utf-8 -*-
+"""
+Keyword search over 10k MCP servers: the n-gram keyword index against scanning every description.
+
+    uv run python benchmarks/keyword_search.py
+"""
+import random
+import time
+
+from nacos_mcp_router.keyword_index import KeywordIndex, normalize_text
+from nacos_mcp_router.nacos_mcp_server_config import NacosMcpServerConfig
+from nacos_mcp_router.router_types import McpServer
+
+SERVERS = 10000
+WORDS = ["地图", "天气", "文件", "数据库", "搜索", "翻译", "weather", "file", "database", "search",
+         "browser", "github", "slack", "email", "calendar", "image", "video", "payment", "stock", "news"]
+KEYWORDS = ["地图", "数据库", "weather", "server42", "github search", "不存在的关键词"]
+
+
+def server(name: str, description: str, tools: list[str]) -> McpServer:
+    mcp_server = McpServer(name=name, description=description, agentConfig={}, id=name, version="1.0.0")
+    mcp_server.mcp_config_detail = NacosMcpServerConfig.from_dict({
+        "name": name, "protocol": "stdio", "description": description, "version": "1.0.0", "id": name,
+        "remoteServerConfig": {},
+        "toolSpec": {"tools": [{"name": f"tool-{i}", "description": d, "inputSchema": {}}
+                               for i, d in enumerate(tools)]},
+    })
+    return mcp_server
+
+
+def main() -> None:
+    rng = random.Random(7)
+    servers = {}
+    for i in range(SERVERS):
+        description = " ".join(rng.choices(WORDS, k=20)) + f" server{i}"
+        servers[f"server-{i}"] = server(f"server-{i}", description, [" ".join(rng.choices(WORDS, k=8)) for _ in range(5)])
+
+    start = time.perf_counter()
+    index = KeywordIndex()
+    index.update(servers)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for keyword in KEYWORDS:
+        index.search(keyword)
+    indexed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for keyword in KEYWORDS:
+        [s for s in servers.values() if normalize_text(keyword) in normalize_text(s.description)]
+    scanned = time.perf_counter() - start
+
+    print(f"keyword index of {SERVERS} servers built in {build * 1000:.0f} ms, {len(KEYWORDS)} queries: "
+          f"{indexed * 1000:.1f} ms indexed, {scanned * 1000:.1f} ms scanning")
+
+
+if __name__ == '__main__':
+    main()
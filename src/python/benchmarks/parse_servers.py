@@ -0,0 +1,69 @@
+#-*- coding: utf-8 -*-
+"""
+Time and memory to parse 1k MCP server details: json with every tool materialized, against
+json_util (orjson when installed) with the tools built on first access.
+
+    uv run python benchmarks/parse_servers.py
+"""
+import json
+import time
+import tracemalloc
+
+from nacos_mcp_router import json_util
+from nacos_mcp_router.nacos_mcp_server_config import NacosMcpServerConfig
+
+SERVERS = 1000
+TOOLS = 10
+
+
+def server_detail(index: int) -> dict:
+    return {
+        "id": f"id-{index}",
+        "name": f"server-{index}",
+        "protocol": "mcp-sse",
+        "frontProtocol": "mcp-sse",
+        "description": f"server {index} description",
+        "version": "1.0.0",
+        "enabled": True,
+        "remoteServerConfig": {"serviceRef": {"namespaceId": "public", "groupName": "DEFAULT_GROUP",
+                                              "serviceName": f"server-{index}"}, "exportPath": "/sse"},
+        "localServerConfig": {},
+        "capabilities": ["TOOL"],
+        "backendEndpoints": [{"address": "127.0.0.1", "port": 8080}],
+        "toolSpec": {
+            "tools": [{"name": f"tool-{t}", "description": f"tool {t} of server {index}",
+                       "inputSchema": {"type": "object", "properties": {"path": {"type": "string",
+                                                                                "description": "file path"}}}}
+                      for t in range(TOOLS)],
+            "toolsMeta": {f"tool-{t}": {"enabled": t % 2 == 0, "invokeContext": {}, "templates": {}}
+                          for t in range(TOOLS)},
+        },
+    }
+
+
+def parse(payloads: list[bytes], decode, materialize: bool) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    configs = [NacosMcpServerConfig.from_dict(decode(p)["data"]) for p in payloads]
+    for config in configs:
+        config.get_tool_description()
+        if materialize:
+            _ = config.tool_spec.tools_dict, config.tool_spec.tools_meta, config.backend_endpoints
+    duration = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return duration, memory
+
+
+def main() -> None:
+    payloads = [json.dumps({"code": 0, "data": server_detail(i)}).encode("utf-8") for i in range(SERVERS)]
+    eager_duration, eager_memory = parse(payloads, lambda p: json.loads(p.decode("utf-8")), materialize=True)
+    lazy_duration, lazy_memory = parse(payloads, json_util.loads, materialize=False)
+    print(f"parse {SERVERS} servers, json + materialized tools: {eager_duration * 1000:.1f} ms, "
+          f"{eager_memory / 1024 / 1024:.2f} MiB")
+    print(f"parse {SERVERS} servers, {'orjson' if json_util.orjson else 'json'} + lazy tools: "
+          f"{lazy_duration * 1000:.1f} ms, {lazy_memory / 1024 / 1024:.2f} MiB")
+
+
+if __name__ == '__main__':
+    main()
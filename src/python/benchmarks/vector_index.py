@@ -0,0 +1,80 @@
+#-*- coding: utf-8 -*-
+"""
+Vector search over 10k MCP server embeddings: the numpy index (float32 and int8) against Chroma.
+Build time, latency of a top 10 query and the resident memory added by each index.
+
+    uv run python benchmarks/vector_index.py
+"""
+import os
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from nacos_mcp_router.numpy_vector_index import DTYPE_FLOAT32, DTYPE_INT8, NumpyVectorIndex
+
+SIZE = 10000
+DIM = 384
+QUERIES = 50
+BATCH = 100
+
+
+def rss_mib() -> float:
+    """Resident set size of this process, from /proc on Linux."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return float("nan")
+
+
+class TableEmbedder:
+    """Looks the precomputed embeddings of the documents up, the benchmark doesn't run a model."""
+    def __init__(self, vectors: dict[str, list[float]]) -> None:
+        self.vectors = vectors
+
+    def __call__(self, documents: list[str]) -> list[list[float]]:
+        return [self.vectors[d] for d in documents]
+
+
+def main() -> None:
+    rng = np.random.default_rng(7)
+    embeddings = rng.standard_normal((SIZE, DIM)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = [f"server-{i}" for i in range(SIZE)]
+    embedder = TableEmbedder(dict(zip(ids, embeddings.tolist())))
+    queries = embeddings[rng.choice(SIZE, QUERIES)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, dtype in (("numpy float32", DTYPE_FLOAT32), ("numpy int8", DTYPE_INT8)):
+            rss = rss_mib()
+            start = time.perf_counter()
+            index = NumpyVectorIndex(os.path.join(directory, dtype), dtype=dtype, embedding_function=embedder)
+            for offset in range(0, SIZE, BATCH):
+                index.update_data(ids=ids[offset:offset + BATCH], documents=ids[offset:offset + BATCH])
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            for query in queries:
+                index.search(query[None, :], 10)
+            latency = (time.perf_counter() - start) / len(queries)
+            print(f"{name}: build {build:.2f} s, query {latency * 1000:.2f} ms, rss +{rss_mib() - rss:.1f} MiB")
+
+        rss = rss_mib()
+        start = time.perf_counter()
+        client = chromadb.PersistentClient(path=os.path.join(directory, "chroma"),
+                                           settings=Settings(anonymized_telemetry=False))
+        collection = client.get_or_create_collection(name="benchmark")
+        for offset in range(0, SIZE, BATCH):
+            collection.upsert(ids=ids[offset:offset + BATCH], embeddings=embeddings[offset:offset + BATCH])
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        for query in queries:
+            collection.query(query_embeddings=[query], n_results=10)
+        latency = (time.perf_counter() - start) / len(queries)
+        print(f"chroma: build {build:.2f} s, query {latency * 1000:.2f} ms, rss +{rss_mib() - rss:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
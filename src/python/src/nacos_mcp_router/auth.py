@@ -1,3 +1,9 @@
+import asyncio
+import time
+import weakref
+from typing import Awaitable, Callable
+
+
 class Credentials(object):
     def __init__(self, access_key_id, access_key_secret, security_token=None):
         self.access_key_id = access_key_id
@@ -23,4 +29,69 @@ class StaticCredentialsProvider(CredentialsProvider):
         self.credentials = Credentials(access_key_id, access_key_secret, security_token)
 
     def get_credentials(self) -> Credentials:
-        return self.credentials
\ No newline at end of file
+        return self.credentials
+
+class AccessTokenManager(object):
+    """
+    Cache the access token issued by the Nacos login API.
+
+    The token is refreshed shortly before it expires (`refresh_ahead_ratio` of its ttl, at most
+    `max_refresh_ahead` seconds), concurrent callers on the same event loop share a single login.
+    When the login fails, it's not retried for `retry_interval` seconds, callers then get None and
+    fall back to the username/password headers.
+    """
+    def __init__(self,
+                 login: Callable[[], Awaitable[tuple[str, float] | None]],
+                 refresh_ahead_ratio: float = 0.1,
+                 max_refresh_ahead: float = 300,
+                 retry_interval: float = 30):
+        self._login = login
+        self.refresh_ahead_ratio = refresh_ahead_ratio
+        self.max_refresh_ahead = max_refresh_ahead
+        self.retry_interval = retry_interval
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._next_login_at = 0.0
+        self._logins: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task] = weakref.WeakKeyDictionary()
+        self.login_count = 0
+
+    def _valid_token(self, now: float) -> str | None:
+        return self._token if self._token is not None and now < self._expires_at else None
+
+    async def get_token(self) -> str | None:
+        now = time.monotonic()
+        if self._token is not None and now < self._refresh_at:
+            return self._token
+        if now < self._next_login_at:
+            return self._valid_token(now)
+
+        loop = asyncio.get_running_loop()
+        task = self._logins.get(loop)
+        if task is None or task.done():
+            task = loop.create_task(self._do_login())
+            self._logins[loop] = task
+        return await asyncio.shield(task)
+
+    async def _do_login(self) -> str | None:
+        self.login_count += 1
+        result = await self._login()
+        now = time.monotonic()
+        if result is None:
+            self._next_login_at = now + self.retry_interval
+            return self._valid_token(now)
+
+        token, ttl = result
+        self._token = token
+        self._expires_at = now + ttl
+        self._refresh_at = self._expires_at - min(ttl * self.refresh_ahead_ratio, self.max_refresh_ahead)
+        self._next_login_at = 0.0
+        return token
+
+    def invalidate(self, token: str) -> None:
+        """Drop the token rejected by Nacos, the next get_token logs in again."""
+        if self._token == token:
+            self._token = None
+            self._expires_at = 0.0
+            self._refresh_at = 0.0
+            self._next_login_at = 0.0
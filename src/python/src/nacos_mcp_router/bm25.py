@@ -0,0 +1,147 @@
+#-*- coding: utf-8 -*-
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Iterable, Mapping
+
+from .router_types import McpServer
+
+# latin words and digits, or runs of CJK characters
+_TOKEN = re.compile(r'[a-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+_ASCII_WORD = re.compile(r'[a-z0-9]+')
+
+# weights of the fields of a server, a term in the name counts like three in the tool descriptions
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 2.0
+TOOLS_WEIGHT = 1.0
+
+
+def tokenize(text: str | None) -> list[str]:
+    """
+    Split mixed Chinese/English text into terms: latin words and numbers are kept whole, runs of CJK
+    characters (which have no word boundaries) are split into overlapping bigrams.
+    """
+    if not text:
+        return []
+    tokens = []
+    for run in _TOKEN.findall(unicodedata.normalize('NFKC', text).lower()):
+        if _ASCII_WORD.fullmatch(run) or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class Bm25Index:
+    """
+    BM25 ranking of MCP servers over their name, description and tool descriptions.
+
+    The fields are merged into one weighted bag of terms per server (a simplified BM25F). Servers are
+    added and removed incrementally, the statistics (document frequencies, average length) are always
+    current. Queries are scored term at a time with MaxScore pruning: once the terms left can't lift a
+    new server into the top k, they only add to the scores of the servers already found.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._servers: dict[str, McpServer] = {}
+        self._terms: dict[str, dict[str, float]] = {}
+        self._postings: dict[str, dict[str, float]] = {}
+        self._lengths: dict[str, float] = {}
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def update(self, servers: Mapping[str, McpServer]) -> None:
+        """Index the servers that are new or replaced, and drop the servers not in `servers` anymore."""
+        for name in [name for name in self._servers if name not in servers]:
+            self.remove(name)
+        for name, server in servers.items():
+            if self._servers.get(name) is not server:
+                self.add(name, server)
+
+    def add(self, name: str, server: McpServer) -> None:
+        self.remove(name)
+        detail = getattr(server, 'mcp_config_detail', None)
+        tool_descriptions = detail.tool_spec.tool_descriptions() if detail is not None else []
+
+        terms: defaultdict[str, float] = defaultdict(float)
+        for weight, text in ((NAME_WEIGHT, name),
+                             (DESCRIPTION_WEIGHT, server.description),
+                             *((TOOLS_WEIGHT, d) for d in tool_descriptions)):
+            for token in tokenize(text):
+                terms[token] += weight
+
+        self._servers[name] = server
+        self._terms[name] = terms
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[name] = frequency
+        length = sum(terms.values())
+        self._lengths[name] = length
+        self._total_length += length
+
+    def remove(self, name: str) -> None:
+        if self._servers.pop(name, None) is None:
+            return
+        for term in self._terms.pop(name):
+            postings = self._postings[term]
+            del postings[name]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(name)
+
+    def _idf(self, term: str) -> float:
+        frequency = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._servers) - frequency + 0.5) / (frequency + 0.5))
+
+    def _query_terms(self, query: str) -> list[tuple[str, float]]:
+        """Distinct query terms known to the index, with their idf weighted by their count in the query."""
+        counts = Counter(token for token in tokenize(query) if token in self._postings)
+        return [(term, self._idf(term) * count) for term, count in counts.items()]
+
+    def search(self, query: str, k: int = 10) -> list[tuple[McpServer, float]]:
+        """The k best servers for the query with their scores, best first."""
+        if k <= 0 or not self._servers:
+            return []
+        terms = self._query_terms(query)
+        # a term adds at most idf * (k1 + 1), process the terms that can add the most first
+        terms.sort(key=lambda t: t[1], reverse=True)
+        remaining_bound = sum(weight for _, weight in terms) * (self.k1 + 1)
+
+        average_length = self._total_length / len(self._servers)
+        k1, b = self.k1, self.b
+        lengths = self._lengths
+        scores: dict[str, float] = {}
+        for term, weight in terms:
+            essential = len(scores) < k or remaining_bound > heapq.nlargest(k, scores.values())[-1]
+            remaining_bound -= weight * (k1 + 1)
+            for name, frequency in self._postings[term].items():
+                if not essential and name not in scores:
+                    continue
+                norm = k1 * (1 - b + b * lengths[name] / average_length)
+                scores[name] = scores.get(name, 0.0) + weight * frequency * (k1 + 1) / (frequency + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self._servers[name], score) for name, score in best]
+
+    def score(self, query: str, names: Iterable[str]) -> dict[str, float]:
+        """Scores of the given servers for the query, zero for the servers not matching any term."""
+        terms = self._query_terms(query)
+        average_length = self._total_length / len(self._servers) if self._servers else 1.0
+        scores = {}
+        for name in names:
+            length = self._lengths.get(name)
+            if length is None:
+                scores[name] = 0.0
+                continue
+            norm = self.k1 * (1 - self.b + self.b * length / average_length)
+            score = 0.0
+            for term, weight in terms:
+                frequency = self._postings[term].get(name)
+                if frequency:
+                    score += weight * frequency * (self.k1 + 1) / (frequency + norm)
+            scores[name] = score
+        return scores
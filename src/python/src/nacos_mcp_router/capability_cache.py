@@ -0,0 +1,72 @@
+#-*- coding: utf-8 -*-
+import os
+import time
+from typing import Any, Callable, Hashable, Optional
+
+import mcp.types
+
+from .query_cache import LruCache
+
+# seconds the initialize result and tool list of a downstream MCP server are served from memory,
+# 0 keeps them until the server sends tools/list_changed or its registry version changes
+_CAPABILITY_CACHE_TTL = float(os.getenv("CAPABILITY_CACHE_TTL", 300))
+# header partitions cached per downstream MCP server, 0 disables the cache
+_CAPABILITY_CACHE_SIZE = int(os.getenv("CAPABILITY_CACHE_SIZE", 64))
+
+_INITIALIZE = "initialize"
+_TOOLS = "tools"
+
+
+def is_tools_changed(message: Any) -> bool:
+    """Whether a message received by a client session is a notifications/tools/list_changed."""
+    return isinstance(message, mcp.types.ServerNotification) and \
+        isinstance(message.root, mcp.types.ToolListChangedNotification)
+
+
+class CapabilityCache:
+    """
+    The initialize result and tool list of one downstream MCP server, per partition of forwarded
+    client headers. Entries expire after `ttl`; all of them are dropped when the server notifies that
+    its tools changed, or when the version of the server in the registry is no longer the one they
+    were fetched for.
+
+    `generation` is read before fetching from the server and passed back with the result: a result
+    fetched while the entries were dropped may already be stale, it is not cached. Tool lists are
+    copied on the way in and out, callers may rewrite the tools they get.
+    """
+    def __init__(self, ttl: float = _CAPABILITY_CACHE_TTL, max_size: int = _CAPABILITY_CACHE_SIZE,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self._entries: LruCache = LruCache(max_size, ttl, clock)
+        self.registry_version: Optional[str] = None
+        self.generation = 0
+
+    def check_registry_version(self, version: Optional[str]) -> None:
+        """Drop the entries fetched for another registry version of the server."""
+        if version != self.registry_version:
+            if self.registry_version is not None:
+                self.invalidate()
+            self.registry_version = version
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+    def get_initialize_result(self, partition: Hashable) -> Optional[mcp.types.InitializeResult]:
+        return self._entries.get((_INITIALIZE, partition))
+
+    def put_initialize_result(self, partition: Hashable, result: mcp.types.InitializeResult,
+                              generation: int) -> None:
+        if generation == self.generation:
+            self._entries.put((_INITIALIZE, partition), result)
+
+    def get_tools(self, partition: Hashable) -> Optional[list[mcp.types.Tool]]:
+        tools = self._entries.get((_TOOLS, partition))
+        return [tool.model_copy() for tool in tools] if tools is not None else None
+
+    def put_tools(self, partition: Hashable, tools: list[mcp.types.Tool], generation: int) -> None:
+        if generation == self.generation:
+            self._entries.put((_TOOLS, partition), [tool.model_copy() for tool in tools])
+
+    def stats(self) -> dict:
+        return {**self._entries.stats(), "generation": self.generation,
+                "registry_version": self.registry_version}
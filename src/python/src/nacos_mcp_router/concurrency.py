@@ -0,0 +1,185 @@
+#-*- coding: utf-8 -*-
+import asyncio
+import collections
+import contextlib
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+
+@dataclass
+class FetchStats:
+    """Statistics of the requests passed through a limiter during one refresh."""
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    peak_in_flight: int = 0
+    min_limit: int = 0
+    max_limit: int = 0
+    final_limit: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def avg_latency(self) -> float:
+        return self.total_latency / self.total if self.total else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def summary(self) -> str:
+        return (f"total: {self.total}, succeeded: {self.succeeded}, failed: {self.failed}, "
+                f"avg latency: {self.avg_latency * 1000:.1f}ms, max latency: {self.max_latency * 1000:.1f}ms, "
+                f"peak in flight: {self.peak_in_flight}, limit: {self.final_limit} "
+                f"(min {self.min_limit}, max {self.max_limit}), elapsed: {self.elapsed:.2f}s")
+
+
+class Permit:
+    """A slot acquired from the limiter, mark it failed to signal an unhealthy response."""
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.failed = False
+
+    def fail(self) -> None:
+        self.failed = True
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limit the number of in-flight requests with an AIMD (additive increase, multiplicative decrease) policy.
+
+    The limit grows by one after a full window of healthy responses, and is multiplied by `backoff_ratio`
+    when a request fails or the recent latency grows beyond `latency_tolerance` times the long term
+    baseline (and by more than `min_latency_delta` seconds, so jitter of fast responses is ignored).
+    At most one decrease is applied per window, requests started before the last decrease don't
+    shrink the limit again.
+
+    Waiters are plain futures of the running loop, so the limiter itself can outlive event loops.
+    """
+    def __init__(self,
+                 max_limit: int,
+                 min_limit: int = 1,
+                 initial_limit: int | None = None,
+                 latency_tolerance: float = 2.0,
+                 min_latency_delta: float = 0.05,
+                 backoff_ratio: float = 0.5) -> None:
+        if max_limit < 1 or min_limit < 1 or min_limit > max_limit:
+            raise ValueError(f"invalid concurrency limits, min: {min_limit}, max: {max_limit}")
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_tolerance = latency_tolerance
+        self.min_latency_delta = min_latency_delta
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(initial_limit if initial_limit is not None else max(min_limit, max_limit // 2))
+        self._limit = min(max(self._limit, min_limit), max_limit)
+        self._in_flight = 0
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+        self._baseline_latency: float | None = None
+        self._recent_latency: float | None = None
+        self._last_decrease_at = 0.0
+        self._stats = self._new_stats()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def stats(self) -> FetchStats:
+        return self._stats
+
+    def reset_stats(self) -> FetchStats:
+        """Start a new statistics window and return the previous one."""
+        stats, self._stats = self._stats, self._new_stats()
+        return stats
+
+    def _new_stats(self) -> FetchStats:
+        return FetchStats(min_limit=self.limit, max_limit=self.limit, final_limit=self.limit)
+
+    async def acquire(self) -> Permit:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # the slot was handed over right before cancellation, give it back
+                    self._in_flight -= 1
+                    self._wake_up()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        self._stats.peak_in_flight = max(self._stats.peak_in_flight, self._in_flight)
+        return Permit()
+
+    def release(self, permit: Permit, adapt: bool = True) -> None:
+        self._in_flight -= 1
+        if adapt:
+            self._on_response(permit, time.monotonic() - permit.started_at)
+        self._wake_up()
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[Permit]:
+        permit = await self.acquire()
+        adapt = True
+        try:
+            yield permit
+        except Exception:
+            permit.fail()
+            raise
+        except BaseException:
+            # cancellation says nothing about the health of the server
+            adapt = False
+            raise
+        finally:
+            self.release(permit, adapt)
+
+    def _on_response(self, permit: Permit, latency: float) -> None:
+        stats = self._stats
+        stats.total += 1
+        stats.total_latency += latency
+        stats.max_latency = max(stats.max_latency, latency)
+
+        if permit.failed:
+            stats.failed += 1
+            self._decrease(permit)
+        else:
+            stats.succeeded += 1
+            self._recent_latency = latency if self._recent_latency is None \
+                else 0.7 * self._recent_latency + 0.3 * latency
+            if self._baseline_latency is None:
+                self._baseline_latency = latency
+            if self._recent_latency > self._baseline_latency * self.latency_tolerance \
+                    and self._recent_latency - self._baseline_latency > self.min_latency_delta:
+                self._decrease(permit)
+            else:
+                self._baseline_latency = 0.95 * self._baseline_latency + 0.05 * latency
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+
+        stats.min_limit = min(stats.min_limit, self.limit)
+        stats.max_limit = max(stats.max_limit, self.limit)
+        stats.final_limit = self.limit
+
+    def _decrease(self, permit: Permit) -> None:
+        if permit.started_at < self._last_decrease_at:
+            return
+        self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        self._last_decrease_at = time.monotonic()
+        # forget the congested samples, otherwise the next healthy window still looks slow
+        self._recent_latency = self._baseline_latency
+
+    def _wake_up(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
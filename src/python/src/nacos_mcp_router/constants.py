@@ -4,4 +4,12 @@ TRANSPORT_TYPE_STDIO: Final[str] = 'stdio'
 TRANSPORT_TYPE_SSE: Final[str]  = 'sse'
 TRANSPORT_TYPE_STREAMABLE_HTTP: Final[str] = 'streamable_http'
 MODE_ROUTER: Final[str] = "router"
-MODE_PROXY: Final[str] = "proxy"
\ No newline at end of file
+MODE_PROXY: Final[str] = "proxy"
+REFRESH_MODE_POLL: Final[str] = "poll"
+REFRESH_MODE_SUBSCRIBE: Final[str] = "subscribe"
+VECTOR_BACKEND_CHROMA: Final[str] = "chroma"
+VECTOR_BACKEND_NUMPY: Final[str] = "numpy"
+INDEX_GRANULARITY_SERVER: Final[str] = "server"
+INDEX_GRANULARITY_TOOL: Final[str] = "tool"
+TOOL_POOLING_MAX: Final[str] = "max"
+TOOL_POOLING_SUM: Final[str] = "sum"
@@ -0,0 +1,97 @@
+#-*- coding: utf-8 -*-
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Callable, Iterable, Mapping, Sequence
+
+from .logger import NacosMcpRouteLogger
+
+Embedder = Callable[[list[str]], Sequence[Iterable[float]]]
+
+
+def default_cache_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".nacos_mcp_router", "embedding_cache.sqlite3")
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of document embeddings in SQLite, keyed by the embedding model and the md5 of the
+    document, so unchanged documents are never embedded twice, across restarts and across the router
+    instances sharing the file.
+
+    Vectors are stored as float32 blobs. The connection is shared by the vector store threads and
+    serialized with a lock, concurrent processes are handled by SQLite (WAL journal, busy timeout).
+    """
+    def __init__(self, path: str, model: str = "default") -> None:
+        self.path = path
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings ("
+                               "model TEXT NOT NULL, md5 TEXT NOT NULL, vector BLOB NOT NULL, "
+                               "PRIMARY KEY (model, md5))")
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model,)).fetchone()
+        return row[0]
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, list[float]]:
+        """The cached embeddings of the given keys, keys not in the cache are left out."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # stay below the default limit of 999 variables of older SQLite versions
+            for start in range(0, len(keys), 900):
+                chunk = keys[start:start + 900]
+                rows = self._conn.execute(
+                    f"SELECT md5, vector FROM embeddings WHERE model = ? AND md5 IN ({','.join('?' * len(chunk))})",
+                    (self.model, *chunk))
+                for key, blob in rows:
+                    found[key] = array('f', blob).tolist()
+        return found
+
+    def put_many(self, embeddings: Mapping[str, Sequence[float]]) -> None:
+        rows = [(self.model, key, array('f', vector).tobytes()) for key, vector in embeddings.items()]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (model, md5, vector) VALUES (?, ?, ?)", rows)
+
+    def embed(self, keys: Sequence[str], documents: Sequence[str], embedder: Embedder,
+              batch_size: int = 32) -> list[list[float]]:
+        """
+        Embeddings of the documents, in order. `keys[i]` is the md5 of `documents[i]`; the documents
+        missing from the cache are embedded with `embedder`, `batch_size` documents per call, and stored.
+        """
+        if len(keys) != len(documents):
+            raise ValueError("keys and documents must have the same length")
+        found = self.get_many(keys)
+        missing = {}
+        for key, document in zip(keys, documents):
+            if key not in found:
+                missing.setdefault(key, document)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        pending = list(missing.items())
+        batch_size = max(1, batch_size)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            vectors = embedder([document for _, document in batch])
+            computed: dict[str, list[float]] = {key: [float(x) for x in vector] for (key, _), vector in zip(batch, vectors)}
+            try:
+                self.put_many(computed)
+            except sqlite3.Error as e:
+                NacosMcpRouteLogger.get_logger().warning("failed to store embeddings in the cache", exc_info=e)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,191 @@
+#-*- coding: utf-8 -*-
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, TypeVar, cast
+
+from .logger import NacosMcpRouteLogger
+from .session_pool import is_connection_error
+
+HEALTH_HEALTHY = "healthy"
+HEALTH_UNHEALTHY = "unhealthy"
+# the session is gone for good (transport closed, process exited), only a new server recovers
+HEALTH_CLOSED = "closed"
+
+# seconds between two pings of a downstream MCP server without traffic
+_HEALTH_CHECK_INTERVAL = float(os.getenv("SERVER_HEALTH_CHECK_INTERVAL", 30))
+_HEALTH_PROBE_TIMEOUT = float(os.getenv("SERVER_HEALTH_PROBE_TIMEOUT", 5))
+# consecutive failed pings or calls before a server is unhealthy, connection errors count at once
+_HEALTH_FAILURE_THRESHOLD = int(os.getenv("SERVER_HEALTH_FAILURE_THRESHOLD", 2))
+_MAX_TRANSITIONS = 20
+# weight of the latest probe in the moving average of the probe latency
+_LATENCY_SMOOTHING = 0.2
+
+S = TypeVar("S")
+
+
+class ClosingReceiveStream:
+    """
+    The read stream of a client session, calling `on_close` when it ended: the server closed the
+    connection, or for stdio servers the process exited and its stdout was closed. The callback runs
+    when the session is done with the stream, after it failed the pending requests.
+    """
+    def __init__(self, stream: Any, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+        self._ended = False
+
+    async def __aenter__(self) -> "ClosingReceiveStream":
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info) -> Optional[bool]:
+        try:
+            return await self._stream.__aexit__(*exc_info)
+        finally:
+            if self._ended:
+                self._on_close()
+
+    def __aiter__(self) -> "ClosingReceiveStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._ended = True
+            raise
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+def closing_receive_stream(stream: S, on_close: Callable[[], None]) -> S:
+    """`stream` wrapped in a `ClosingReceiveStream`, typed as the stream it stands in for."""
+    # the wrapper forwards every attribute to the stream, to its users it is the stream
+    return cast(S, ClosingReceiveStream(stream, on_close))
+
+
+@dataclass
+class HealthTransition:
+    at: float
+    state: str
+    reason: str
+
+
+class HealthMonitor:
+    """
+    Health state of one downstream MCP server, read in O(1) by `healthy`.
+
+    Passive signals come from the traffic: a successful call proves the server healthy, a connection
+    error makes it unhealthy at once, other failures after `failure_threshold` in a row, and a closed
+    transport (or exited process) closes it for good. A background task pings the server every
+    `interval` seconds, unless a call succeeded in the meantime; the ping latency is averaged.
+    Without `probe` there is no background task, the owner reports its own pings with `record_probe`.
+    """
+    def __init__(self, name: str, probe: Optional[Callable[[], Awaitable[Any]]] = None,
+                 interval: float = _HEALTH_CHECK_INTERVAL, timeout: float = _HEALTH_PROBE_TIMEOUT,
+                 failure_threshold: int = _HEALTH_FAILURE_THRESHOLD,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self._probe = probe
+        self._clock = clock
+        self.state = HEALTH_HEALTHY
+        self.consecutive_failures = 0
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.probes = 0
+        self.probe_failures = 0
+        self.probe_latency: Optional[float] = None
+        self.probe_latency_avg: Optional[float] = None
+        self.transitions: deque[HealthTransition] = deque(maxlen=_MAX_TRANSITIONS)
+        self.transition_count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.state == HEALTH_HEALTHY
+
+    def _transition(self, state: str, reason: str) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        self.transition_count += 1
+        self.transitions.append(HealthTransition(time.time(), state, reason))
+        NacosMcpRouteLogger.get_logger().info(f"mcp server {self.name} is {state}: {reason}")
+
+    def record_success(self) -> None:
+        self.last_success = self._clock()
+        self.consecutive_failures = 0
+        if self.state == HEALTH_UNHEALTHY:
+            self._transition(HEALTH_HEALTHY, "request succeeded")
+
+    def record_failure(self, error: BaseException) -> None:
+        if self.state == HEALTH_CLOSED:
+            return
+        self.consecutive_failures += 1
+        self.last_error = repr(error)
+        if is_connection_error(error) or self.consecutive_failures >= self.failure_threshold:
+            self._transition(HEALTH_UNHEALTHY, self.last_error)
+
+    def mark_closed(self, reason: str) -> None:
+        self._transition(HEALTH_CLOSED, reason)
+        self.stop()
+
+    def record_probe(self, latency: float) -> None:
+        self.probes += 1
+        self.probe_latency = latency
+        self.probe_latency_avg = latency if self.probe_latency_avg is None else \
+            _LATENCY_SMOOTHING * latency + (1 - _LATENCY_SMOOTHING) * self.probe_latency_avg
+        self.record_success()
+
+    def record_probe_failure(self, error: BaseException) -> None:
+        self.probes += 1
+        self.probe_failures += 1
+        self.record_failure(error)
+
+    async def probe_once(self) -> None:
+        if self._probe is None or self.state == HEALTH_CLOSED:
+            return
+        if self.last_success is not None and self._clock() - self.last_success < self.interval:
+            return
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self._probe()
+        except Exception as e:
+            self.record_probe_failure(e)
+            return
+        self.record_probe(time.perf_counter() - start)
+
+    def start(self) -> None:
+        if self._probe is not None and self.state != HEALTH_CLOSED and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self.state != HEALTH_CLOSED:
+            await asyncio.sleep(self.interval)
+            await self.probe_once()
+
+    def stop(self) -> None:
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "probe_latency": self.probe_latency,
+            "probe_latency_avg": self.probe_latency_avg,
+            "transition_count": self.transition_count,
+            "transitions": [(t.at, t.state, t.reason) for t in self.transitions],
+        }
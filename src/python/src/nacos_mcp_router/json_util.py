@@ -0,0 +1,17 @@
+#-*- coding: utf-8 -*-
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def loads(content: bytes | str) -> Any:
+    """Decode a JSON document, with orjson when it is installed and the standard library otherwise."""
+    if orjson is not None:
+        return orjson.loads(content)
+    if isinstance(content, bytes):
+        content = content.decode("utf-8")
+    return json.loads(content)
@@ -0,0 +1,124 @@
+#-*- coding: utf-8 -*-
+import re
+import unicodedata
+from typing import Mapping
+
+from .router_types import McpServer
+
+_WHITESPACE = re.compile(r'\s+')
+# keywords shorter than this are matched by scanning the normalized texts
+_GRAM_SIZE = 2
+# separates the normalized fields of a server, no gram spans two fields
+_FIELD_SEPARATOR = "\x00"
+
+
+def normalize_text(text: str | bytes | None) -> str:
+    """Normalize text for keyword matching: NFKC (full width to half width), lower case, no whitespace."""
+    if not text:
+        return ""
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', errors='ignore')
+    text = _WHITESPACE.sub(' ', text.strip())
+    text = unicodedata.normalize('NFKC', text)
+    return text.replace(' ', '').replace('　', '').lower()
+
+
+def _grams(text: str) -> set[str]:
+    return {text[i:i + _GRAM_SIZE] for i in range(len(text) - _GRAM_SIZE + 1)}
+
+
+class KeywordIndex:
+    """
+    Substring search over the descriptions and tool descriptions of MCP servers.
+
+    The texts are normalized once when a server is indexed, and every character bigram is mapped to the
+    servers containing it, so CJK keywords without word boundaries match like a plain substring test.
+    A query intersects the postings of the keyword bigrams and verifies the few candidates left.
+    """
+    def __init__(self) -> None:
+        self._servers: dict[str, McpServer] = {}
+        # name -> (normalized description, normalized tool descriptions joined by _FIELD_SEPARATOR)
+        self._texts: dict[str, tuple[str, str]] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._order: dict[str, int] = {}
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def update(self, servers: Mapping[str, McpServer]) -> None:
+        """Index the servers that are new or replaced, and drop the servers not in `servers` anymore."""
+        for name in [name for name in self._servers if name not in servers]:
+            self.remove(name)
+        for name, server in servers.items():
+            if self._servers.get(name) is not server:
+                self.add(name, server)
+
+    def add(self, name: str, server: McpServer) -> None:
+        order = self._order.get(name)
+        self.remove(name)
+        self._servers[name] = server
+        if order is None:
+            order = self._sequence
+            self._sequence += 1
+        self._order[name] = order
+        if server.description is None:
+            return
+
+        detail = getattr(server, 'mcp_config_detail', None)
+        tool_descriptions = detail.tool_spec.tool_descriptions() if detail is not None else []
+        texts = (normalize_text(server.description),
+                 _FIELD_SEPARATOR.join(normalize_text(d) for d in tool_descriptions))
+        self._texts[name] = texts
+        for gram in _grams(texts[0]) | _grams(texts[1]):
+            self._postings.setdefault(gram, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        if self._servers.pop(name, None) is None:
+            return
+        self._order.pop(name, None)
+        texts = self._texts.pop(name, None)
+        if texts is None:
+            return
+        for gram in _grams(texts[0]) | _grams(texts[1]):
+            names = self._postings.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._postings[gram]
+
+    def search(self, keyword: str) -> list[McpServer]:
+        """
+        Servers whose description or tool descriptions contain the keyword, after normalization.
+        Servers matching by description come first, each group in indexing order.
+        """
+        keyword = normalize_text(keyword)
+        if _FIELD_SEPARATOR in keyword:
+            return []
+        if len(keyword) < _GRAM_SIZE:
+            candidates = self._texts.keys()
+        else:
+            postings: list[set[str]] = []
+            for gram in _grams(keyword):
+                names = self._postings.get(gram)
+                if not names:
+                    # a gram no server contains
+                    return []
+                postings.append(names)
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for names in postings[1:]:
+                candidates &= names
+                if not candidates:
+                    return []
+
+        by_description, by_tools = [], []
+        for name in candidates:
+            description, tools = self._texts[name]
+            if keyword in description:
+                by_description.append(name)
+            elif keyword in tools:
+                by_tools.append(name)
+        by_description.sort(key=self._order.__getitem__)
+        by_tools.sort(key=self._order.__getitem__)
+        return [self._servers[name] for name in by_description + by_tools]
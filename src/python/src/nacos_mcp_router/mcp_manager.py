@@ -1,187 +1,554 @@
 #-*- coding: utf-8 -*-
-import functools
 import os
 import time
 import itertools
 import asyncio
-from typing import Optional, List
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, List
 
-from chromadb.api.types import ID
 
 from .md5_util import get_md5
-from .nacos_http_client import NacosHttpClient
-from .router_types import ChromaDb, McpServer
+from .nacos_http_client import NacosHttpClient, get_mcp_config_keys, MCP_SERVER_VERSIONS_GROUP, \
+  MCP_SERVER_GROUP, MCP_TOOLS_GROUP
+from .bm25 import Bm25Index
+from .keyword_index import KeywordIndex, normalize_text
+from .rerank import FusionOptions, SOURCE_KEYWORD, SOURCE_VECTOR, fuse
+from .router_types import McpServer
+from .query_cache import LruCache, normalize_query
+from .vector_backend import VectorBackend
+from .vector_store import AsyncVectorStore
 from .logger import NacosMcpRouteLogger
-from .constants import MODE_ROUTER
-import threading
-import unicodedata
-import re
+from .constants import MODE_ROUTER, REFRESH_MODE_POLL, REFRESH_MODE_SUBSCRIBE, INDEX_GRANULARITY_SERVER, \
+  INDEX_GRANULARITY_TOOL, TOOL_POOLING_MAX, TOOL_POOLING_SUM
 
 logger = NacosMcpRouteLogger.get_logger()
 
+# 刷新过程中每积累这么多变更就写入一次向量库
+_VECTOR_DB_UPSERT_BATCH_SIZE = 100
+# 刷新过程中每到达这么多 MCP 服务器就发布一次快照，使其尽早可被搜索到
+_PUBLISH_BATCH_SIZE = 100
+# 订阅模式下待获取 md5 的配置超过该数量时，改为按分组批量列出配置
+_BULK_CONFIG_MD5_THRESHOLD = 10
+# tool 粒度下工具文档 id 为 MCP 服务器名 + 分隔符 + 工具名
+_TOOL_DOC_SEPARATOR = "::"
+# tool 粒度下每个待返回的 MCP 服务器向向量库多取这么多个文档，以便汇总出足够的服务器
+_TOOL_DOCS_PER_SERVER = 4
+
+@dataclass(frozen=True)
+class _ListenResult:
+  """配置长轮询的结果：被 refresh_now 唤醒，或变更的配置（请求失败时为 None）"""
+  woken: bool = False
+  changed: Optional[List[tuple[str, str]]] = None
+
+def _resolve(pending: Optional[asyncio.Future]) -> None:
+  if pending is not None and not pending.done():
+    pending.set_result(None)
+
 class McpUpdater:
   def __init__(self,
                nacosHttpClient: NacosHttpClient,
-               chromaDbService: ChromaDb | None = None,
+               chromaDbService: VectorBackend | None = None,
                update_interval: float = 60,
                enable_vector_db: bool = True,
                mode: str = MODE_ROUTER,
                proxy_mcp_name: str = "",
-               enable_auto_refresh: bool = True):
+               enable_auto_refresh: bool = True,
+               incremental_refresh: bool = True,
+               full_refresh_every: int = 10,
+               refresh_mode: str = REFRESH_MODE_POLL,
+               safety_refresh_interval: float = 300,
+               search_options: FusionOptions | None = None,
+               vector_db_workers: int = 2,
+               search_result_cache_size: int = 0,
+               search_result_cache_ttl: float = 0,
+               index_granularity: str = INDEX_GRANULARITY_SERVER,
+               tool_pooling: str = TOOL_POOLING_MAX):
+    if index_granularity not in (INDEX_GRANULARITY_SERVER, INDEX_GRANULARITY_TOOL):
+      raise ValueError(f"unknown vector index granularity: {index_granularity}")
+    if tool_pooling not in (TOOL_POOLING_MAX, TOOL_POOLING_SUM):
+      raise ValueError(f"unknown tool score pooling: {tool_pooling}")
     self.nacosHttpClient = nacosHttpClient
     self.chromaDbService = chromaDbService
+    # 向量库的同步调用都在独立的有界线程池中执行，避免阻塞事件循环
+    self.vector_store = AsyncVectorStore(chromaDbService, max_workers=vector_db_workers) \
+      if chromaDbService is not None else None
     self.interval = update_interval
-    self._running = False
     self._update_task: Optional[asyncio.Task] = None
     self.mcp_server_config_version = {}
-    self._cache = dict[str, McpServer]()
+    # 已发布的 MCP 服务器快照，只整体替换不原地修改，读取无需加锁
+    self._cache: Mapping[str, McpServer] = MappingProxyType({})
+    self.snapshot_version = 0
+    # 关键词索引随快照一起更新，只重建新增或变化的 MCP 服务器
+    self._keyword_index = KeywordIndex()
+    self._bm25 = Bm25Index()
+    # 关键词检索与向量检索结果的融合方式
+    self.search_options = search_options or FusionOptions()
+    # 相同查询的向量检索结果缓存，快照或向量库变化时清空
+    self._search_results: LruCache[dict] = LruCache(search_result_cache_size, search_result_cache_ttl)
+    self._search_results_generation = 0
+    # server 粒度每个 MCP 服务器一个向量；tool 粒度另为每个启用的工具建立向量，检索时按 tool_pooling 汇总到服务器
+    self.index_granularity = index_granularity
+    self.tool_pooling = tool_pooling
+    # 向量库中的文档 id -> (MCP 服务器名, 工具名)，以及每个 MCP 服务器的文档 id
+    self._vector_doc_owner: dict[str, tuple[str, Optional[str]]] = {}
+    self._vector_docs: dict[str, List[str]] = {}
+    # 向量库中全部文档 id，首次使用时从向量库加载一次，之后随写入和删除维护
+    self._vector_ids: Optional[set[str]] = None
     self._chromaDbId = f"nacos_mcp_router_collection"
     self.enable_vector_db = enable_vector_db
-    self.lock = threading.Lock()
     self.mode = mode
     self.proxy_mcp_name = proxy_mcp_name
     self.enable_auto_refresh = enable_auto_refresh
-    self._thread = None
+    # 增量刷新只拉取列表中有变化的 MCP 服务器详情，每 full_refresh_every 轮做一次全量刷新兜底
+    self.incremental_refresh = incremental_refresh
+    self.full_refresh_every = max(1, full_refresh_every)
+    self._refresh_count = 0
+    # 订阅模式通过长轮询监听 MCP 服务器配置的变更，定时刷新间隔放宽为 safety_refresh_interval 作为兜底
+    self.refresh_mode = refresh_mode
+    self.safety_refresh_interval = safety_refresh_interval
+    self._watched_configs: dict[tuple[str, str], str] = {}
+    self._watched_servers: dict[tuple[str, str], str] = {}
+    # refresh_now 唤醒后台任务，_pending_refresh 在下一轮刷新结束时完成
+    self._wakeup = asyncio.Event()
+    self._pending_refresh: Optional[asyncio.Future] = None
 
   @classmethod
   def create(cls,
              nacos_client: NacosHttpClient,
-             chroma_db: ChromaDb | None = None,
+             chroma_db: VectorBackend | None = None,
              update_interval: float = 30,
              enable_vector_db: bool = False,
              mode: str = MODE_ROUTER,
              proxy_mcp_name: str = "",
-             enable_auto_refresh: bool = True):
-    """创建 McpUpdater 实例并启动后台任务"""
-    updater = cls(nacos_client, chroma_db, update_interval, enable_vector_db, mode, proxy_mcp_name, enable_auto_refresh)
- 
-    updater._thread = threading.Thread(target=functools.partial(updater.asyncUpdater))
-    updater._thread.daemon = True
-    
-    if enable_auto_refresh:
-        updater._thread.start()
-    
-    return updater
-
-  def asyncUpdater(self) -> None:
-    debug_mode = os.getenv('DEBUG_MODE')
-    if debug_mode is not None:
+             enable_auto_refresh: bool = True,
+             incremental_refresh: bool = True,
+             full_refresh_every: int = 10,
+             refresh_mode: str = REFRESH_MODE_POLL,
+             safety_refresh_interval: float = 300,
+             search_options: FusionOptions | None = None,
+             vector_db_workers: int = 2,
+             search_result_cache_size: int = 0,
+             search_result_cache_ttl: float = 0,
+             index_granularity: str = INDEX_GRANULARITY_SERVER,
+             tool_pooling: str = TOOL_POOLING_MAX):
+    """创建 McpUpdater 实例，后台任务由 start 在服务的事件循环中启动"""
+    return cls(nacos_client, chroma_db, update_interval, enable_vector_db, mode, proxy_mcp_name, enable_auto_refresh,
+               incremental_refresh, full_refresh_every, refresh_mode, safety_refresh_interval, search_options,
+               vector_db_workers, search_result_cache_size, search_result_cache_ttl, index_granularity, tool_pooling)
+
+  def start(self) -> None:
+    """在当前事件循环中启动后台刷新任务"""
+    if not self.enable_auto_refresh or self.running:
+      return
+    if os.getenv('DEBUG_MODE') is not None:
       logger.info("debug mode is enabled")
       return
+    self._wakeup = asyncio.Event()
+    self._update_task = asyncio.create_task(self.asyncUpdater(), name="nacos-mcp-updater")
+
+  async def stop(self) -> None:
+    """停止后台刷新任务并关闭 Nacos 连接池"""
+    task, self._update_task = self._update_task, None
+    if task is not None:
+      task.cancel()
+      await asyncio.gather(task, return_exceptions=True)
+    if self._pending_refresh is not None and not self._pending_refresh.done():
+      self._pending_refresh.cancel()
+    if self.vector_store is not None:
+      self.vector_store.close()
+    await self.nacosHttpClient.aclose()
+
+  @property
+  def running(self) -> bool:
+    return self._update_task is not None and not self._update_task.done()
+
+  async def refresh_now(self) -> None:
+    """立即刷新一轮并等待其完成，后台任务未运行时直接在调用方执行"""
+    if not self.running:
+      await self._update_cycle()
+      return
+    if self._pending_refresh is None or self._pending_refresh.done():
+      self._pending_refresh = asyncio.get_running_loop().create_future()
+    self._wakeup.set()
+    await asyncio.shield(self._pending_refresh)
+
+  def _take_pending_refresh(self) -> Optional[asyncio.Future]:
+    pending, self._pending_refresh = self._pending_refresh, None
+    self._wakeup.clear()
+    return pending
+
+  async def _wait_interval(self, interval: float) -> None:
+    """等待下一轮刷新，refresh_now 可提前唤醒"""
+    try:
+      await asyncio.wait_for(self._wakeup.wait(), interval)
+    except asyncio.TimeoutError:
+      pass
 
+  async def asyncUpdater(self) -> None:
     while True:
+      pending = self._take_pending_refresh()
       try:
-        if self.mode == MODE_ROUTER:
-            asyncio.run(self.refresh())
+        if self.mode == MODE_ROUTER and self.refresh_mode == REFRESH_MODE_SUBSCRIBE:
+          await self.subscribe(pending)
         else:
-            asyncio.run(self.refreshOne())
-        time.sleep(self.interval)
+          await self._update_cycle()
       except Exception as e:
         logger.warning("exception while updating mcp servers: " , exc_info=e)
-
-  def get_deleted_ids(self) -> List[str]:
-    if self.chromaDbService is None:
-      return []
-
-    all_ids_in_chromadb = self.chromaDbService.get_all_ids()
-    if all_ids_in_chromadb is None:
+      finally:
+        _resolve(pending)
+      await self._wait_interval(self.interval)
+
+  async def _update_cycle(self) -> None:
+    if self.mode == MODE_ROUTER:
+      await self.refresh()
+    else:
+      await self.refreshOne()
+
+  async def subscribe(self, pending: Optional[asyncio.Future] = None) -> None:
+    """订阅模式：长轮询 Nacos 配置变更，只刷新受影响的 MCP 服务器，定时刷新作为兜底发现新增和删除"""
+    last_refresh: float | None = None
+    try:
+      while True:
+        if last_refresh is None or time.monotonic() - last_refresh >= self.safety_refresh_interval:
+          await self.refresh()
+          await self._sync_watched_configs()
+          last_refresh = time.monotonic()
+          _resolve(pending)
+
+        result = await self._listen_configs()
+        if result.woken:
+          # refresh_now 请求立即全量刷新
+          pending = self._take_pending_refresh()
+          last_refresh = None
+        elif result.changed is None:
+          # Nacos 不可用时不要空转，等待后重试
+          await asyncio.sleep(min(self.interval, 10))
+        elif result.changed:
+          await self.refresh_changed_configs(result.changed)
+    finally:
+      _resolve(pending)
+
+  async def _listen_configs(self) -> _ListenResult:
+    """长轮询监听配置变更，可被 refresh_now 唤醒"""
+    listen = asyncio.ensure_future(self.nacosHttpClient.listen_configs(self._watched_configs))
+    wakeup = asyncio.ensure_future(self._wakeup.wait())
+    try:
+      await asyncio.wait([listen, wakeup], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+      for task in (listen, wakeup):
+        if not task.done():
+          task.cancel()
+      await asyncio.gather(listen, wakeup, return_exceptions=True)
+    if wakeup.done() and not wakeup.cancelled():
+      return _ListenResult(woken=True)
+    return _ListenResult(changed=listen.result())
+
+  def _publish(self, cache: dict[str, McpServer]) -> None:
+    """发布新的 MCP 服务器快照"""
+    self._cache = MappingProxyType(cache)
+    self._keyword_index.update(cache)
+    self._bm25.update(cache)
+    self.snapshot_version += 1
+    self._invalidate_search_results()
+
+  def _invalidate_search_results(self) -> None:
+    self._search_results_generation += 1
+    self._search_results.clear()
+
+  def cache_stats(self) -> dict:
+    """查询 embedding 缓存与检索结果缓存的命中情况，用于评估缓存大小"""
+    embedding_cache = getattr(self.chromaDbService, 'query_embedding_cache', None)
+    return {
+      "query_embeddings": embedding_cache.stats() if embedding_cache is not None else None,
+      "search_results": self._search_results.stats(),
+      "snapshot_version": self.snapshot_version,
+    }
+
+  async def _sync_watched_configs(self) -> None:
+    """根据缓存中的 MCP 服务器更新需要监听的配置及其 md5"""
+    servers = list(self._cache.values())
+
+    watched_servers = {}
+    for server in servers:
+      if not server.id:
+        continue
+      for key in get_mcp_config_keys(server.id, server.version):
+        watched_servers[key] = str(server.get_name())
+
+    unknown = [key for key in watched_servers if key not in self._watched_configs]
+    md5s = {key: md5 for key, md5 in self._watched_configs.items() if key in watched_servers}
+    if len(unknown) > _BULK_CONFIG_MD5_THRESHOLD:
+      listed = {}
+      for group in (MCP_SERVER_VERSIONS_GROUP, MCP_SERVER_GROUP, MCP_TOOLS_GROUP):
+        success, group_md5s = await self.nacosHttpClient.list_config_md5s(group)
+        if not success:
+          return
+        for data_id, md5 in group_md5s.items():
+          listed[(data_id, group)] = md5
+      for key in unknown:
+        md5s[key] = listed.get(key, '')
+    else:
+      for key in unknown:
+        success, md5 = await self.nacosHttpClient.get_config_md5(*key)
+        if not success:
+          return
+        md5s[key] = md5
+
+    self._watched_configs = md5s
+    self._watched_servers = watched_servers
+    logger.info(f"watching {len(md5s)} configs of {len(servers)} mcp servers")
+
+  async def refresh_changed_configs(self, changed: List[tuple[str, str]]) -> None:
+    """只刷新配置发生变更的 MCP 服务器"""
+    names = set()
+    deleted = set()
+    for key in changed:
+      name = self._watched_servers.get(key)
+      if name is None:
+        continue
+      success, md5 = await self.nacosHttpClient.get_config_md5(*key)
+      if not success:
+        continue
+      self._watched_configs[key] = md5
+      names.add(name)
+      if not md5 and key[1] == MCP_SERVER_VERSIONS_GROUP:
+        deleted.add(name)
+
+    if not names:
+      return
+    logger.info(f"mcp server configs changed, refreshing {sorted(names)}")
+
+    for name in deleted:
+      await self._remove_server(name)
+
+    targets = [self._cache[name] for name in names - deleted if name in self._cache]
+    fetched = await asyncio.gather(*[self.nacosHttpClient.get_mcp_server(server.id, server.name) for server in targets])
+    for mcp_server in fetched:
+      if not mcp_server.description:
+        # 拉取失败时保留旧数据，等待下次变更或兜底刷新
+        continue
+      if mcp_server.mcp_config_detail is not None and not mcp_server.mcp_config_detail.enabled:
+        await self._remove_server(mcp_server.name)
+      else:
+        await self._apply_server(mcp_server)
+
+    await self._sync_watched_configs()
+
+  async def _apply_server(self, mcp_server: McpServer) -> None:
+    """更新单个 MCP 服务器的缓存及向量库"""
+    sname = str(mcp_server.get_name())
+    self._publish({**self._cache, sname: mcp_server})
+
+    documents = self._vector_documents(mcp_server)
+    md5_str = get_md5("\n".join(text for _, _, text in documents))
+    if self.mcp_server_config_version.get(sname, '') != md5_str:
+      self.mcp_server_config_version[sname] = md5_str
+      stale = self._track_vector_docs(sname, documents)
+      await self._upsert_vector_db([doc_id for doc_id, _, _ in documents], [text for _, _, text in documents],
+                                   [get_md5(text) for _, _, text in documents])
+      await self._delete_vector_docs(stale)
+
+  def _vector_documents(self, mcp_server: McpServer) -> List[tuple[str, Optional[str], str]]:
+    """
+    MCP 服务器写入向量库的文档 (文档 id, 工具名, 文本)。server 粒度为描述与全部工具描述拼接成的一个文档；
+    tool 粒度为服务器描述一个文档，加上每个启用的工具一个文档
+    """
+    sname = str(mcp_server.get_name())
+    detail = mcp_server.mcp_config_detail
+    if self.index_granularity == INDEX_GRANULARITY_SERVER:
+      des = mcp_server.description
+      if detail is not None:
+        des = detail.get_tool_description()
+      return [(sname, None, des)]
+
+    documents: List[tuple[str, Optional[str], str]] = [(sname, None, mcp_server.description or sname)]
+    if detail is not None:
+      for tool, description in detail.tool_spec.enabled_tools():
+        documents.append((f"{sname}{_TOOL_DOC_SEPARATOR}{tool}", tool, f"{tool}: {description}"))
+    return documents
+
+  def _track_vector_docs(self, sname: str, documents: List[tuple[str, Optional[str], str]]) -> List[str]:
+    """记录 MCP 服务器的向量库文档，返回不再属于该服务器、需要删除的文档 id"""
+    previous = self._vector_docs.get(sname, [])
+    current = [doc_id for doc_id, _, _ in documents]
+    current_ids = set(current)
+    stale = [doc_id for doc_id in previous if doc_id not in current_ids]
+    for doc_id in stale:
+      self._vector_doc_owner.pop(doc_id, None)
+    for doc_id, tool, _ in documents:
+      self._vector_doc_owner[doc_id] = (sname, tool)
+    self._vector_docs[sname] = current
+    return stale
+
+  def _untrack_vector_docs(self, sname: str) -> List[str]:
+    doc_ids = self._vector_docs.pop(sname, [sname])
+    for doc_id in doc_ids:
+      self._vector_doc_owner.pop(doc_id, None)
+    return doc_ids
+
+  async def _delete_vector_docs(self, ids: List[str]) -> None:
+    if not ids or not self.enable_vector_db or self.vector_store is None:
+      return
+    await self.vector_store.delete_data(ids=ids)
+    if self._vector_ids is not None:
+      self._vector_ids.difference_update(ids)
+    self._invalidate_search_results()
+
+  async def _remove_server(self, name: str) -> None:
+    """从缓存及向量库中删除 MCP 服务器"""
+    if name in self._cache:
+      self._publish({k: v for k, v in self._cache.items() if k != name})
+    self.mcp_server_config_version.pop(name, None)
+    await self._delete_vector_docs(self._untrack_vector_docs(name))
+
+  async def _load_vector_ids(self, vector_store: AsyncVectorStore) -> set[str]:
+    """向量库中的全部文档 id，只在首次调用时查询向量库"""
+    if self._vector_ids is None:
+      ids = await vector_store.get_all_ids()
+      if self._vector_ids is None:
+        self._vector_ids = set(ids or [])
+    return self._vector_ids
+
+  async def get_deleted_ids(self) -> List[str]:
+    """向量库中不属于任何缓存中 MCP 服务器的文档 id，由内存中的 id 集合求差得到"""
+    if self.vector_store is None:
       return []
 
-    deleted_id = []
-    for id in all_ids_in_chromadb:
-      if id not in self._cache:
-        deleted_id.append(id)
-    return deleted_id
+    vector_ids = await self._load_vector_ids(self.vector_store)
+    cache = self._cache
+    for sname in [sname for sname in self._vector_docs if sname not in cache]:
+      self._untrack_vector_docs(sname)
+    return list(vector_ids.difference(self._vector_doc_owner))
 
   async def refresh(self) -> None:
-    """刷新所有 MCP 服务器"""
+    """刷新所有 MCP 服务器，服务器详情到达后即可被搜索到"""
     if not self.enable_auto_refresh:
       return
     
     try:
-      mcpServers = await self.nacosHttpClient.get_mcp_servers()
-      logger.info(f"get mcp server list from nacos, size: {len(mcpServers)}")
-      if not mcpServers:
-        return
-
       docs = []
       ids = []
+      keys = []
+      stale_ids = []
       cache = {}
-      for mcpServer in mcpServers:
-        des = mcpServer.description
-        detail = mcpServer.mcp_config_detail
-        if detail is not None:
-          des = detail.get_tool_description()
-
+      # 已到达但尚未发布的 MCP 服务器，按批发布到快照
+      arrived = {}
+      changed = False
+      reused = 0
+      full_refresh = not self.incremental_refresh or self._refresh_count % self.full_refresh_every == 0
+      self._refresh_count += 1
+      reuse = None if full_refresh else self._reuse_unchanged
+      async for mcpServer in self.nacosHttpClient.iter_mcp_servers(reuse=reuse):
         name = mcpServer.get_name()
         sname = str(name)
 
         cache[sname] = mcpServer
+        if self._cache.get(sname) is mcpServer:
+          reused += 1
+          continue
+        arrived[sname] = mcpServer
+        if len(arrived) >= _PUBLISH_BATCH_SIZE:
+          self._publish({**self._cache, **arrived})
+          arrived = {}
 
-        md5_str = get_md5(des)
+        documents = self._vector_documents(mcpServer)
+        md5_str = get_md5("\n".join(text for _, _, text in documents))
         version = self.mcp_server_config_version.get(sname, '')
 
         if version != md5_str:
           self.mcp_server_config_version[sname] = md5_str
-          ids.append(sname)
-          if self.enable_vector_db:
-            docs.append(des)
-      with self.lock:
-        self._cache = cache
+          changed = True
+          stale_ids.extend(self._track_vector_docs(sname, documents))
+          for doc_id, _, text in documents:
+            ids.append(doc_id)
+            if self.enable_vector_db:
+              docs.append(text)
+              keys.append(get_md5(text))
+
+        if len(ids) >= _VECTOR_DB_UPSERT_BATCH_SIZE:
+          await self._upsert_vector_db(ids, docs, keys)
+          ids, docs, keys = [], [], []
+
+      logger.info(f"get mcp server list from nacos, size: {len(cache)}, "
+                  f"unchanged: {reused}, full refresh: {full_refresh}")
+      if not cache:
+        return
 
-      if not ids:
+      servers_changed = cache.keys() != self._cache.keys()
+      if servers_changed or arrived:
+        self._publish(cache)
+
+      # 内容未变化且没有 MCP 服务器被删除时无需更新向量库
+      if not changed and not servers_changed:
         return
-      if self.enable_vector_db and self.chromaDbService is not None:
-        self.chromaDbService.update_data(documents=docs, ids=ids)
-        deleted_id = self.get_deleted_ids()
-        if len(deleted_id) > 0 and len(mcpServers) > 0:
-          self.chromaDbService.delete_data(ids=deleted_id)
+      await self._upsert_vector_db(ids, docs, keys)
+      if self.enable_vector_db and self.vector_store is not None:
+        deleted_id = await self.get_deleted_ids()
+        await self._delete_vector_docs(list(dict.fromkeys(stale_ids + deleted_id)))
     except Exception as e:
       logger.warning("exception while refreshing mcp servers: ", exc_info=e)
 
+  def _reuse_unchanged(self, item: dict, fingerprint: str) -> Optional[McpServer]:
+    """列表项指纹未变化时复用上一轮的 MCP 服务器，跳过详情请求"""
+    previous = self._cache.get(str(item.get("name")))
+    if previous is not None and previous.list_fingerprint == fingerprint:
+      return previous
+    return None
+
+  async def _upsert_vector_db(self, ids: List[str], docs: List[str], keys: List[str]) -> None:
+    """写入向量库，keys 为文档的 md5，内容未变的文档复用缓存的 embedding"""
+    if not ids or not self.enable_vector_db or self.vector_store is None:
+      return
+    await self.vector_store.update_data(documents=docs, ids=ids, keys=keys)
+    if self._vector_ids is not None:
+      self._vector_ids.update(ids)
+    self._invalidate_search_results()
+
   async def refreshOne(self) -> None:
     """刷新单个 MCP 服务器"""
     try:
       mcpServer = await self.nacosHttpClient.get_mcp_server(id='', name=self.proxy_mcp_name)
       if mcpServer is None:
         return
-      docs = []
-      ids = []
-      cache = {}
-      des = mcpServer.description
-      detail = mcpServer.mcp_config_detail
-      if detail is not None:
-        des = detail.get_tool_description()
-
-      name = mcpServer.get_name()
-      sname = str(name)
 
-      cache[sname] = mcpServer
-
-      md5_str = get_md5(des)
-
-      with self.lock:
-        self._cache = cache
+      self._publish({str(mcpServer.get_name()): mcpServer})
     except Exception as e:
       logger.warning("exception while updating mcp server: ", exc_info=e)
 
   async def _get_from_cache(self, id: str) -> Optional[McpServer]:
     """从缓存中获取 MCP 服务器"""
-    with self.lock:
-      return self._cache.get(id)
+    return self._cache.get(id)
 
   async def _cache_values(self) -> List[McpServer]:
     """获取缓存中的所有值"""
-    with self.lock:
-      return list(self._cache.values())
+    return list(self._cache.values())
 
   async def getMcpServer(self, query: str, count: int) -> List[McpServer]:
     """通过查询获取 MCP 服务器"""
-    if not self.enable_vector_db or self.chromaDbService is None:
+    hits = await self._vector_hits(query, count)
+    return [server for server, _ in hits]
+
+  async def _vector_hits(self, query: str, count: int,
+                         matched_tools: Optional[dict[str, List[str]]] = None) -> List[tuple[McpServer, float]]:
+    """
+    向量库中与 query 最相似的 MCP 服务器及相似度，相似度由距离换算为 1 / (1 + distance)。
+    并发的查询会被合并为一次批量查询。tool 粒度下工具的相似度按 tool_pooling 汇总到所属服务器，
+    命中的工具名写入 matched_tools
+    """
+    if not self.enable_vector_db or self.vector_store is None or count <= 0:
       return []
 
     try:
-      result = self.chromaDbService.query(query, count)
+      n_results = count * _TOOL_DOCS_PER_SERVER if self.index_granularity == INDEX_GRANULARITY_TOOL else count
+      key = (normalize_query(query), n_results)
+      result = self._search_results.get(key) if self._search_results.enabled else None
+      if result is None:
+        generation = self._search_results_generation
+        result = await self.vector_store.query(query, n_results)
+        # 查询期间快照或向量库发生变化时结果可能已过期，不写入缓存
+        if result is not None and generation == self._search_results_generation:
+          self._search_results.put(key, result)
       if result is None:
         return []
       
@@ -189,67 +556,97 @@ class McpUpdater:
       logger.info("find mcps in vector db, query: " + query + ",ids: " + str(ids))
       if ids is None:
         return []
-
-      mcp_servers = []
-      for id1 in itertools.chain.from_iterable(ids):
-        server = await self._get_from_cache(id1)
-        if server is not None:
-          mcp_servers.append(server)
-      
-      return mcp_servers
+      distances = result.get('distances') or [[]]
+
+      cache = self._cache
+      scores: dict[str, float] = {}
+      tools: dict[str, List[str]] = {}
+      for id1, distance in itertools.zip_longest(itertools.chain.from_iterable(ids),
+                                                 itertools.chain.from_iterable(distances)):
+        sname, tool = self._vector_doc_owner.get(id1, (id1, None))
+        if sname not in cache:
+          continue
+        similarity = 1 / (1 + distance) if distance is not None else 0.0
+        if sname not in scores:
+          scores[sname] = similarity
+        elif self.tool_pooling == TOOL_POOLING_SUM:
+          scores[sname] += similarity
+        else:
+          scores[sname] = max(scores[sname], similarity)
+        if tool is not None:
+          tools.setdefault(sname, []).append(tool)
+
+      if matched_tools is not None:
+        matched_tools.update(tools)
+      ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:count]
+      return [(cache[sname], score) for sname, score in ranked]
       
     except Exception as e:
       logger.warning(f"exception while getting mcp server by query: {query}", exc_info=e)
       return []
 
+  async def search(self, task_description: str, keywords: List[str],
+                   matched_tools: Optional[dict[str, List[str]]] = None) -> List[McpServer]:
+    """
+    关键词检索与向量检索并发执行，按 search_options 融合排序，返回得分最高的 MCP 服务器。
+    tool 粒度下与任务最相似的工具名按 MCP 服务器名写入 matched_tools
+    """
+    options = self.search_options
+    candidates = max(options.limit * 2, 10)
+    # 向量检索在向量库线程池中执行，同时在事件循环中完成关键词检索
+    vector = asyncio.create_task(self._vector_hits(task_description, candidates, matched_tools))
+    try:
+      keyword_hits = self._keyword_hits(keywords, task_description, candidates)
+    except Exception as e:
+      logger.warning(f"exception while searching mcp by keyword: {keywords}", exc_info=e)
+      keyword_hits = []
+    vector_hits = await vector
+
+    fused = fuse({SOURCE_KEYWORD: keyword_hits, SOURCE_VECTOR: vector_hits}, options)
+    logger.info(f"search mcp servers, keyword hits: {len(keyword_hits)}, vector hits: {len(vector_hits)}, "
+                f"result: {[(str(s.get_name()), round(score, 4)) for s, score in fused]}")
+    return [server for server, _ in fused]
+
   def _normalize_chinese_text(self, text: str) -> str:
     """标准化中文文本，处理编码、空格、全角半角等问题"""
-    if not text:
-      return ""
-    
-    # 统一编码为 UTF-8
-    if isinstance(text, bytes):
-      text = text.decode('utf-8', errors='ignore')
-    
-    # 移除不可见字符和多余空格
-    text = re.sub(r'\s+', ' ', text.strip())
-    
-    # 全角转半角
-    text = unicodedata.normalize('NFKC', text)
-    
-    # 移除所有空格
-    text = text.replace(' ', '').replace('　', '')
-    
-    return text.lower()
+    return normalize_text(text)
 
   async def search_mcp_by_keyword(self, keyword: str) -> List[McpServer]:
-    """通过关键词搜索 MCP 服务器"""
-    try:
-      servers = []
-      cache_values = await self._cache_values()
-      logger.info("cache size: " + str(len(cache_values)))
+    """通过关键词在预先构建的索引中搜索 MCP 服务器，匹配描述或工具描述，按 BM25 相关度排序"""
+    return await self.search_mcp_by_keywords([keyword])
 
-      # 标准化关键词
-      normalized_keyword = self._normalize_chinese_text(keyword)
-
-      for mcp_server in cache_values:
-        if mcp_server.description is None:
-          logger.info(f"mcp server {mcp_server.name} description is None")
-          continue
-        
-        # 标准化描述文本
-        normalized_description = self._normalize_chinese_text(mcp_server.description)
-        
-        if normalized_keyword in normalized_description:
-          servers.append(mcp_server)
-
-      logger.info(f"result mcp servers search by keywords: {len(servers)}, key: {keyword}")
+  async def search_mcp_by_keywords(self, keywords: List[str], query: str = "") -> List[McpServer]:
+    """匹配任一关键词的 MCP 服务器，按关键词及 query 的 BM25 相关度排序"""
+    try:
+      logger.info("cache size: " + str(len(self._cache)))
+      servers = [server for server, _ in self._keyword_hits(keywords, query)]
+      logger.info(f"result mcp servers search by keywords: {len(servers)}, key: {keywords}")
       return servers
-      
+
     except Exception as e:
-      logger.warning(f"exception while searching mcp by keyword: {keyword}", exc_info=e)
+      logger.warning(f"exception while searching mcp by keyword: {keywords}", exc_info=e)
       return []
 
+  def _keyword_hits(self, keywords: List[str], query: str = "", count: int = 0) -> List[tuple[McpServer, float]]:
+    """
+    匹配任一关键词的 MCP 服务器及其 BM25 得分，按得分降序排列。
+    count 大于 0 时再补充 BM25 得分最高的 count 个服务器，使只匹配部分词语的服务器也能被检索到
+    """
+    keywords = [keyword.strip() for keyword in keywords if keyword.strip()]
+    matched = {}
+    for keyword in keywords:
+      for server in self._keyword_index.search(keyword):
+        matched.setdefault(str(server.get_name()), server)
+
+    bm25_query = " ".join([*keywords, query])
+    scores = self._bm25.score(bm25_query, matched.keys())
+    if count > 0:
+      for server, score in self._bm25.search(bm25_query, count):
+        name = str(server.get_name())
+        matched.setdefault(name, server)
+        scores[name] = score
+    return sorted(((server, scores[name]) for name, server in matched.items()), key=lambda hit: hit[1], reverse=True)
+
   async def get_mcp_server_by_name(self, mcp_name: str) -> Optional[McpServer]:
     """通过名称获取 MCP 服务器"""
     return await self._get_from_cache(mcp_name)
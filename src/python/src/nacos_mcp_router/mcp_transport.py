@@ -1,22 +1,86 @@
-from typing import Any
+from abc import ABC, abstractmethod
+from typing import Any, AsyncContextManager, Callable, Optional
 from mcp.types import Tool
 from mcp.types import CallToolResult
 from mcp.types import InitializeResult
 from mcp.types import ListToolsResult
 
-class McpTransport:
-    def __init__(self, url: str, headers: dict[str, str]):
+from .capability_cache import is_tools_changed
+from .logger import NacosMcpRouteLogger
+from .session_pool import FORWARDED_HEADERS, PooledSession, SessionPool
+
+# 客户端到 router 的连接本身的 headers，不转发到服务器
+_CONNECTION_HEADERS = frozenset({"content-length", "host", "mcp-session-id", "mcp-protocol-version", "last-event-id",
+                                 "connection", "keep-alive", "transfer-encoding", "te", "upgrade"})
+# 每个请求取值不同的链路追踪 headers，共用的会话无法携带单个请求的取值。forwarded_headers 为 None 时不转发，
+# 否则每个请求都会落入各自的会话分区
+_PER_REQUEST_HEADERS = frozenset({"traceparent", "tracestate", "baggage", "x-request-id", "x-correlation-id",
+                                  "request-id", "b3", "x-b3-traceid", "x-b3-spanid", "x-b3-parentspanid",
+                                  "x-b3-sampled", "x-b3-flags", "uber-trace-id", "x-amzn-trace-id",
+                                  "x-cloud-trace-context", "sentry-trace"})
+
+class McpTransport(ABC):
+    """
+    远程 MCP 服务器的传输，请求复用连接池中已初始化的长连接。默认转发客户端的全部 headers，
+    配置了 forwarded_headers 时只转发其中的 headers（认证、租户等）。
+    转发的 headers 相同的请求共用会话，不同凭证的请求使用各自的会话。
+    子类实现 connect 建立到服务器的连接。服务器发送 tools/list_changed 时调用 on_tools_changed
+    """
+    def __init__(self, url: str, headers: dict[str, str],
+                 forwarded_headers: Optional[frozenset[str]] = FORWARDED_HEADERS):
         self.url = url
         self.headers = headers
-    
-    async def handle_tool_call(self, args: dict[str, Any], client_headers: dict[str, str], name: str) -> Any:
-        pass
+        self.forwarded_headers = forwarded_headers
+        self._dropped_headers: set[str] = set()
+        if 'Content-Length' in self.headers:
+            del self.headers['Content-Length']
+        self.on_tools_changed: Optional[Callable[[], None]] = None
+        self.pool = SessionPool(url, self.connect, message_handler=self._handle_message)
+
+    @abstractmethod
+    def connect(self, headers: dict[str, str]) -> AsyncContextManager[tuple]:
+        """连接服务器，返回以 (read_stream, write_stream, ...) 为值的上下文"""
+
+    def partition_key(self, client_headers: dict[str, str]) -> str:
+        """客户端 headers 所属的会话分区，同一分区的请求共用会话"""
+        return self.pool.partition_key(self.clean_headers(client_headers))
+
+    async def _handle_message(self, message: Any) -> None:
+        if is_tools_changed(message) and self.on_tools_changed is not None:
+            self.on_tools_changed()
+
+    async def handle_tool_call(self, args: dict[str, Any], client_headers: dict[str, str], name: str) -> CallToolResult:
+        """处理tool调用，转发客户端headers到目标服务器。tool 调用不是幂等的，连接断开时不在新会话上重试"""
+        async def call(session: PooledSession) -> CallToolResult:
+            return await session.client.call_tool(name=name, arguments=args)
+        return await self.pool.run(self.clean_headers(client_headers), call, idempotent=False)
+
+    async def handle_list_tools(self, client_headers: dict[str, str]) -> ListToolsResult:
+        async def list_tools(session: PooledSession) -> ListToolsResult:
+            return await session.client.list_tools()
+        return await self.pool.run(self.clean_headers(client_headers), list_tools)
 
-    async def handle_list_tools(self, client_headers: dict[str, str]) -> Any:
-        pass
+    async def handle_initialize(self, client_headers: dict[str, str]) -> InitializeResult:
+        async def initialize(session: PooledSession) -> InitializeResult:
+            return session.initialize_response
+        return await self.pool.run(self.clean_headers(client_headers), initialize)
 
-    async def handle_initialize(self, client_headers: dict[str, str]) -> Any:
-        pass
+    async def close(self) -> None:
+        await self.pool.close()
 
     def clean_headers(self, client_headers: dict[str, str]) -> dict[str, str]:
-        return {k: v for k, v in client_headers.items() if k != 'Content-Length' and k != 'content-length' and k != 'host' and k != 'Host'}
\ No newline at end of file
+        """
+        转发到服务器的客户端 headers。forwarded_headers 为 None 时转发除 Content-Length、Host 等连接 headers
+        及 traceparent、x-request-id 等链路追踪 headers 外的全部 headers，否则只转发其中的 headers，
+        未转发的 header 名称每个服务器只记录一次日志
+        """
+        if self.forwarded_headers is None:
+            return {k: v for k, v in client_headers.items()
+                    if k.lower() not in _CONNECTION_HEADERS and k.lower() not in _PER_REQUEST_HEADERS}
+        dropped = {k.lower() for k in client_headers} - self.forwarded_headers - _CONNECTION_HEADERS
+        dropped -= self._dropped_headers
+        if dropped:
+            self._dropped_headers |= dropped
+            NacosMcpRouteLogger.get_logger().warning(
+                f"client headers {sorted(dropped)} are not in FORWARDED_HEADERS, not forwarded to mcp server {self.url}")
+        return {k: v for k, v in client_headers.items() if k.lower() in self.forwarded_headers}
@@ -0,0 +1,115 @@
+#-*- coding: utf-8 -*-
+import random
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class NacosNode:
+    """Health statistics of one Nacos Server node."""
+    address: str
+    latency: float | None = None
+    error_rate: float = 0.0
+    cooldown_until: float = 0.0
+    consecutive_failures: int = 0
+    requests: int = 0
+    failures: int = 0
+
+    def cooling_down(self, now: float) -> bool:
+        return self.cooldown_until > now
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "address": self.address,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "cooling_down": self.cooling_down(now),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class NacosCluster:
+    """
+    Pick the Nacos Server node to send a request to.
+
+    Healthy nodes are ordered by their latency (EWMA) weighted by their recent error rate, nodes that
+    failed to connect are put into a cool-down that doubles with each consecutive failure and are only
+    tried after every healthy node. A small share of requests goes to a random healthy node first, so
+    the statistics of nodes that are not the best one keep being refreshed.
+    """
+    def __init__(self,
+                 addresses: list[str],
+                 cooldown: float = 30.0,
+                 max_cooldown: float = 300.0,
+                 explore_ratio: float = 0.05,
+                 latency_alpha: float = 0.3,
+                 error_alpha: float = 0.2) -> None:
+        if not addresses:
+            raise ValueError("at least one nacos address is required")
+        self.nodes = [NacosNode(address=address) for address in addresses]
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.explore_ratio = explore_ratio
+        self.latency_alpha = latency_alpha
+        self.error_alpha = error_alpha
+
+    @staticmethod
+    def parse_addresses(addresses: str) -> list[str]:
+        """Split a comma separated list of host:port, e.g. `10.0.0.1:8848,10.0.0.2:8848`."""
+        result = []
+        for address in addresses.split(","):
+            address = address.strip()
+            if address and address not in result:
+                result.append(address)
+        return result
+
+    def _score(self, node: NacosNode, default_latency: float) -> float:
+        latency = node.latency if node.latency is not None else default_latency
+        # a node failing half of its requests ranks like one six times slower
+        return (latency + 0.01) * (1 + 10 * node.error_rate)
+
+    def candidates(self) -> list[NacosNode]:
+        """Nodes in the order they should be tried, the best healthy node first."""
+        now = time.monotonic()
+        healthy = [node for node in self.nodes if not node.cooling_down(now)]
+        cooling = sorted((node for node in self.nodes if node.cooling_down(now)), key=lambda n: n.cooldown_until)
+
+        # nodes never tried compete with the fastest known one
+        known = [node.latency for node in healthy if node.latency is not None]
+        default_latency = min(known) if known else 0.0
+        healthy.sort(key=lambda n: self._score(n, default_latency))
+        if len(healthy) > 1 and random.random() < self.explore_ratio:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        return healthy + cooling
+
+    def record_success(self, node: NacosNode, latency: float | None) -> None:
+        node.requests += 1
+        node.consecutive_failures = 0
+        node.cooldown_until = 0.0
+        node.error_rate = (1 - self.error_alpha) * node.error_rate
+        if latency is not None:
+            node.latency = latency if node.latency is None \
+                else (1 - self.latency_alpha) * node.latency + self.latency_alpha * latency
+
+    def record_error(self, node: NacosNode, latency: float | None) -> None:
+        """The node answered, but with a server error."""
+        node.requests += 1
+        node.failures += 1
+        node.error_rate = (1 - self.error_alpha) * node.error_rate + self.error_alpha
+        if latency is not None:
+            node.latency = latency if node.latency is None \
+                else (1 - self.latency_alpha) * node.latency + self.latency_alpha * latency
+
+    def record_unreachable(self, node: NacosNode) -> None:
+        """The node could not be reached, cool it down."""
+        node.requests += 1
+        node.failures += 1
+        node.consecutive_failures += 1
+        node.error_rate = (1 - self.error_alpha) * node.error_rate + self.error_alpha
+        cooldown = min(self.max_cooldown, self.cooldown * 2 ** (node.consecutive_failures - 1))
+        node.cooldown_until = time.monotonic() + cooldown
+
+    def snapshot(self) -> list[dict]:
+        now = time.monotonic()
+        return [node.to_dict(now) for node in self.nodes]
@@ -6,12 +6,20 @@ import json
 import random
 import time
 import urllib.parse
+import weakref
 import httpx
 import asyncio
+import importlib.util
 import os
+from typing import AsyncIterator, Callable
 from mcp import Tool
 from packaging import version
 
+from .concurrency import AdaptiveConcurrencyLimiter, FetchStats
+from .nacos_cluster import NacosCluster
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from . import json_util
+from .md5_util import get_md5
 from .router_types import McpServer
 from .nacos_mcp_server_config import NacosMcpServerConfig
 from .logger import NacosMcpRouteLogger
@@ -27,13 +35,63 @@ CONTENT_TYPE_URLENCODED = "application/x-www-form-urlencoded; charset=utf8"
 _SCHEMA_HTTP = "http"
 _SCHEMA = os.getenv("NACOS_SERVER_SCHEMA", _SCHEMA_HTTP)
 
+# Connection pool of the shared http client, all requests to Nacos Server reuse
+# keep-alive connections from this pool instead of opening one per request.
+_MAX_CONNECTIONS = int(os.getenv("NACOS_HTTP_MAX_CONNECTIONS", "20"))
+_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("NACOS_HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+_KEEPALIVE_EXPIRY = float(os.getenv("NACOS_HTTP_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 requires the optional `h2` package, fallback to HTTP/1.1 if it is missing.
+_HTTP2 = os.getenv("NACOS_HTTP2", "false").lower() == "true"
+
+# Timeouts of a request to Nacos Server in seconds, the connect timeout bounds the failover to the next node.
+_REQUEST_TIMEOUT = float(os.getenv("NACOS_REQUEST_TIMEOUT", "5"))
+_CONNECT_TIMEOUT = float(os.getenv("NACOS_CONNECT_TIMEOUT", "3"))
+# Read-only requests failing on every node or with a server error are retried with a jittered backoff.
+_RETRY_MAX_ATTEMPTS = max(1, int(os.getenv("NACOS_RETRY_MAX_ATTEMPTS", "3")))
+_RETRY_BASE_DELAY = float(os.getenv("NACOS_RETRY_BASE_DELAY", "0.2"))
+# Stop sending requests for a while after this many consecutive failed requests.
+_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("NACOS_CIRCUIT_FAILURE_THRESHOLD", "5"))
+_CIRCUIT_RESET_TIMEOUT = float(os.getenv("NACOS_CIRCUIT_RESET_TIMEOUT", "10"))
+
+# Log in once and authenticate requests with the access token issued by Nacos.
+_TOKEN_AUTH = os.getenv("NACOS_TOKEN_AUTH", "true").lower() == "true"
+
+# Seconds a node that can't be reached is skipped, doubled for each consecutive failure.
+_NODE_COOLDOWN = float(os.getenv("NACOS_NODE_COOLDOWN", "30"))
+
+# Bounds of the adaptive concurrency used to fetch mcp server details while refreshing.
+_DETAIL_FETCH_MAX_CONCURRENCY = int(os.getenv("NACOS_DETAIL_FETCH_MAX_CONCURRENCY", "16"))
+_DETAIL_FETCH_MIN_CONCURRENCY = int(os.getenv("NACOS_DETAIL_FETCH_MIN_CONCURRENCY", "1"))
+
+# Page size of the mcp server list requests.
+_PAGE_SIZE = 100
+# Request the remaining list pages ahead of time and overlap them with detail fetches.
+_PIPELINED_FETCH = os.getenv("NACOS_PIPELINED_FETCH", "true").lower() == "true"
+_PAGE_PREFETCH = max(1, int(os.getenv("NACOS_PAGE_PREFETCH", "4")))
+
+# Nacos stores every MCP server in configs of these groups, their changes are watched by long polling.
+MCP_SERVER_VERSIONS_GROUP = "mcp-server-versions"
+MCP_SERVER_GROUP = "mcp-server"
+MCP_TOOLS_GROUP = "mcp-tools"
+# How long Nacos holds a config listener request when nothing changes, in milliseconds.
+_LONG_POLL_TIMEOUT_MS = int(os.getenv("NACOS_LONG_POLL_TIMEOUT", "30000"))
+# Max configs watched by a single listener request, larger sets are split into concurrent requests.
+_MAX_CONFIGS_PER_LISTENER = 3000
+_WORD_SEPARATOR = "\x02"
+_LINE_SEPARATOR = "\x01"
+
+# Return the server fetched earlier if the list page item shows it's unchanged, otherwise None.
+ReuseMcpServer = Callable[[dict, str], McpServer | None]
+
 class NacosHttpClient:
-    def __init__(self, params: dict[str,str]) -> None:
+    def __init__(self, params: dict[str,str], transport: httpx.AsyncBaseTransport | None = None) -> None:
         nacosAddr = params["nacosAddr"]
         userName = params["userName"]
         passwd = params["password"]
     
         self.nacosAddr = nacosAddr
+        # NACOS_ADDR may list several nodes of a cluster, separated by commas
+        self.cluster = NacosCluster(NacosCluster.parse_addresses(nacosAddr), cooldown=_NODE_COOLDOWN)
         self.userName = userName
         self.passwd = passwd
         self.schema = _SCHEMA
@@ -46,8 +104,61 @@ class NacosHttpClient:
         if self.sk and not self.ak:
             raise ValueError("ak and sk are required when using nacos http client")
 
-        from .auth import StaticCredentialsProvider
+        from .auth import StaticCredentialsProvider, AccessTokenManager
         self.credentials_provider = StaticCredentialsProvider(self.ak, self.sk)
+        # log in once and send the cached access token, AK/SK signed requests keep sending the credentials
+        self.token_manager: AccessTokenManager | None = None
+        if _TOKEN_AUTH and self.userName and self.passwd and not self.ak:
+            self.token_manager = AccessTokenManager(self._login)
+
+        self.timeout = httpx.Timeout(_REQUEST_TIMEOUT, connect=min(_CONNECT_TIMEOUT, _REQUEST_TIMEOUT))
+        self.retry_policy = RetryPolicy(max_attempts=_RETRY_MAX_ATTEMPTS, base_delay=_RETRY_BASE_DELAY)
+        self.circuit_breaker = CircuitBreaker("nacos", failure_threshold=_CIRCUIT_FAILURE_THRESHOLD,
+                                              reset_timeout=_CIRCUIT_RESET_TIMEOUT)
+
+        self.limits = httpx.Limits(max_connections=_MAX_CONNECTIONS,
+                                   max_keepalive_connections=_MAX_KEEPALIVE_CONNECTIONS,
+                                   keepalive_expiry=_KEEPALIVE_EXPIRY)
+        self.http2 = _HTTP2
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("NACOS_HTTP2 is enabled but package h2 is not installed, fallback to HTTP/1.1")
+            self.http2 = False
+        # httpx.AsyncClient is bound to the event loop it is first used in, keep one pooled
+        # client per running loop, the client is dropped together with its loop.
+        self._clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = weakref.WeakKeyDictionary()
+        # custom transport, e.g. an in-process mock Nacos Server, pool limits don't apply to it
+        self._transport = transport
+
+        self.detail_fetch_limiter = AdaptiveConcurrencyLimiter(max_limit=_DETAIL_FETCH_MAX_CONCURRENCY,
+                                                               min_limit=min(_DETAIL_FETCH_MIN_CONCURRENCY, _DETAIL_FETCH_MAX_CONCURRENCY))
+        self.last_fetch_stats: FetchStats | None = None
+        self.pipelined_fetch = _PIPELINED_FETCH
+        # running tools list updates per event loop, keyed by MCP id or name
+        self._tool_updates: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, tuple[tuple[str, str], asyncio.Future]]] = weakref.WeakKeyDictionary()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=self.limits, http2=self.http2, timeout=self.timeout,
+                                       transport=self._transport)
+            self._clients[loop] = client
+        return client
+
+    def stats(self) -> dict:
+        """Health of the connection to the NACOS cluster, for monitoring."""
+        return {
+            "circuit_breaker": self.circuit_breaker.snapshot(),
+            "nodes": self.cluster.snapshot(),
+            "detail_fetch_limit": self.detail_fetch_limiter.limit,
+            "last_fetch": self.last_fetch_stats.summary() if self.last_fetch_stats is not None else None,
+        }
+
+    async def aclose(self) -> None:
+        """Close the pooled http client bound to the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
 
     def __do_sign(self, sign_str, sk):
         return base64.encodebytes(
@@ -85,6 +196,13 @@ class NacosHttpClient:
             McpServer: An [McpServer] object representing the retrieved MCP server. If the request
                        fails, the object will have default values.
         """
+        mcp_server = await self._fetch_mcp_server(id, name)
+        if mcp_server is None:
+            return  McpServer(name=name, description="", agentConfig={}, id=id, version="0.0.0")
+        return mcp_server
+
+    async def _fetch_mcp_server(self, id: str, name: str) -> McpServer | None:
+        """Fetch the detail of an MCP server, return None if the request to Nacos fails."""
         params = {}
         if self.namespaceId != "" and self.namespaceId is not None:
             params['namespaceId'] = self.namespaceId
@@ -98,7 +216,7 @@ class NacosHttpClient:
         success, data = await self.request_nacos(uri)
         if not success:
             logger.warning(f"failed to get mcp server, name {name}, id {id}")
-            return  McpServer(name=name, description="", agentConfig={}, id=id, version="0.0.0")
+            return None
 
         data['id'] = id
         config = NacosMcpServerConfig.from_dict(data)
@@ -117,9 +235,8 @@ class NacosHttpClient:
         _parse_mcp_detail(mcp_server, config, name)
         return mcp_server
 
-    async def get_mcp_servers_by_page(self, page_no: int, page_size: int):
-        mcp_servers = list[McpServer]()
-
+    async def list_mcp_servers_page(self, page_no: int, page_size: int) -> tuple[bool, int, list[dict]]:
+        """List one page of MCP servers basic info, returns (success, total count, page items)."""
         params = {}
         if self.namespaceId != "":
             params['namespaceId'] = self.namespaceId
@@ -133,37 +250,53 @@ class NacosHttpClient:
         success, data = await self.request_nacos(uri)
 
         if not success:
-            logger.warning("failed to get mcp server list response")
-            return 0, mcp_servers
+            logger.warning(f"failed to get mcp server list response, page {page_no}")
+            return False, 0, []
 
-        total_count = data['totalCount']
+        return True, data['totalCount'], data['pageItems'] or []
 
-        async def _to_mcp_server(m: dict) -> McpServer | None:
-            """
-            Fetch the mcp server unless the server is disabled(enabled=false)
-            or it's description field is None.
-            """
-            if not m["enabled"]:
-                return None
-            name = m["name"]
-            if (m["protocol"] == "mcp-sse" or m["protocol"] == "stdio") or m["protocol"] == "mcp-streamable" :
-                id = ""
-                if "id" in m and m["id"] is not None:
-                    id = m["id"]
-                
-                s = await self.get_mcp_server(id, name)
-                return s if s.description else None
-            else:
-                return None
+    async def _to_mcp_server(self, m: dict, reuse: ReuseMcpServer | None = None) -> McpServer | None:
+        """
+        Fetch the mcp server unless the server is disabled(enabled=false)
+        or it's description field is None. The detail request is skipped if
+        `reuse` returns the server fetched by an earlier refresh.
+        """
+        if not m["enabled"]:
+            return None
+        name = m["name"]
+        if (m["protocol"] == "mcp-sse" or m["protocol"] == "stdio") or m["protocol"] == "mcp-streamable" :
+            id = ""
+            if "id" in m and m["id"] is not None:
+                id = m["id"]
+
+            fingerprint = get_list_item_fingerprint(m)
+            if reuse is not None:
+                previous = reuse(m, fingerprint)
+                if previous is not None:
+                    return previous
+
+            # bound the detail requests fanned out to Nacos, the limit adapts to its health
+            async with self.detail_fetch_limiter.slot() as permit:
+                s = await self._fetch_mcp_server(id, name)
+                if s is None:
+                    permit.fail()
+                    return None
+            s.list_fingerprint = fingerprint
+            return s if s.description else None
+        else:
+            return None
+
+    async def get_mcp_servers_by_page(self, page_no: int, page_size: int, reuse: ReuseMcpServer | None = None):
+        mcp_servers = list[McpServer]()
+
+        success, total_count, items = await self.list_mcp_servers_page(page_no, page_size)
+        if not success:
+            return 0, mcp_servers
 
-        tasks = [ _to_mcp_server(m) for m in data['pageItems']]
-        tasks = [t for t in tasks if t is not None]
+        tasks = [ self._to_mcp_server(m, reuse) for m in items]
         if tasks:
-            # use asyncio.gather to run the tasks concurrently
-            # and wait for all of them to complete
-            # this is more efficient than using await for each task
-            # because it allows multiple tasks to run at the same time
-            # instead of waiting for each one to finish before starting the next
+            # use asyncio.gather to run the tasks concurrently, the detail_fetch_limiter
+            # caps how many of them hit Nacos at the same time
             mcp_servers = await asyncio.gather(*tasks)
             mcp_servers = [s for s in mcp_servers if s is not None]
 
@@ -172,43 +305,109 @@ class NacosHttpClient:
     async def get_mcp_servers(self) -> list[McpServer]:
         """Loading the remote MCP servers from Nacos Server.
 
-        This asynchronous method retrieves a list of MCP servers from the Nacos Server.
-        It uses pagination to continuously fetch server information until all server information is obtained.
-        The method first initializes the list of MCP servers and pagination parameters, then enters a loop to call
-        the get_mcp_servers_by_page method to get the total number of servers and server list for the current page.
-        If the total number of servers is 0 or the server list is empty, it means there are no servers available, and the loop ends.
-        Otherwise, the server list for the current page is added to the result list. If the number of servers collected reaches the total number,
-        it means all server information has been collected, and the loop ends. Otherwise, the page number is incremented and the loop continues until all servers are collected.
+        This asynchronous method collects all MCP servers streamed by iter_mcp_servers, see
+        iter_mcp_servers for how pages are fetched.
 
         Returns:
             list[McpServer]: A list of MCP servers.
         """
-        mcp_servers, page_no, page_size = [], 1, 100
+        return [mcp_server async for mcp_server in self.iter_mcp_servers()]
+
+    async def iter_mcp_servers(self, reuse: ReuseMcpServer | None = None) -> AsyncIterator[McpServer]:
+        """Stream the remote MCP servers from Nacos Server as soon as their details are fetched.
+
+        In pipelined mode (NACOS_PIPELINED_FETCH=true, the default) the first page tells the total count,
+        the remaining list pages are then requested ahead of time (at most NACOS_PAGE_PREFETCH in flight)
+        and their detail fetches overlap with each other under the detail_fetch_limiter budget. Servers
+        are yielded in completion order.
+
+        Otherwise the pages are walked one after another: the loop ends when a page is empty or the
+        number of servers collected reaches the total count, and the servers of a page are yielded once
+        the whole page is fetched.
+
+        Args:
+            reuse (ReuseMcpServer, optional): Called with each list page item and its fingerprint, the
+                detail request of the item is skipped when it returns a server.
 
+        Yields:
+            McpServer: The MCP servers with their details.
+        """
+        self.detail_fetch_limiter.reset_stats()
+        count = 0
+        try:
+            servers = self._iter_mcp_servers_pipelined(reuse) if self.pipelined_fetch \
+                else self._iter_mcp_servers_sequential(reuse)
+            async for mcp_server in servers:
+                count += 1
+                yield mcp_server
+        finally:
+            self.last_fetch_stats = self.detail_fetch_limiter.stats
+            logger.info(f"get mcp server list, total count {count}, "
+                        f"detail fetch stats: {self.last_fetch_stats.summary()}")
+
+    async def _iter_mcp_servers_sequential(self, reuse: ReuseMcpServer | None) -> AsyncIterator[McpServer]:
+        fetched, page_no = 0, 1
         while True:
-            total_count, servers = await self.get_mcp_servers_by_page(page_no, page_size)
+            total_count, servers = await self.get_mcp_servers_by_page(page_no, _PAGE_SIZE, reuse)
             if total_count == 0 or not servers:
                 break
 
-            mcp_servers.extend(servers)
-            if len(mcp_servers) >= total_count:
+            for mcp_server in servers:
+                yield mcp_server
+
+            fetched += len(servers)
+            if fetched >= total_count:
                 break
 
             # continue to looping
             page_no += 1
 
-        logger.info(f"get mcp server list, total count {len(mcp_servers)}")
-        return mcp_servers
+    async def _iter_mcp_servers_pipelined(self, reuse: ReuseMcpServer | None) -> AsyncIterator[McpServer]:
+        success, total_count, first_items = await self.list_mcp_servers_page(1, _PAGE_SIZE)
+        if not success or total_count == 0 or not first_items:
+            return
+
+        page_count = (total_count + _PAGE_SIZE - 1) // _PAGE_SIZE
+        prefetch = asyncio.Semaphore(_PAGE_PREFETCH)
+        # None marks the end of the stream
+        fetched: asyncio.Queue[McpServer | None] = asyncio.Queue()
+
+        async def fetch_detail(m: dict) -> None:
+            mcp_server = await self._to_mcp_server(m, reuse)
+            if mcp_server is not None:
+                fetched.put_nowait(mcp_server)
+
+        async def fetch_page(page_no: int) -> None:
+            async with prefetch:
+                success, _, items = await self.list_mcp_servers_page(page_no, _PAGE_SIZE)
+            if success:
+                await asyncio.gather(*[fetch_detail(m) for m in items])
+
+        async def produce() -> None:
+            try:
+                await asyncio.gather(*[fetch_detail(m) for m in first_items],
+                                     *[fetch_page(page_no) for page_no in range(2, page_count + 1)])
+            finally:
+                fetched.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (mcp_server := await fetched.get()) is not None:
+                yield mcp_server
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
 
     async def update_mcp_tools(self, mcp_name:str, tools: list[Tool], mcp_version: str, id: str) -> bool:
         """
         Update the tools list for a specified MCP.
 
-        This asynchronous method updates the tools associated with a specific MCP by sending
-        an HTTP PUT request to the Nacos server. It first retrieves the current configuration
-        of the MCP using a GET request. If the retrieval is unsuccessful, it logs a warning
-        and returns False. If successful, it parses the tool parameters and sends a PUT request
-        to update the tools list.
+        This method retrieves the current configuration of the MCP using a GET request, and updates the
+        tools list with an HTTP PUT request to the Nacos server. The PUT is skipped when the tools list and
+        the version held by Nacos are already the same. Concurrent updates of the same MCP with the same
+        tools list share one request, updates with another tools list wait for the running one.
 
         Args:
            mcp_name (str): The name of the MCP for which the tools list needs to be updated.
@@ -218,6 +417,32 @@ class NacosHttpClient:
         Returns:
            bool: True if the update was successful, otherwise False.
         """
+        key = id if id != "" else mcp_name
+        tool_list = _normalize_tools({"name": tool.name, "description": tool.description,
+                                      "inputSchema": tool.inputSchema} for tool in tools)
+        update = (get_tools_fingerprint(tool_list), mcp_version)
+
+        in_flight = self._tool_updates.setdefault(asyncio.get_running_loop(), {})
+        while (running := in_flight.get(key)) is not None:
+            running_update, task = running
+            if running_update == update:
+                return await asyncio.shield(task)
+            # the running update may already have written this tools list, or an older one
+            await asyncio.wait([task])
+            if in_flight.get(key) is running:
+                del in_flight[key]
+
+        task = asyncio.ensure_future(self._update_mcp_tools(mcp_name, tool_list, update[0], mcp_version, id))
+        running = in_flight[key] = (update, task)
+
+        def done(_):
+            if in_flight.get(key) is running:
+                del in_flight[key]
+        task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    async def _update_mcp_tools(self, mcp_name: str, tool_list: list[dict], fingerprint: str,
+                                mcp_version: str, id: str) -> bool:
         params = {}
         if self.namespaceId != "":
             params['namespaceId'] = self.namespaceId
@@ -240,12 +465,19 @@ class NacosHttpClient:
         if not success:
             logger.warning(f"failed to update mcp tools list, uri {uri}")
             return False
+
+        registered_tools = (data.get('toolSpec') or {}).get('tools') or []
+        if data.get('version') == mcp_version \
+                and get_tools_fingerprint(_normalize_tools(registered_tools)) == fingerprint:
+            logger.info(f"Tools of mcp server {mcp_name} are unchanged, skip updating")
+            return True
+
         data["versionDetail"] = {"version": mcp_version}
         
         if self.namespaceId != "":
             data["namespaceId"] = self.namespaceId
 
-        params = _parse_tool_params(data, mcp_name, tools)
+        params = _parse_tool_params(data, mcp_name, tool_list)
 
         logger.info(f"Trying to update mcp tools with params {json.dumps(params, ensure_ascii=False)}")
 
@@ -258,6 +490,262 @@ class NacosHttpClient:
 
         return success
 
+    async def list_config_md5s(self, group: str, page_size: int = 500) -> tuple[bool, dict[str, str]]:
+        """List the md5 of every config in a group, returns (success, {dataId: md5})."""
+        md5s, page_no = {}, 1
+        while True:
+            params = {'pageNo': page_no, 'pageSize': page_size, 'groupName': group, 'dataId': '', 'search': 'blur'}
+            if self.namespaceId != "":
+                params['namespaceId'] = self.namespaceId
+            success, data = await self.request_nacos('/nacos/v3/admin/cs/config/list?' + urllib.parse.urlencode(params))
+            if not success:
+                logger.warning(f"failed to list configs, group {group}, page {page_no}")
+                return False, md5s
+
+            items = data.get('pageItems') or []
+            for item in items:
+                md5s[item['dataId']] = item.get('md5') or ''
+            if not items or len(md5s) >= data.get('totalCount', 0):
+                return True, md5s
+            page_no += 1
+
+    async def get_config_md5(self, data_id: str, group: str) -> tuple[bool, str]:
+        """Get the md5 of a config, an empty md5 means the config doesn't exist."""
+        params = {'dataId': data_id, 'groupName': group}
+        if self.namespaceId != "":
+            params['namespaceId'] = self.namespaceId
+        try:
+            response = await self._send('/nacos/v3/admin/cs/config?' + urllib.parse.urlencode(params))
+        except Exception as e:
+            logger.warning(f"failed to get config, dataId {data_id}, group {group}, error: {e}")
+            return False, ''
+        if response.status_code == 404:
+            return True, ''
+        if response.status_code != 200:
+            logger.warning(f"failed to get config, dataId {data_id}, group {group}, code: {response.status_code}")
+            return False, ''
+        data = json_util.loads(response.content).get("data") or {}
+        if data.get('md5'):
+            return True, data['md5']
+        content = data.get('content')
+        return True, get_md5(content) if content else ''
+
+    async def listen_configs(self, configs: dict[tuple[str, str], str],
+                             timeout_ms: int = _LONG_POLL_TIMEOUT_MS) -> list[tuple[str, str]] | None:
+        """
+        Long poll Nacos Server until one of the watched configs changes.
+
+        The request is held by Nacos for up to `timeout_ms` and returns as soon as the md5 of a watched
+        config differs from the given one, so changes are seen right away without polling the registry.
+        Watched sets larger than the per-request limit are split into concurrent listener requests and
+        the first one that returns wins.
+
+        Args:
+            configs (dict[tuple[str, str], str]): The md5 of the watched configs, keyed by (dataId, group).
+            timeout_ms (int): How long Nacos holds the request when nothing changes.
+
+        Returns:
+            list[tuple[str, str]] | None: The (dataId, group) of the changed configs, an empty list if nothing
+                changed before the timeout, None if the request failed.
+        """
+        if not configs:
+            await asyncio.sleep(timeout_ms / 1000)
+            return []
+
+        keys = list(configs.items())
+        chunks = [dict(keys[i:i + _MAX_CONFIGS_PER_LISTENER]) for i in range(0, len(keys), _MAX_CONFIGS_PER_LISTENER)]
+        if len(chunks) == 1:
+            return await self._listen_configs_chunk(chunks[0], timeout_ms)
+
+        tasks = [asyncio.create_task(self._listen_configs_chunk(chunk, timeout_ms)) for chunk in chunks]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            changed, failed = [], False
+            for task in done:
+                result = task.result()
+                if result is None:
+                    failed = True
+                else:
+                    changed.extend(result)
+            return None if failed and not changed else changed
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _listen_configs_chunk(self, configs: dict[tuple[str, str], str], timeout_ms: int) -> list[tuple[str, str]] | None:
+        tenant = self.namespaceId
+        listening = "".join(
+            _WORD_SEPARATOR.join([data_id, group, md5] + ([tenant] if tenant else [])) + _LINE_SEPARATOR
+            for (data_id, group), md5 in configs.items())
+        try:
+            response = await self._send('/nacos/v1/cs/configs/listener',
+                                        method='POST',
+                                        data={'Listening-Configs': listening},
+                                        content_type=CONTENT_TYPE_URLENCODED,
+                                        extra_headers={'Long-Pulling-Timeout': str(timeout_ms)},
+                                        timeout=timeout_ms / 1000 + 10,
+                                        track_latency=False)
+        except Exception as e:
+            logger.warning(f"failed to listen configs with NACOS server, error: {e}")
+            return None
+        if response.status_code != 200:
+            logger.warning(f"failed to listen configs with NACOS server, code: {response.status_code}, "
+                           f"response: {response.content}")
+            return None
+
+        changed = []
+        for line in urllib.parse.unquote(response.text).split(_LINE_SEPARATOR):
+            words = line.split(_WORD_SEPARATOR)
+            if len(words) >= 2:
+                changed.append((words[0], words[1]))
+        return changed
+
+    async def _send(self, uri: str,
+                    method: str = 'GET',
+                    data=None,
+                    content_type: str = CONTENT_TYPE_JSON,
+                    extra_headers: dict[str, str] | None = None,
+                    timeout: float | None = None,
+                    track_latency: bool = True) -> httpx.Response:
+        """
+        Send an authenticated request to the NACOS cluster and return the raw response.
+
+        With token authentication the cached access token is sent instead of the username and password,
+        a request rejected with 401/403 is retried once with a freshly issued token.
+        """
+        token = await self.token_manager.get_token() if self.token_manager is not None else None
+        response = await self._send_to_cluster(uri, method, data, self._build_headers(content_type, extra_headers, token),
+                                               timeout, track_latency)
+        if token is not None and self.token_manager is not None and response.status_code in (401, 403):
+            logger.info(f"access token rejected by NACOS server, uri: {uri}, code: {response.status_code}, login again")
+            self.token_manager.invalidate(token)
+            token = await self.token_manager.get_token()
+            response = await self._send_to_cluster(uri, method, data, self._build_headers(content_type, extra_headers, token),
+                                                   timeout, track_latency)
+        return response
+
+    def _build_headers(self, content_type: str, extra_headers: dict[str, str] | None, token: str | None) -> dict[str, str]:
+        headers = {"Content-Type": content_type,
+                   "charset": "utf-8"}
+        if token is not None:
+            headers["accessToken"] = token
+        else:
+            headers["userName"] = self.userName
+            headers["password"] = self.passwd
+        if extra_headers:
+            headers.update(extra_headers)
+        self._inject_auth_info(headers)
+        return headers
+
+    async def _login(self) -> tuple[str, float] | None:
+        """Log in to the NACOS server, returns the access token and its ttl in seconds."""
+        headers = {"Content-Type": CONTENT_TYPE_URLENCODED, "charset": "utf-8"}
+        data = {"username": self.userName, "password": self.passwd}
+        for uri in ('/nacos/v3/auth/user/login', '/nacos/v1/auth/login'):
+            try:
+                response = await self._send_to_cluster(uri, 'POST', data, headers)
+            except Exception as e:
+                logger.warning(f"failed to login NACOS server, uri: {uri}, error: {e}")
+                return None
+            if response.status_code == 404:
+                continue
+            if response.status_code != 200:
+                logger.warning(f"failed to login NACOS server, uri: {uri}, code: {response.status_code}")
+                return None
+            try:
+                body = json_util.loads(response.content)
+                if isinstance(body.get("data"), dict):
+                    body = body["data"]
+                token = body.get("accessToken")
+            except Exception as e:
+                logger.warning(f"failed to parse login response of NACOS server, uri: {uri}, error: {e}")
+                return None
+            if not token:
+                return None
+            logger.info("logged in to NACOS server with access token")
+            return token, float(body.get("tokenTtl") or 18000)
+        return None
+
+    async def _send_to_cluster(self, uri: str,
+                               method: str,
+                               data,
+                               headers: dict[str, str],
+                               timeout: float | None = None,
+                               track_latency: bool = True) -> httpx.Response:
+        """
+        Send a request to the NACOS cluster, guarded by the circuit breaker.
+
+        A request is failed when no node could be reached or the node answered with a server error.
+        Failed GET requests are retried with a jittered exponential backoff, other requests are sent once.
+        The circuit breaker counts a request once, as failed when its last attempt failed. While it is open,
+        requests fail right away with `CircuitOpenError`.
+        """
+        if not self.circuit_breaker.allow():
+            raise CircuitOpenError(f"circuit breaker of NACOS server is open, uri: {uri}")
+        attempts = self.retry_policy.max_attempts if method == "GET" else 1
+        attempt = 1
+        while True:
+            try:
+                response = await self._send_to_nodes(uri, method, data, headers, timeout, track_latency)
+            except httpx.TransportError:
+                if attempt >= attempts:
+                    self.circuit_breaker.record_failure()
+                    raise
+            else:
+                if response.status_code < 500:
+                    self.circuit_breaker.record_success()
+                    return response
+                if attempt >= attempts:
+                    self.circuit_breaker.record_failure()
+                    return response
+            delay = self.retry_policy.delay(attempt - 1)
+            logger.info(f"retry request to NACOS server in {delay:.2f}s, uri: {uri}, attempt: {attempt + 1}/{attempts}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send_to_nodes(self, uri: str,
+                             method: str,
+                             data,
+                             headers: dict[str, str],
+                             timeout: float | None = None,
+                             track_latency: bool = True) -> httpx.Response:
+        """
+        Send a request to the NACOS cluster through the pooled client.
+
+        The request goes to the best node picked by the cluster, and fails over to the next node when
+        the node can't be reached. Requests that may change data only fail over when they surely didn't
+        reach the node (connect errors), read-only requests fail over on any transport error.
+        """
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError("Invalid method")
+
+        client = self._get_client()
+        request_timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        failover_errors = (httpx.TransportError,) if method == "GET" else (httpx.ConnectError, httpx.ConnectTimeout)
+        last_error: Exception | None = None
+        for node in self.cluster.candidates():
+            url = f"{self.schema}://{node.address}{uri}"
+            started_at = time.monotonic()
+            try:
+                response = await client.request(method, url, headers=headers,
+                                                 data=data if method in ("POST", "PUT") else None,
+                                                 timeout=request_timeout)
+            except failover_errors as e:
+                self.cluster.record_unreachable(node)
+                logger.warning(f"failed to reach NACOS server {node.address}, uri: {uri}, error: {e!r}, trying next node")
+                last_error = e
+                continue
+
+            latency = time.monotonic() - started_at if track_latency else None
+            if response.status_code >= 500:
+                self.cluster.record_error(node, latency)
+            else:
+                self.cluster.record_success(node, latency)
+            return response
+
+        raise last_error if last_error is not None else RuntimeError("no nacos server available")
+
     async def request_nacos(self, uri,
                             method='GET',
                             data=None,
@@ -285,24 +773,10 @@ class NacosHttpClient:
         """
 
         try:
-            url = f"{self.schema}://{self.nacosAddr}{uri}"
-            headers = {"Content-Type": content_type,
-                       "charset": "utf-8",
-                       "userName": self.userName,
-                       "password": self.passwd}
-            self._inject_auth_info(headers)
-
-            async with httpx.AsyncClient() as client:
-                if method == "GET":
-                    response = await client.get(url, headers=headers)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, data=data)
-                elif method == "PUT":
-                    response = await client.put(url, headers=headers, data=data)
-                elif method == "DELETE":
-                    response = await client.delete(url, headers=headers)
-                else:
-                    raise ValueError("Invalid method")
+            response = await self._send(uri, method, data, content_type)
+        except CircuitOpenError as e:
+            logger.warning(str(e))
+            return False, {}
         except Exception as e:
             logger.warning(f"failed to request with NACOS server, uri: {uri}, error: {e}", exc_info=e)
             return False, {}
@@ -313,22 +787,37 @@ class NacosHttpClient:
             return False, {}
 
         try:
-            return True, json.loads(response.content.decode("utf-8")).get("data")
+            return True, json_util.loads(response.content).get("data")
         except Exception as e:
             logger.warning(f"failed to parse response with NACOS server, uri: {uri}, error: {e}")
             return False, {}
 
 
-def _parse_tool_params(data, mcp_name, tools) -> dict[str, str]:
-    tool_list = map(
-        lambda tool: {
-            "name": tool.name,
-            "description": tool.description,
-            "inputSchema": tool.inputSchema
-        },
-        tools
-    )
+def get_mcp_config_keys(mcp_id: str, mcp_version: str) -> list[tuple[str, str]]:
+    """The (dataId, group) of the configs Nacos stores an MCP server in: its version index,
+    and the server and tool specification of the given version."""
+    return [(f"{mcp_id}-mcp-versions.json", MCP_SERVER_VERSIONS_GROUP),
+            (f"{mcp_id}-{mcp_version}-mcp-server.json", MCP_SERVER_GROUP),
+            (f"{mcp_id}-{mcp_version}-mcp-tools.json", MCP_TOOLS_GROUP)]
+
+def get_list_item_fingerprint(item: dict) -> str:
+    """Fingerprint of an mcp list page item, any change of the basic info (id, version,
+    description, endpoints, update markers...) changes the fingerprint."""
+    return get_md5(json.dumps(item, sort_keys=True, ensure_ascii=False, default=str))
+
+def _normalize_tools(tools) -> list[dict]:
+    """Keep the fields of the tools registered in Nacos, in their original order."""
+    return [{"name": tool.get("name"),
+             "description": tool.get("description"),
+             "inputSchema": tool.get("inputSchema")} for tool in tools]
+
+def get_tools_fingerprint(tool_list: list[dict]) -> str:
+    """Content hash of a normalized tools list, see `_normalize_tools`. The order of the tools doesn't
+    change the hash."""
+    ordered = sorted(tool_list, key=lambda tool: tool["name"] or "")
+    return get_md5(json.dumps(ordered, sort_keys=True, ensure_ascii=False, default=str))
 
+def _parse_tool_params(data, mcp_name, tool_list) -> dict[str, str]:
     endpoint_specification = None
     if data['protocol'] != "stdio":
         endpoint_specification = {
@@ -1,7 +1,8 @@
 #-*- coding: utf-8 -*-
-import json
 from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from functools import cached_property
+from typing import List, Dict, Any, Tuple
+from . import json_util
 from .logger import NacosMcpRouteLogger
 
 
@@ -61,23 +62,41 @@ class ToolMeta:
             templates=data.get("templates", {})
         )
 
-@dataclass
 class ToolSpec:
-    tools: List[Tool]
-    tools_meta: Dict[str, ToolMeta]
-    tools_dict: Dict[str, Tool]
+    """
+    The tools of an MCP server. The raw `toolSpec` payload is kept as is, `tools`, `tools_meta` and
+    `tools_dict` are only built on first access, most servers in the registry are never installed.
+    """
+    def __init__(self, data: dict | None = None) -> None:
+        self.data = data or {}
 
     @classmethod
     def from_dict(cls, data: dict) -> "ToolSpec":
-        tool_spec = cls(
-            tools=[Tool.from_dict(t) for t in data.get("tools", [])],
-            tools_meta={k: ToolMeta.from_dict(v) for k, v in data.get("toolsMeta", {}).items()},
-            tools_dict={}
-        )
-        for tool in tool_spec.tools:
-            tool_spec.tools_dict[tool.name] = tool
+        return cls(data)
+
+    @cached_property
+    def tools(self) -> List[Tool]:
+        return [Tool.from_dict(t) for t in self.data.get("tools") or []]
+
+    @cached_property
+    def tools_meta(self) -> Dict[str, ToolMeta]:
+        return {k: ToolMeta.from_dict(v) for k, v in (self.data.get("toolsMeta") or {}).items()}
+
+    @cached_property
+    def tools_dict(self) -> Dict[str, Tool]:
+        return {tool.name: tool for tool in self.tools}
 
-        return tool_spec
+    def tool_descriptions(self) -> List[str]:
+        """Descriptions of the tools, read from the raw payload unless the tools are already built."""
+        if "tools" in self.__dict__:
+            return [tool.description for tool in self.tools if tool.description is not None]
+        return [t["description"] for t in self.data.get("tools") or [] if t.get("description") is not None]
+
+    def enabled_tools(self) -> List[Tuple[str, str]]:
+        """Names and descriptions of the tools not disabled in `toolsMeta`, read from the raw payload."""
+        meta = self.data.get("toolsMeta") or {}
+        return [(t["name"], t.get("description") or "") for t in self.data.get("tools") or []
+                if "name" in t and (meta.get(t["name"]) or {}).get("enabled", True)]
 
 # ------------------ 主结构 ------------------
 @dataclass
@@ -137,13 +156,20 @@ class NacosMcpServerConfig:
     local_server_config: Dict[str, Any] = field(default_factory=dict)
     enabled: bool = True
     capabilities: List[str] = field(default_factory=list)
-    backend_endpoints: List[BackendEndpoint] = field(default_factory=list)
-    tool_spec: ToolSpec = field(default_factory=lambda: ToolSpec(tools=[], tools_meta={}, tools_dict={}))
+    tool_spec_data: Dict[str, Any] = field(default_factory=dict, repr=False)
+    backend_endpoints_data: List[Dict[str, Any]] = field(default_factory=list, repr=False)
     front_protocol: str | None = None
+
+    @cached_property
+    def tool_spec(self) -> ToolSpec:
+        return ToolSpec.from_dict(self.tool_spec_data)
+
+    @cached_property
+    def backend_endpoints(self) -> List[BackendEndpoint]:
+        return [BackendEndpoint.from_dict(e) for e in self.backend_endpoints_data]
+
     @classmethod
     def from_dict(cls, data: dict) -> "NacosMcpServerConfig":
-        tool_spec_data = data.get("toolSpec")
-        backend_endpoints_data = data.get("backendEndpoints")
         try:
             return cls(
                 name=data["name"],
@@ -155,8 +181,8 @@ class NacosMcpServerConfig:
                 local_server_config=data.get("localServerConfig", {}) if data.get("localServerConfig") else {},
                 enabled=data.get("enabled", True),
                 capabilities=data.get("capabilities", []),
-                backend_endpoints=[BackendEndpoint.from_dict(e) for e in data.get("backendEndpoints", [])] if backend_endpoints_data else [],
-                tool_spec=ToolSpec.from_dict(tool_spec_data) if tool_spec_data else ToolSpec(tools=[], tools_meta={}, tools_dict={}),
+                tool_spec_data=data.get("toolSpec") or {},
+                backend_endpoints_data=data.get("backendEndpoints") or [],
                 id=data["id"] if data.get("id") else None
             )
         except Exception as e:
@@ -165,12 +191,11 @@ class NacosMcpServerConfig:
 
     @classmethod
     def from_string(cls, string: str) -> "NacosMcpServerConfig":
-        return cls.from_dict(json.loads(string))
+        return cls.from_dict(json_util.loads(string))
 
     def get_tool_description(self) -> str:
         des = "" if self.description is None else self.description
-        for tool in self.tool_spec.tools:
-            if tool.description is not None:
-                des += "\n" + tool.description
+        for description in self.tool_spec.tool_descriptions():
+            des += "\n" + description
 
         return des
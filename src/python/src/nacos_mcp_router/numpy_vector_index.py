@@ -0,0 +1,211 @@
+#-*- coding: utf-8 -*-
+import json
+import os
+import threading
+from typing import Any, Optional
+
+import numpy as np
+
+from .embedding_cache import EmbeddingCache
+from .logger import NacosMcpRouteLogger
+from .query_cache import LruCache
+from .vector_backend import EmbeddingFunction, Metadata, VectorBackend
+
+DTYPE_FLOAT32 = "float32"
+DTYPE_INT8 = "int8"
+
+_NUMPY_DTYPES = {DTYPE_FLOAT32: np.float32, DTYPE_INT8: np.int8}
+# unit vectors have components in [-1, 1], int8 rows store them multiplied by this scale
+_INT8_SCALE = 127.0
+# int8 rows are converted to float32 this many at a time while scoring
+_INT8_CHUNK_ROWS = 8192
+_MIN_CAPACITY = 1024
+
+
+def default_index_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".nacos_mcp_router", "vector_index")
+
+
+class NumpyVectorIndex(VectorBackend):
+    """
+    In-process exact vector search for the few tens of thousands of MCP server descriptions.
+
+    The embeddings are normalized and stored in one contiguous float32 (or int8 quantized) matrix in a
+    memory-mapped file, so a restart maps the index instead of loading it. A search of a batch of
+    queries is one matrix product followed by `argpartition` for the top k of each query. Deletes move
+    the last row into the freed one, the matrix doubles in capacity when full.
+
+    Distances are squared L2 distances between unit vectors (2 - 2 * cosine similarity), like those of
+    the default Chroma collection. The ids are saved to `index.json` after every write; a crash between
+    the two files at worst leaves stale rows, which the router overwrites on its first refresh.
+    """
+    def __init__(self, path: str, dtype: str = DTYPE_FLOAT32,
+                 embedding_function: Optional[EmbeddingFunction] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None, embedding_batch_size: int = 32,
+                 query_embedding_cache: Optional[LruCache] = None) -> None:
+        super().__init__(embedding_function, embedding_cache, embedding_batch_size, query_embedding_cache)
+        if dtype not in _NUMPY_DTYPES:
+            raise ValueError(f"unknown vector index dtype: {dtype}")
+        self.path = path
+        self.dtype = dtype
+        self._lock = threading.RLock()
+        self._ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._dim = 0
+        self._matrix: Optional[np.memmap] = None
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "index.json")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, f"vectors.{self.dtype}")
+
+    def _load(self) -> None:
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            NacosMcpRouteLogger.get_logger().warning(f"ignoring unreadable vector index {self.path}", exc_info=e)
+            return
+        if meta.get("dtype") != self.dtype or not meta.get("ids"):
+            return
+        dim, ids = int(meta["dim"]), list(meta["ids"])
+        item_size = np.dtype(_NUMPY_DTYPES[self.dtype]).itemsize
+        try:
+            capacity = os.path.getsize(self._vectors_path) // (dim * item_size)
+        except OSError:
+            capacity = 0
+        if capacity < len(ids):
+            NacosMcpRouteLogger.get_logger().warning(f"vector index {self.path} is incomplete, rebuilding it")
+            return
+        self._dim = dim
+        self._matrix = np.memmap(self._vectors_path, dtype=_NUMPY_DTYPES[self.dtype], mode="r+",
+                                 shape=(capacity, dim))
+        self._ids = ids
+        self._rows = {id: row for row, id in enumerate(ids)}
+
+    def _save(self) -> None:
+        if self._matrix is not None:
+            self._matrix.flush()
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self._dim, "dtype": self.dtype, "ids": self._ids}, f, ensure_ascii=False)
+        os.replace(tmp, self._meta_path)
+
+    def _ensure_capacity(self, rows: int) -> np.memmap:
+        """The matrix, grown to hold at least `rows` vectors."""
+        if self._matrix is not None and self._matrix.shape[0] >= rows:
+            return self._matrix
+        capacity = max(rows, _MIN_CAPACITY, 2 * (self._matrix.shape[0] if self._matrix is not None else 0))
+        tmp = self._vectors_path + ".tmp"
+        grown = np.memmap(tmp, dtype=_NUMPY_DTYPES[self.dtype], mode="w+", shape=(capacity, self._dim))
+        if self._matrix is not None:
+            grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+        grown.flush()
+        del grown
+        self._matrix = None
+        os.replace(tmp, self._vectors_path)
+        self._matrix = np.memmap(self._vectors_path, dtype=_NUMPY_DTYPES[self.dtype], mode="r+",
+                                 shape=(capacity, self._dim))
+        return self._matrix
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.dtype == DTYPE_INT8:
+            return np.clip(np.rint(vectors * _INT8_SCALE), -127, 127).astype(np.int8)
+        return vectors
+
+    def update_data(self, ids: list[str], metadatas: Optional[list[Metadata]] = None,
+                    documents: Optional[list[str]] = None, keys: Optional[list[str]] = None) -> None:
+        if documents is None or len(documents) != len(ids):
+            raise ValueError("a document is required for every id")
+        if not ids:
+            return
+        vectors = self._normalize(np.asarray(self.embed_documents(documents, keys), dtype=np.float32))
+        with self._lock:
+            if self._ids and vectors.shape[1] != self._dim:
+                raise ValueError(f"embedding dimension {vectors.shape[1]} doesn't match the index ({self._dim})")
+            if not self._ids and vectors.shape[1] != self._dim:
+                # an empty index takes the dimension of the embedding model
+                self._dim = vectors.shape[1]
+                self._matrix = None
+            new_ids = [id for id in dict.fromkeys(ids) if id not in self._rows]
+            matrix = self._ensure_capacity(len(self._ids) + len(new_ids))
+            for id in new_ids:
+                self._rows[id] = len(self._ids)
+                self._ids.append(id)
+            rows = np.fromiter((self._rows[id] for id in ids), dtype=np.int64, count=len(ids))
+            matrix[rows] = self._encode(vectors)
+            self._save()
+
+    def delete_data(self, ids: list[str]) -> None:
+        with self._lock:
+            matrix = self._matrix
+            if matrix is None:
+                return
+            deleted = False
+            for id in ids:
+                row = self._rows.pop(id, None)
+                if row is None:
+                    continue
+                deleted = True
+                last = len(self._ids) - 1
+                if row != last:
+                    moved = self._ids[last]
+                    matrix[row] = matrix[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                self._ids.pop()
+            if deleted:
+                self._save()
+
+    def get_all_ids(self) -> list[str]:
+        with self._lock:
+            return list(self._ids)
+
+    def _scores(self, queries: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        """Cosine similarities of the queries (rows) with the vectors (rows) of `matrix`."""
+        count = matrix.shape[0]
+        if self.dtype == DTYPE_FLOAT32:
+            return queries @ matrix.T
+        scores = np.empty((queries.shape[0], count), dtype=np.float32)
+        for start in range(0, count, _INT8_CHUNK_ROWS):
+            block = matrix[start:start + _INT8_CHUNK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores / _INT8_SCALE
+
+    def search(self, vectors: np.ndarray, k: int) -> tuple[list[list[str]], list[list[float]]]:
+        """The ids and distances of the k nearest vectors of each query vector, closest first."""
+        queries = self._normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            size = len(self._ids)
+            k = min(k, size)
+            if k <= 0 or self._matrix is None:
+                return [[] for _ in queries], [[] for _ in queries]
+            scores = self._scores(queries, self._matrix[:size])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            ids = [[self._ids[row] for row in rows] for rows in top.tolist()]
+        distances = np.clip(2 - 2 * top_scores, 0, None)
+        return ids, distances.tolist()
+
+    def query_batch(self, queries: list[str], count: int) -> dict[str, Any]:
+        NacosMcpRouteLogger.get_logger().info(f"Querying vector index {queries}")
+        ids, distances = self.search(np.asarray(self._embed_queries(queries), dtype=np.float32), count)
+        return {"ids": ids, "distances": distances}
@@ -0,0 +1,80 @@
+#-*- coding: utf-8 -*-
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key of a query text: NFKC, lower case, whitespace collapsed. Unlike keyword matching the
+    spaces are kept, they separate the words the embedding model sees.
+    """
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip().lower()
+
+
+class LruCache(Generic[V]):
+    """
+    Thread safe LRU cache with an optional time to live, counting hits and misses so it can be sized.
+    A `max_size` of 0 disables the cache, a `ttl` of 0 or less keeps entries until they are evicted.
+    """
+    def __init__(self, max_size: int, ttl: float = 0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and self._clock() - entry[0] >= self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: V) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
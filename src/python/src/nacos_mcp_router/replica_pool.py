@@ -0,0 +1,259 @@
+#-*- coding: utf-8 -*-
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional, Protocol, TypeVar
+
+import mcp.types
+
+from .logger import NacosMcpRouteLogger
+from .router_types import CustomServer
+
+T = TypeVar("T")
+
+# processes per stdio MCP server, overridden per server by "minReplicas" / "maxReplicas" in its config.
+# a maximum of 1 keeps the single process of a plain CustomServer
+_MIN_REPLICAS = int(os.getenv("STDIO_MIN_REPLICAS", 1))
+_MAX_REPLICAS = int(os.getenv("STDIO_MAX_REPLICAS", 1))
+# outstanding requests on every replica that start one more replica
+_SCALE_UP_OUTSTANDING = int(os.getenv("STDIO_SCALE_UP_OUTSTANDING", 2))
+# seconds a replica above the minimum may stay idle before it is stopped
+_REPLICA_IDLE_TIMEOUT = float(os.getenv("STDIO_REPLICA_IDLE_TIMEOUT", 120))
+_CHECK_INTERVAL = 10.0
+
+
+def replica_bounds(name: str, config: dict[str, Any]) -> tuple[int, int]:
+    """Minimum and maximum number of processes of a stdio MCP server."""
+    server_config = config['mcpServers'][name]
+    min_replicas = max(1, int(server_config.get('minReplicas', _MIN_REPLICAS)))
+    max_replicas = max(min_replicas, int(server_config.get('maxReplicas', _MAX_REPLICAS)))
+    return min_replicas, max_replicas
+
+
+def create_mcp_server(name: str, config: dict[str, Any]) -> "CustomServer | StdioReplicaPool":
+    """A CustomServer, or a pool of them for stdio servers that may run more than one process."""
+    protocol = config['mcpServers'][name].get('protocol')
+    if protocol not in ('mcp-sse', 'mcp-streamable'):
+        min_replicas, max_replicas = replica_bounds(name, config)
+        if max_replicas > 1:
+            return StdioReplicaPool(name, config, min_replicas=min_replicas, max_replicas=max_replicas)
+    return CustomServer(name=name, config=config)
+
+
+class ReplicaServer(Protocol):
+    """What the pool needs of the server of one replica, a `CustomServer` running one process."""
+    async def wait_for_initialization(self) -> None: ...
+
+    async def healthy(self) -> bool: ...
+
+    def check_registry_version(self, version: Optional[str]) -> None: ...
+
+    async def get_initialized_response(self, client_headers: dict[str, str] = ...) -> mcp.types.InitializeResult: ...
+
+    async def list_tools_with_headers(self, client_headers: dict[str, str] = ...) -> list[mcp.types.Tool]: ...
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any],
+                        client_headers: dict[str, str] = ...) -> Any: ...
+
+    async def execute_tool(self, tool_name: str, arguments: dict[str, Any], retries: int = ..., delay: float = ...,
+                           client_headers: dict[str, str] = ...) -> Any: ...
+
+    def health_stats(self) -> dict: ...
+
+    async def cleanup(self) -> None: ...
+
+
+class _Replica:
+    def __init__(self, server: ReplicaServer) -> None:
+        self.server = server
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+
+
+class StdioReplicaPool:
+    """
+    Several processes of one stdio MCP server, each a `CustomServer` with its own session, behind the
+    interface of a single `CustomServer`. A stdio session is one pipe, replicas let slow tools of
+    concurrent clients run side by side.
+
+    Every request goes to the healthy replica with the fewest outstanding requests. When all of them
+    have `scale_up_outstanding` or more, one more replica is started, up to `max_replicas`; the requests
+    don't wait for it. Requests finding no healthy replica wait for the start-up of a single new one,
+    within `max_replicas` too. Replicas idle for `idle_timeout` are stopped down to `min_replicas`,
+    unhealthy ones are stopped and replaced by a background task, once a replica came up.
+    """
+    def __init__(self, name: str, config: dict[str, Any],
+                 min_replicas: int = _MIN_REPLICAS,
+                 max_replicas: int = _MAX_REPLICAS,
+                 scale_up_outstanding: int = _SCALE_UP_OUTSTANDING,
+                 idle_timeout: float = _REPLICA_IDLE_TIMEOUT,
+                 check_interval: float = _CHECK_INTERVAL,
+                 factory: Optional[Callable[[], ReplicaServer]] = None) -> None:
+        self.name = name
+        self.config = config
+        self._protocol = 'stdio'
+        self.min_replicas = max(1, min_replicas)
+        self.max_replicas = max(self.min_replicas, max_replicas)
+        self.scale_up_outstanding = max(1, scale_up_outstanding)
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self._factory: Callable[[], ReplicaServer] = factory or (lambda: CustomServer(name=name, config=config))
+        self._replicas: list[_Replica] = []
+        self._starting = 0
+        self._registry_version: Optional[str] = None
+        self._closed = False
+        self.dispatched = 0
+        self.scale_ups = 0
+        self.scale_downs = 0
+        self.replaced = 0
+        self._initialized_event = asyncio.Event()
+        self._background: set[asyncio.Task] = set()
+        self._maintain_task: Optional[asyncio.Task] = None
+        # the start-up of a replica awaited by all the requests that found no healthy replica
+        self._replacement: Optional[asyncio.Future[Optional[_Replica]]] = None
+        self._spawn(self._initialize())
+
+    def __len__(self) -> int:
+        return len(self._replicas)
+
+    def _spawn(self, coro: Awaitable[Any]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _initialize(self) -> None:
+        try:
+            await asyncio.gather(*(self._add_replica() for _ in range(self.min_replicas)))
+        finally:
+            self._initialized_event.set()
+
+    async def _add_replica(self) -> Optional[_Replica]:
+        self._starting += 1
+        try:
+            server = self._factory()
+            await server.wait_for_initialization()
+            if self._closed or not await server.healthy():
+                await server.cleanup()
+                return None
+            if self._registry_version is not None:
+                server.check_registry_version(self._registry_version)
+            replica = _Replica(server)
+            self._replicas.append(replica)
+            # replicas are maintained once one came up, a pool that never started one is left to be cleaned up
+            if self._maintain_task is None or self._maintain_task.done():
+                self._maintain_task = asyncio.create_task(self._maintain())
+            return replica
+        finally:
+            self._starting -= 1
+
+    async def _scale_up(self) -> None:
+        if await self._add_replica() is not None:
+            self.scale_ups += 1
+            NacosMcpRouteLogger.get_logger().info(f"started replica {len(self._replicas)} of mcp server {self.name}")
+
+    async def _remove_replica(self, replica: _Replica) -> None:
+        if replica in self._replicas:
+            self._replicas.remove(replica)
+        await replica.server.cleanup()
+
+    async def _healthy_replicas(self) -> list[_Replica]:
+        return [replica for replica in self._replicas if await replica.server.healthy()]
+
+    async def _acquire(self) -> _Replica:
+        """The least loaded healthy replica, starting one more when every replica is busy."""
+        replicas = await self._healthy_replicas()
+        if not replicas:
+            return await self._replace()
+        replica = min(replicas, key=lambda r: r.in_flight)
+        if replica.in_flight >= self.scale_up_outstanding and self._starting == 0 \
+                and len(self._replicas) < self.max_replicas and not self._closed:
+            self._spawn(self._scale_up())
+        return replica
+
+    async def _replace(self) -> _Replica:
+        """A new replica for the requests that found none healthy, they all wait for the same start-up."""
+        if self._replacement is None or self._replacement.done():
+            if self._closed or len(self._replicas) + self._starting >= self.max_replicas:
+                raise RuntimeError(f"Server {self.name} has no healthy replica")
+            self._replacement = asyncio.ensure_future(self._add_replica())
+        replica = await asyncio.shield(self._replacement)
+        if replica is None:
+            raise RuntimeError(f"Server {self.name} has no healthy replica")
+        return replica
+
+    async def _dispatch(self, operation: Callable[[ReplicaServer], Awaitable[T]]) -> T:
+        replica = await self._acquire()
+        self.dispatched += 1
+        replica.in_flight += 1
+        try:
+            return await operation(replica.server)
+        finally:
+            replica.in_flight -= 1
+            replica.last_used = time.monotonic()
+
+    async def _maintain(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.check_interval)
+            now = time.monotonic()
+            for replica in list(self._replicas):
+                if replica.in_flight == 0 and not await replica.server.healthy():
+                    self.replaced += 1
+                    await self._remove_replica(replica)
+            idle = sorted((r for r in self._replicas if r.in_flight == 0 and now - r.last_used >= self.idle_timeout),
+                          key=lambda r: r.last_used)
+            for replica in idle[:max(0, len(self._replicas) - self.min_replicas)]:
+                self.scale_downs += 1
+                await self._remove_replica(replica)
+            while len(self._replicas) + self._starting < self.min_replicas and not self._closed:
+                if await self._add_replica() is None:
+                    break
+
+    async def wait_for_initialization(self) -> None:
+        await self._initialized_event.wait()
+
+    async def healthy(self) -> bool:
+        return bool(await self._healthy_replicas())
+
+    def check_registry_version(self, version: Optional[str]) -> None:
+        self._registry_version = version
+        for replica in self._replicas:
+            replica.server.check_registry_version(version)
+
+    async def get_initialized_response(self, client_headers: dict[str, str] = {}) -> mcp.types.InitializeResult:
+        return await self._dispatch(lambda server: server.get_initialized_response(client_headers))
+
+    async def list_tools(self) -> list[mcp.types.Tool]:
+        return await self.list_tools_with_headers(client_headers={})
+
+    async def list_tools_with_headers(self, client_headers: dict[str, str] = {}) -> list[mcp.types.Tool]:
+        return await self._dispatch(lambda server: server.list_tools_with_headers(client_headers))
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any], client_headers: dict[str, str] = {}) -> Any:
+        return await self._dispatch(lambda server: server.call_tool(tool_name, arguments, client_headers))
+
+    async def execute_tool(self, tool_name: str, arguments: dict[str, Any], retries: int = 2, delay: float = 1.0,
+                           client_headers: dict[str, str] = {}) -> Any:
+        return await self._dispatch(lambda server: server.execute_tool(tool_name, arguments, retries, delay,
+                                                                       client_headers))
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self._replicas),
+            "starting": self._starting,
+            "in_flight": [replica.in_flight for replica in self._replicas],
+            "dispatched": self.dispatched,
+            "scale_ups": self.scale_ups,
+            "scale_downs": self.scale_downs,
+            "replaced": self.replaced,
+        }
+
+    def health_stats(self) -> dict:
+        return {**self.stats(), "replica_health": [replica.server.health_stats() for replica in self._replicas]}
+
+    async def cleanup(self) -> None:
+        self._closed = True
+        if self._maintain_task is not None:
+            self._maintain_task.cancel()
+            self._maintain_task = None
+        replicas, self._replicas = self._replicas, []
+        await asyncio.gather(*(replica.server.cleanup() for replica in replicas))
@@ -0,0 +1,63 @@
+#-*- coding: utf-8 -*-
+import heapq
+from dataclasses import dataclass, field
+from typing import Mapping, Sequence
+
+from .router_types import McpServer
+
+FUSION_RRF = "rrf"
+FUSION_WEIGHTED = "weighted"
+
+SOURCE_KEYWORD = "keyword"
+SOURCE_VECTOR = "vector"
+
+
+@dataclass
+class FusionOptions:
+    """
+    How the results of the keyword and vector retrievals are merged, like the rerank processors of the
+    TypeScript router: score, filter by `min_score`, sort, and keep the best `limit` servers.
+
+    With reciprocal rank fusion a server scores `weight / (rrf_k + rank)` in every result list it
+    appears in. With weighted fusion the scores of each list are divided by the best score of that list
+    and summed with the weights of the lists.
+    """
+    limit: int = 5
+    strategy: str = FUSION_RRF
+    weights: dict[str, float] = field(default_factory=lambda: {SOURCE_KEYWORD: 1.0, SOURCE_VECTOR: 1.0})
+    min_score: float = 0.0
+    rrf_k: int = 60
+
+    def __post_init__(self) -> None:
+        if self.strategy not in (FUSION_RRF, FUSION_WEIGHTED):
+            raise ValueError(f"unknown search fusion strategy: {self.strategy}")
+
+
+def fuse(results: Mapping[str, Sequence[tuple[McpServer, float]]],
+         options: FusionOptions) -> list[tuple[McpServer, float]]:
+    """
+    Merge ranked result lists, keyed by their source, into the best `options.limit` servers with their
+    fused score, best first. Each list must be ordered best first, servers are identified by name.
+    """
+    servers: dict[str, McpServer] = {}
+    scores: dict[str, float] = {}
+    for source, hits in results.items():
+        weight = options.weights.get(source, 1.0)
+        if not hits or weight == 0:
+            continue
+        best = max(score for _, score in hits)
+        seen = set()
+        for rank, (server, score) in enumerate(hits, start=1):
+            name = str(server.get_name())
+            if name in seen:
+                continue
+            seen.add(name)
+            servers.setdefault(name, server)
+            if options.strategy == FUSION_RRF:
+                contribution = weight / (options.rrf_k + rank)
+            else:
+                contribution = weight * (score / best if best > 0 else 0.0)
+            scores[name] = scores.get(name, 0.0) + contribution
+
+    kept = ((name, score) for name, score in scores.items() if score >= options.min_score)
+    return [(servers[name], score) for name, score in heapq.nlargest(options.limit, kept, key=lambda item: item[1])]
@@ -0,0 +1,99 @@
+#-*- coding: utf-8 -*-
+import random
+import time
+from dataclasses import dataclass
+
+from .logger import NacosMcpRouteLogger
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Retry with exponential backoff and full jitter, the n-th retry waits a random time between zero
+    and `base_delay * 2 ** n`, capped by `max_delay`. `max_attempts` counts the first attempt too.
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+
+    def delay(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a failing service.
+
+    The circuit opens after `failure_threshold` consecutive failures and rejects every call for
+    `reset_timeout` seconds. Then it is half open and lets a single probe through: a success closes the
+    circuit, a failure opens it again. A probe that never reports back (e.g. it was cancelled) is
+    replaced after another `reset_timeout`.
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0) -> None:
+        if failure_threshold < 1:
+            raise ValueError(f"invalid circuit breaker failure threshold: {failure_threshold}")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CIRCUIT_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at: float | None = None
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return CIRCUIT_HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now, a half open circuit admits one probe at a time."""
+        state = self.state
+        if state == CIRCUIT_CLOSED:
+            return True
+        now = time.monotonic()
+        if state == CIRCUIT_HALF_OPEN and (self._probe_started_at is None
+                                           or now - self._probe_started_at >= self.reset_timeout):
+            self._state = CIRCUIT_HALF_OPEN
+            self._probe_started_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self._state != CIRCUIT_CLOSED:
+            NacosMcpRouteLogger.get_logger().info(f"circuit breaker {self.name} closed")
+        self._state = CIRCUIT_CLOSED
+        self._consecutive_failures = 0
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self._state == CIRCUIT_HALF_OPEN or (self._state == CIRCUIT_CLOSED
+                                                and self._consecutive_failures >= self.failure_threshold):
+            NacosMcpRouteLogger.get_logger().warning(
+                f"circuit breaker {self.name} opened after {self._consecutive_failures} consecutive failures, "
+                f"rejecting calls for {self.reset_timeout}s")
+            self._state = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started_at = None
+            self.times_opened += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
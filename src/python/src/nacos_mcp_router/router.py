@@ -11,17 +11,23 @@ from mcp import types
 from mcp.client.stdio import get_default_environment
 from mcp.server import Server
 
-from .constants import TRANSPORT_TYPE_STDIO, MODE_ROUTER, MODE_PROXY
+from .constants import TRANSPORT_TYPE_STDIO, MODE_ROUTER, MODE_PROXY, REFRESH_MODE_POLL
+from .constants import VECTOR_BACKEND_CHROMA, VECTOR_BACKEND_NUMPY, INDEX_GRANULARITY_SERVER, TOOL_POOLING_MAX
 from .logger import NacosMcpRouteLogger
+from .embedding_cache import EmbeddingCache, default_cache_path
+from .query_cache import LruCache
 from .mcp_manager import McpUpdater
 from .nacos_http_client import NacosHttpClient
+from .numpy_vector_index import DTYPE_FLOAT32, NumpyVectorIndex, default_index_path
+from .rerank import FusionOptions, FUSION_RRF, SOURCE_KEYWORD, SOURCE_VECTOR
 from .router_exceptions import NacosMcpRouterException
 from .router_types import ChromaDb, McpServer
 from .router_types import CustomServer
+from .replica_pool import StdioReplicaPool, create_mcp_server
 
 version_number = f"nacos-mcp-router:v{get_version('nacos-mcp-router')}"
 router_logger = NacosMcpRouteLogger.get_logger()
-mcp_servers_dict: dict[str, CustomServer] = {}
+mcp_servers_dict: dict[str, CustomServer | StdioReplicaPool] = {}
 
 mcp_updater: McpUpdater
 nacos_http_client: NacosHttpClient
@@ -104,7 +110,7 @@ async def init_proxied_mcp() -> bool:
         router_logger.info(f"proxied_mcp_server_config: {mcp_server.agent_config()}")
         proxied_mcp_server_config = mcp_server.agent_config()
 
-    mcp_server = CustomServer(name=proxied_mcp_name, config=proxied_mcp_server_config)
+    mcp_server = create_mcp_server(proxied_mcp_name, proxied_mcp_server_config)
     
     if mcp_server._protocol == 'stdio':
         await mcp_server.wait_for_initialization()
@@ -120,6 +126,7 @@ async def init_proxied_mcp() -> bool:
             await nacos_http_client.update_mcp_tools(proxied_mcp_name, tools, version, "")
         return True
     else:
+        await mcp_server.cleanup()
         return False
 
 async def filter_tools(tools:list[types.Tool], mcp_server_from_registry:McpServer) -> list[types.Tool]:
@@ -160,8 +167,11 @@ async def filter_tools(tools:list[types.Tool], mcp_server_from_registry:McpServe
 async def proxied_mcp_tools(client_headers: dict[str, str] = {}) -> list[types.Tool]:
     if await init_proxied_mcp():
         try:
-            tool_list = await mcp_servers_dict[proxied_mcp_name].list_tools_with_headers(client_headers=client_headers)
+            server = mcp_servers_dict[proxied_mcp_name]
             mcp_server_from_registry = await mcp_updater.get_mcp_server_by_name(proxied_mcp_name)
+            if mcp_server_from_registry is not None:
+                server.check_registry_version(mcp_server_from_registry.version)
+            tool_list = await server.list_tools_with_headers(client_headers=client_headers)
             if mcp_server_from_registry is not None:
                 result = await filter_tools(tool_list, mcp_server_from_registry)
                 return result
@@ -190,21 +200,17 @@ async def search_mcp_server(task_description: str, key_words: str) -> str:
             return "服务初始化中，请稍后再试"
 
         router_logger.info(f"Searching tools for {task_description}, key words: {key_words}")
-        mcp_servers1 = []
         keywords = key_words.split(",")
-        for key_word in keywords:
-            mcps = await mcp_updater.search_mcp_by_keyword(key_word)
-            mcp_servers1.extend(mcps or [])
-        router_logger.info("mcp size searched by keywords is " + str(len(mcp_servers1)))
-        if len(mcp_servers1) < 5:
-            mcp_servers2 = await mcp_updater.getMcpServer(task_description, 5 - len(mcp_servers1))
-            mcp_servers1.extend(mcp_servers2 or [])
+        matched_tools = {}
+        mcp_servers1 = await mcp_updater.search(task_description, keywords, matched_tools)
 
         result = {}
         for mcpServer in mcp_servers1:
             mname = str(mcpServer.get_name())
             dct = dict(name=mname,
                        description=mcpServer.get_description())
+            if matched_tools.get(mname):
+                dct["tools"] = matched_tools[mname]
 
             result[mname] = dct
 
@@ -275,18 +281,25 @@ async def add_mcp_server(mcp_server_name: str, client_headers: dict[str, str] =
                 if 'headers' not in server_config:
                     server_config['headers'] = {}
             router_logger.info(f"add mcp server: {mcp_server_name}, config:{mcp_server.agentConfig}")
-            server = CustomServer(name=mcp_server_name, config=mcp_server.agentConfig)
+            stale_server = mcp_servers_dict.get(mcp_server_name)
+            server = create_mcp_server(mcp_server_name, mcp_server.agentConfig)
             if server._protocol == 'stdio':
                 await server.wait_for_initialization()
                 if await server.healthy():
                     mcp_servers_dict[mcp_server_name] = server
+                else:
+                    # 未能启动的服务器也要释放，副本池否则会在后台不断重启进程
+                    await server.cleanup()
             else:
                 mcp_servers_dict[mcp_server_name] = server
+            if stale_server is not None and mcp_servers_dict.get(mcp_server_name) is server:
+                await stale_server.cleanup()
         
         if mcp_server_name not in mcp_servers_dict:
             return "failed to install mcp server: " + mcp_server_name
     
         server = mcp_servers_dict[mcp_server_name]
+        server.check_registry_version(mcp_server.version)
 
         tools = await server.list_tools_with_headers(client_headers=client_headers)
         init_result = await server.get_initialized_response(client_headers=client_headers)
@@ -326,10 +339,14 @@ def start_server() -> int:
             from mcp.server.stdio import stdio_server
 
             async def arun():
-                async with stdio_server() as streams:
-                    await mcp_app.run(
-                        streams[0], streams[1], mcp_app.create_initialization_options()
-                    )
+                mcp_updater.start()
+                try:
+                    async with stdio_server() as streams:
+                        await mcp_app.run(
+                            streams[0], streams[1], mcp_app.create_initialization_options()
+                        )
+                finally:
+                    await mcp_updater.stop()
 
             anyio.run(arun)
 
@@ -354,6 +371,7 @@ def start_server() -> int:
             @contextlib.asynccontextmanager
             async def sse_lifespan(app: Starlette) -> AsyncIterator[None]:
                 """Context manager for session manager."""
+                mcp_updater.start()
                 try:
                     if mode == MODE_PROXY:
                         if not await init_proxied_mcp():
@@ -362,6 +380,7 @@ def start_server() -> int:
                     for mcp in mcp_servers_dict.values():
                         await mcp.cleanup()
                 finally:
+                    await mcp_updater.stop()
                     router_logger.info("Application shutting down...")
 
 
@@ -409,6 +428,7 @@ def start_server() -> int:
             async def lifespan(app: Starlette) -> AsyncIterator[None]:
                 """Context manager for session manager."""
                 async with session_manager.run():
+                    mcp_updater.start()
                     try:
                         if mode == MODE_PROXY:
                             if not await init_proxied_mcp():
@@ -418,6 +438,7 @@ def start_server() -> int:
                         for mcp in mcp_servers_dict.values():
                             await mcp.cleanup()
                     finally:
+                        await mcp_updater.stop()
                         router_logger.info("Application shutting down...")
 
             starlette_app = Starlette(
@@ -508,6 +529,26 @@ def init() -> int:
         if update_interval < 10:
             update_interval = 10
 
+        incremental_refresh = os.getenv("INCREMENTAL_REFRESH", "true").lower() == "true"
+        full_refresh_every = int(os.getenv("FULL_REFRESH_EVERY", 10))
+        refresh_mode = os.getenv("REFRESH_MODE", REFRESH_MODE_POLL)
+        safety_refresh_interval = int(os.getenv("SAFETY_REFRESH_INTERVAL", 300))
+        search_options = FusionOptions(limit=int(os.getenv("SEARCH_RESULT_LIMIT", 5)),
+                                       strategy=os.getenv("SEARCH_FUSION", FUSION_RRF),
+                                       weights={SOURCE_KEYWORD: float(os.getenv("SEARCH_KEYWORD_WEIGHT", 1.0)),
+                                                SOURCE_VECTOR: float(os.getenv("SEARCH_VECTOR_WEIGHT", 1.0))},
+                                       min_score=float(os.getenv("SEARCH_MIN_SCORE", 0.0)))
+        vector_db_workers = int(os.getenv("VECTOR_DB_WORKERS", 2))
+        embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", default_cache_path())
+        embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+        query_cache_ttl = float(os.getenv("QUERY_CACHE_TTL", 600))
+        query_embedding_cache_size = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+        search_result_cache_size = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", 256))
+        vector_backend = os.getenv("VECTOR_BACKEND", VECTOR_BACKEND_CHROMA)
+        vector_index_dtype = os.getenv("VECTOR_INDEX_DTYPE", DTYPE_FLOAT32)
+        index_granularity = os.getenv("VECTOR_INDEX_GRANULARITY", INDEX_GRANULARITY_SERVER)
+        tool_pooling = os.getenv("TOOL_SCORE_POOLING", TOOL_POOLING_MAX)
+
         if proxied_mcp_server_config_str != "" :
             proxied_mcp_server_config = json.loads(proxied_mcp_server_config_str)
 
@@ -541,10 +582,27 @@ def init() -> int:
 
         if mode == MODE_PROXY and proxied_mcp_name == "":
             raise NacosMcpRouterException("proxied_mcp_name must be set in proxy mode")
+        if vector_backend not in (VECTOR_BACKEND_CHROMA, VECTOR_BACKEND_NUMPY):
+            raise NacosMcpRouterException(f"unknown vector backend: {vector_backend}")
 
         if  mode == MODE_ROUTER:
-            chroma_db_service = ChromaDb()
-            mcp_updater =  McpUpdater.create(nacos_client=nacos_http_client, chroma_db=chroma_db_service, update_interval=update_interval, enable_vector_db=True, mode=mode, proxy_mcp_name=proxied_mcp_name, enable_auto_refresh=True)
+            embedding_cache = EmbeddingCache(embedding_cache_path) if embedding_cache_path else None
+            query_embedding_cache = LruCache(query_embedding_cache_size, query_cache_ttl)
+            if vector_backend == VECTOR_BACKEND_NUMPY:
+                chroma_db_service = NumpyVectorIndex(default_index_path(), dtype=vector_index_dtype,
+                                                     embedding_cache=embedding_cache,
+                                                     embedding_batch_size=embedding_batch_size,
+                                                     query_embedding_cache=query_embedding_cache)
+            else:
+                chroma_db_service = ChromaDb(embedding_cache=embedding_cache, embedding_batch_size=embedding_batch_size,
+                                             query_embedding_cache=query_embedding_cache)
+            mcp_updater =  McpUpdater.create(nacos_client=nacos_http_client, chroma_db=chroma_db_service, update_interval=update_interval, enable_vector_db=True, mode=mode, proxy_mcp_name=proxied_mcp_name, enable_auto_refresh=True,
+                                          incremental_refresh=incremental_refresh, full_refresh_every=full_refresh_every,
+                                          refresh_mode=refresh_mode, safety_refresh_interval=safety_refresh_interval,
+                                          search_options=search_options, vector_db_workers=vector_db_workers,
+                                          search_result_cache_size=search_result_cache_size,
+                                          search_result_cache_ttl=query_cache_ttl,
+                                          index_granularity=index_granularity, tool_pooling=tool_pooling)
         else:
             if auto_register_tools:
                 mcp_updater = McpUpdater.create(nacos_client=nacos_http_client, chroma_db=None, update_interval=update_interval, enable_vector_db=False, mode=mode, proxy_mcp_name=proxied_mcp_name, enable_auto_refresh=True)
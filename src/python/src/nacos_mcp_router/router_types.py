@@ -4,13 +4,15 @@ import asyncio
 import logging
 import os
 from contextlib import AsyncExitStack
-from typing import Optional, Any
+from typing import TYPE_CHECKING, Optional, Any, cast
 
-import chromadb
 import mcp.types
-from chromadb import Metadata
-from chromadb.config import Settings
-from chromadb.api.types import OneOrMany, ID, Document, GetResult, QueryResult
+from .capability_cache import CapabilityCache, is_tools_changed
+from .embedding_cache import EmbeddingCache
+from .health_monitor import HealthMonitor, closing_receive_stream
+from .query_cache import LruCache
+from .session_pool import is_connection_error
+from .vector_backend import Metadata, VectorBackend
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 from mcp.client.stdio import StdioServerParameters, stdio_client
@@ -21,6 +23,9 @@ from .mcp_transport import McpTransport
 from .sse_transport import McpSseTransport
 from .streamable_http_transport import McpStreamableHttpTransport
 
+if TYPE_CHECKING:
+  from chromadb.api.types import Embeddable, EmbeddingFunction, GetResult, QueryResult
+
 def _stdio_transport_context(config: dict[str, Any]):
   server_params = StdioServerParameters(command=config['command'], args=config['args'] if 'args' in config else [], env=config['env'] if 'env' in config else {})
   return stdio_client(server_params)
@@ -54,6 +59,14 @@ class CustomServer:
     else:
       self._transport_context_factory = _stdio_transport_context
       self._protocol = 'stdio'
+    # initialize 结果与工具列表的缓存，服务器发送 tools/list_changed 或注册中心版本变化时失效
+    self.capabilities = CapabilityCache()
+    if self._mcp_transport is not None:
+      self._mcp_transport.on_tools_changed = self.capabilities.invalidate
+    # 健康状态由后台 ping 与请求结果维护，healthy() 只读取状态。远程服务器由连接池 ping 其会话
+    self.health = HealthMonitor(name, probe=self._ping if self._protocol == 'stdio' else None)
+    if self._mcp_transport is not None:
+      self._mcp_transport.pool.health = self.health
 
     self._server_task = asyncio.create_task(self._server_lifespan_cycle())
 
@@ -68,34 +81,73 @@ class CustomServer:
           server_config = value
       if self._protocol == 'stdio':
         async with _stdio_transport_context(server_config) as (read, write):
-          async with ClientSession(read, write) as session:
+          read = closing_receive_stream(read, lambda: self._on_session_closed("mcp server process exited"))
+          async with ClientSession(read, write, message_handler=self._handle_message) as session:
             self.session_initialized_response = await session.initialize()
             self.session = session
             self._initialized = True
             self._initialized_event.set()
+            self.health.start()
             await self.wait_for_shutdown_request()
     except Exception as e:
       NacosMcpRouteLogger.get_logger().warning("failed to init mcp server " + self.name + ", config: " + str(self.config), exc_info=e)
       self._initialized = False
       self._initialized_event.set()
       self._shutdown_event.set()
+    finally:
+      if self._protocol == 'stdio':
+        self.health.mark_closed("mcp session closed")
+
+  def _on_session_closed(self, reason: str) -> None:
+    """服务器关闭连接或进程退出后会话不再可用，结束生命周期以释放进程"""
+    self.health.mark_closed(reason)
+    self._shutdown_event.set()
+
+  async def _ping(self) -> None:
+    if self.session is None:
+      raise ConnectionError(f"Server {self.name} not initialized")
+    await self.session.send_ping()
+  async def _handle_message(self, message: Any) -> None:
+    if is_tools_changed(message):
+      self.capabilities.invalidate()
+
+  def check_registry_version(self, version: Optional[str]) -> None:
+    """注册中心中该服务器的版本变化时清空缓存的 initialize 结果与工具列表"""
+    self.capabilities.check_registry_version(version)
+
+  def _partition(self, client_headers: dict[str, str]) -> str:
+    """stdio 服务器只有一个会话，远程服务器按转发的客户端 headers 分区"""
+    if self._mcp_transport is None:
+      return ""
+    return self._mcp_transport.partition_key(client_headers)
+
   async def get_initialized_response(self, client_headers: dict[str, str] = {}) -> mcp.types.InitializeResult:
     if self._protocol == 'stdio':
       return self.session_initialized_response
     else:
       if self._mcp_transport is None:
         raise RuntimeError(f"Server {self.name} not initialized")
-      return await self._mcp_transport.handle_initialize(client_headers)
+      partition = self._partition(client_headers)
+      result = self.capabilities.get_initialize_result(partition)
+      if result is None:
+        generation = self.capabilities.generation
+        result = await self._mcp_transport.handle_initialize(client_headers)
+        self.capabilities.put_initialize_result(partition, result, generation)
+      return result
 
   async def healthy(self) -> bool:
-    """更新healthy方法，增加更详细的检查"""
+    """读取后台健康检查与请求结果维护的健康状态，不访问服务器"""
     if self._protocol == 'mcp-streamable' or self._protocol == 'mcp-sse':
-      return True
+      return self.health.healthy
     
     return (self.session is not None and 
             self._initialized and 
             not self._shutdown_event.is_set()
-            and not await self.is_session_disconnected())
+            and self.health.healthy)
+
+  def health_stats(self) -> dict:
+    """健康状态、状态变化记录及 ping 延迟"""
+    return self.health.stats()
 
   async def wait_for_initialization(self):
     await self._initialized_event.wait()
@@ -110,6 +162,15 @@ class CustomServer:
     return await self.list_tools_with_headers(client_headers={})
 
   async def list_tools_with_headers(self, client_headers: dict[str, str] = {}) -> list[mcp.types.Tool]:
+    partition = self._partition(client_headers)
+    tools = self.capabilities.get_tools(partition)
+    if tools is None:
+      generation = self.capabilities.generation
+      tools = await self._fetch_tools(client_headers)
+      self.capabilities.put_tools(partition, tools, generation)
+    return tools
+
+  async def _fetch_tools(self, client_headers: dict[str, str]) -> list[mcp.types.Tool]:
     if self._protocol == 'mcp-streamable' or self._protocol == 'mcp-sse':
       if self._mcp_transport is None:
         raise RuntimeError(f"Server {self.name} not initialized")
@@ -118,7 +179,7 @@ class CustomServer:
     else:
       if not self.session:
         raise RuntimeError(f"Server {self.name} not initialized")
-      tools_response = await self.session.list_tools()
+      tools_response = await self._stdio_request(self.session.list_tools())
       return tools_response.tools
 
   async def call_tool(self, tool_name: str, arguments: dict[str, Any], client_headers: dict[str, str] = {}) -> Any:
@@ -129,7 +190,18 @@ class CustomServer:
     else:
       if not self.session:
         raise RuntimeError(f"Server {self.name} not initialized")
-      return await self.session.call_tool(tool_name, arguments)
+      return await self._stdio_request(self.session.call_tool(tool_name, arguments))
+
+  async def _stdio_request(self, request: Any) -> Any:
+    """发送 stdio 服务器请求，请求结果作为被动的健康信号，工具自身的错误不影响健康状态"""
+    try:
+      result = await request
+    except Exception as e:
+      if is_connection_error(e):
+        self.health.record_failure(e)
+      raise
+    self.health.record_success()
+    return result
 
   async def execute_tool(
           self,
@@ -167,7 +239,11 @@ class CustomServer:
     """Clean up server resources."""
     async with self._cleanup_lock:
       try:
+        self.health.mark_closed("cleaned up")
+        self._shutdown_event.set()
         await self.exit_stack.aclose()
+        if self._mcp_transport is not None:
+          await self._mcp_transport.close()
         self.session = None
         self.stdio_context = None
       except Exception as e:
@@ -175,77 +251,16 @@ class CustomServer:
 
   async def is_session_disconnected(self, timeout: float = 5.0) -> bool:
     """
-    检查session是否断开连接
+    检查session是否断开连接，读取健康检查维护的状态
     
     Args:
-        timeout: 检测超时时间（秒）
+        timeout: 保留参数，不再主动探测
         
     Returns:
         bool: True表示连接断开，False表示连接正常
     """
-    # 基础检查：session对象是否存在
-    if not self.session:
-      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: session object is None")
-      return True
-    
-    # 检查是否已初始化
-    if not self._initialized:
-      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: not initialized")
-      return True
-    
-    # 检查是否请求关闭
-    if self._shutdown_event.is_set():
-      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: shutdown requested")
-      return True
-    
-    try:
-      # 尝试执行一个轻量级操作来测试连接
-      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: testing connection health")
-      return await self._test_connection_health(timeout)
-    except Exception as e:
-      NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: connection test failed: {e}")
-      return True
+    return not await self.healthy()
 
-  async def _test_connection_health(self, timeout: float) -> bool:
-    import anyio
-    """
-    测试连接健康状态
-    
-    Args:
-        timeout: 超时时间
-        
-    Returns:
-        bool: True表示连接断开，False表示连接正常
-    """
-    try:
-      # 使用asyncio.wait_for设置超时
-      async with asyncio.timeout(timeout):
-        if self.session is None:
-          return True
-        # 尝试调用一个简单的MCP操作
-        await self.session.list_tools()
-        # 更新最后活动时间
-        import time
-        self._last_activity_time = time.time()
-        return False  # 连接正常
-        
-    except (asyncio.TimeoutError, mcp.McpError, anyio.ClosedResourceError):
-      NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: connection test timeout after {timeout}s")
-      return True
-    except (ConnectionError, BrokenPipeError, OSError) as e:
-      NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: connection error: {e}")
-      return True
-    except Exception as e:
-      # 对于其他异常，可能是协议错误或服务器内部错误
-      # 这里可以根据具体的异常类型来判断是否是连接问题
-      error_msg = str(e).lower()
-      if any(keyword in error_msg for keyword in ['connection', 'broken', 'closed', 'reset', 'timeout']):
-        NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: connection-related error: {e}")
-        return True
-      else:
-        # 其他错误可能不是连接问题，连接可能仍然正常
-        NacosMcpRouteLogger.get_logger().error(f"Server {self.name}: non-connection error during health check", exc_info=e)
-        return False
 class McpServer:
   name: str
   description: str
@@ -254,12 +269,15 @@ class McpServer:
   mcp_config_detail: NacosMcpServerConfig
   agentConfig: dict[str, Any]
   version: str
+  # fingerprint of the item in the mcp list page this server was fetched for, used by incremental refresh
+  list_fingerprint: str
   def __init__(self, name: str, description: str, agentConfig: dict, id: str, version: str):
     self.name = name
     self.description = description
     self.agentConfig = agentConfig
     self.id = id
     self.version = version
+    self.list_fingerprint = ""
   def get_name(self) -> str:
     return self.name
   def get_description(self) -> str:
@@ -273,32 +291,58 @@ class McpServer:
       "agentConfig": self.agent_config(),
     }
 
-class ChromaDb:
-  def __init__(self) -> None:
+class ChromaDb(VectorBackend):
+  """基于 chromadb.PersistentClient 的向量库，chromadb 在创建时才导入"""
+  def __init__(self, embedding_cache: Optional[EmbeddingCache] = None, embedding_batch_size: int = 32,
+               query_embedding_cache: Optional[LruCache] = None) -> None:
+    import chromadb
+    from chromadb.config import Settings
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+    embedding_function = DefaultEmbeddingFunction()
+    super().__init__(embedding_function, embedding_cache, embedding_batch_size, query_embedding_cache)
     self.dbClient = chromadb.PersistentClient(path=os.path.expanduser("~") + "/.nacos_mcp_router/chroma_db",
                 settings=Settings(
                     anonymized_telemetry=False,
                 ))
     self._collectionId = "nacos_mcp_router-collection"
-    self._collection = self.dbClient.get_or_create_collection(name=self._collectionId)
+    # chromadb 自带的 DefaultEmbeddingFunction 只声明了文本输入，集合参数的类型却要求同时支持图片
+    self._collection = self.dbClient.get_or_create_collection(
+      name=self._collectionId,
+      embedding_function=cast("EmbeddingFunction[Embeddable]", embedding_function))
     self.preIds = []
 
-  def update_data(self, ids: OneOrMany[ID],
-        metadatas: Optional[OneOrMany[Metadata]] = None,
-        documents: Optional[OneOrMany[Document]] = None,) -> None:
+  def update_data(self, ids: list[str],
+        metadatas: Optional[list[Metadata]] = None,
+        documents: Optional[list[str]] = None,
+        keys: Optional[list[str]] = None) -> None:
+    """
+    写入文档，keys 为各文档的 md5。配置了 embedding 缓存时只为缓存中没有的文档计算 embedding，
+    按 embedding_batch_size 分批计算后与文档一起写入
+    """
+    if self.embedding_cache is not None and keys is not None and isinstance(documents, list):
+      embeddings = self.embed_documents(documents, keys)
+      self._collection.upsert(documents=documents, embeddings=embeddings, metadatas=metadatas, ids=ids)
+      return
     self._collection.upsert(documents=documents, metadatas=metadatas, ids=ids)
 
-  def get_all_ids(self) -> list[ID]:
-    return self._collection.get().get('ids')
-  def delete_data(self, ids: list[ID]) -> None:
+  def get_all_ids(self) -> list[str]:
+    """只取 id，不读取文档、embedding 与元数据"""
+    return self._collection.get(include=[]).get('ids')
+  def delete_data(self, ids: list[str]) -> None:
     self._collection.delete(ids=ids)
 
-  def query(self, query: str, count: int) -> QueryResult:
-    NacosMcpRouteLogger.get_logger().info(f"Querying chroma {query}")
+  def query_batch(self, queries: list[str], count: int) -> "QueryResult":
+    """一次调用查询多个文本，结果按 queries 的顺序排列"""
+    NacosMcpRouteLogger.get_logger().info(f"Querying chroma {queries}")
+    if self.query_embedding_cache is None or not self.query_embedding_cache.enabled:
+      return self._collection.query(
+        query_texts=queries,
+        n_results=count
+      )
     return self._collection.query(
-      query_texts=[query],
+      query_embeddings=self._embed_queries(queries),
       n_results=count
     )
 
-  def get(self, id: list[str]) -> GetResult:
+  def get(self, id: list[str]) -> "GetResult":
     return self._collection.get(ids=id)
@@ -0,0 +1,347 @@
+#-*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AsyncContextManager, Awaitable, Callable, Optional, TypeVar
+
+import anyio
+import httpx
+import mcp.types
+from mcp import ClientSession, McpError
+from mcp.client.session import MessageHandlerFnT
+
+from .logger import NacosMcpRouteLogger
+
+if TYPE_CHECKING:
+    from .health_monitor import HealthMonitor
+
+T = TypeVar("T")
+
+# open sessions per downstream MCP server, idle sessions are closed first when the limit is reached
+_MAX_SESSIONS = int(os.getenv("SESSION_POOL_MAX_SESSIONS", 16))
+# seconds a session may stay unused before it is closed
+_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", 300))
+# seconds between two pings of the idle sessions
+_HEALTH_CHECK_INTERVAL = float(os.getenv("SESSION_HEALTH_CHECK_INTERVAL", 30))
+_CONNECT_TIMEOUT = float(os.getenv("SESSION_CONNECT_TIMEOUT", 30))
+# client headers forwarded to the downstream servers, a session is shared by the requests with the same values
+# of the forwarded headers. "*" forwards every header but those of the client's own connection to the router and
+# the per-request tracing headers; an allow-list such as "authorization,x-tenant-id" lets requests that differ
+# only in other headers share a session
+_FORWARDED_HEADERS = os.getenv("FORWARDED_HEADERS", "*")
+_PING_TIMEOUT = 5.0
+_CLOSE_TIMEOUT = 5.0
+
+_CONNECTION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream,
+                      ConnectionError, httpx.TransportError)
+
+Connector = Callable[[dict[str, str]], AsyncContextManager[tuple]]
+
+
+def parse_header_allow_list(value: str) -> Optional[frozenset[str]]:
+    """Lower case header names of a comma separated allow-list, None for "*" (all headers)."""
+    if value.strip() == "*":
+        return None
+    return frozenset(name.strip().lower() for name in value.split(",") if name.strip())
+
+
+FORWARDED_HEADERS = parse_header_allow_list(_FORWARDED_HEADERS)
+
+
+def is_connection_error(e: BaseException) -> bool:
+    """Whether the error means the session is gone, rather than a failed request on a working session."""
+    if isinstance(e, McpError):
+        return e.error.code == mcp.types.CONNECTION_CLOSED
+    if isinstance(e, BaseExceptionGroup):
+        return any(is_connection_error(inner) for inner in e.exceptions)
+    return isinstance(e, _CONNECTION_ERRORS)
+
+
+class PooledSession:
+    """
+    An initialized `ClientSession` kept open by its own task: the transports are anyio task groups,
+    they must be entered and exited by the same task. The session is usable until it is closed or
+    its connection fails.
+    """
+    def __init__(self, key: str, connect: Callable[[], AsyncContextManager[tuple]],
+                 message_handler: Optional[MessageHandlerFnT] = None) -> None:
+        self.key = key
+        self.session: Optional[ClientSession] = None
+        self.initialize_result: Optional[mcp.types.InitializeResult] = None
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.pooled = True
+        self.closed = False
+        self._connect = connect
+        self._message_handler = message_handler
+        self._ready = asyncio.Event()
+        self._close = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def usable(self) -> bool:
+        return self.session is not None and not self.closed and not self._close.is_set()
+
+    @property
+    def client(self) -> ClientSession:
+        """The initialized session, ConnectionError when it isn't open."""
+        if self.session is None or self.closed:
+            raise ConnectionError("mcp session is not open")
+        return self.session
+
+    @property
+    def initialize_response(self) -> mcp.types.InitializeResult:
+        """What the server answered to `initialize`, ConnectionError when the session isn't open."""
+        if self.initialize_result is None or self.closed:
+            raise ConnectionError("mcp session is not open")
+        return self.initialize_result
+
+    async def open(self, timeout: float) -> None:
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise
+        if not self.usable:
+            raise self._error or ConnectionError("mcp session closed while initializing")
+
+    async def _run(self) -> None:
+        try:
+            async with self._connect() as streams:
+                async with ClientSession(streams[0], streams[1], message_handler=self._message_handler) as session:
+                    self.initialize_result = await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._close.wait()
+        except Exception as e:
+            self._error = e
+            if self._ready.is_set():
+                NacosMcpRouteLogger.get_logger().warning("pooled mcp session closed by error", exc_info=e)
+        finally:
+            self.closed = True
+            self._ready.set()
+
+    async def close(self) -> None:
+        self._close.set()
+        if self._task is None or self._task.done():
+            return
+        _, pending = await asyncio.wait({self._task}, timeout=_CLOSE_TIMEOUT)
+        if pending:
+            self._task.cancel()
+
+    async def ping(self, timeout: float) -> bool:
+        try:
+            async with asyncio.timeout(timeout):
+                await self.client.send_ping()
+            return True
+        except Exception as e:
+            NacosMcpRouteLogger.get_logger().info(f"pooled mcp session failed health check: {e!r}")
+            return False
+
+
+@dataclass
+class _Opening:
+    """A session being opened and the number of requests waiting for it."""
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SessionPool:
+    """
+    Long-lived, initialized MCP sessions to one downstream server, one per partition of client
+    headers, reused by every request of that partition. MCP sessions multiplex concurrent requests.
+
+    Sessions unused for `idle_timeout` are closed, the others are pinged every `health_check_interval`
+    by a background task while the pool has sessions. At most `max_sessions` are open: the least
+    recently used idle session is closed to make room, and when all of them are busy the requests run
+    on a session of their own, closed when the last of them is done. An idempotent request failing because its session is
+    gone is retried once on a new session. `message_handler` receives what the server sends to any of the sessions,
+    such as notifications/tools/list_changed. `health` is told about the results of the requests and pings.
+    """
+    def __init__(self, name: str, connect: Connector,
+                 max_sessions: int = _MAX_SESSIONS,
+                 idle_timeout: float = _IDLE_TIMEOUT,
+                 health_check_interval: float = _HEALTH_CHECK_INTERVAL,
+                 connect_timeout: float = _CONNECT_TIMEOUT,
+                 message_handler: Optional[MessageHandlerFnT] = None,
+                 health: Optional["HealthMonitor"] = None) -> None:
+        self.name = name
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self._connect = connect
+        self._message_handler = message_handler
+        self.health = health
+        self._sessions: OrderedDict[str, PooledSession] = OrderedDict()
+        self._opening: dict[str, _Opening] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self.created = 0
+        self.reused = 0
+        self.reconnects = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @staticmethod
+    def partition_key(headers: dict[str, str]) -> str:
+        """Requests with the same headers share a session, the headers are sent when it is opened."""
+        canonical = json.dumps(sorted((k.lower(), str(v)) for k, v in headers.items()))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "in_flight": sum(s.in_flight for s in self._sessions.values()),
+            "created": self.created,
+            "reused": self.reused,
+            "reconnects": self.reconnects,
+            "evicted": self.evicted,
+        }
+
+    async def run(self, headers: dict[str, str], operation: Callable[[PooledSession], Awaitable[T]],
+                  idempotent: bool = True) -> T:
+        """
+        Run `operation` with a session of the headers' partition, reconnecting once if it is gone. Only
+        idempotent operations are run again: a tool call may have reached the server before the
+        connection dropped, its error is raised and the next request gets a new session.
+        """
+        retried = False
+        while True:
+            try:
+                session = await self._acquire(headers)
+            except Exception as e:
+                self._record_failure(e)
+                raise
+            try:
+                result = await operation(session)
+                if self.health is not None:
+                    self.health.record_success()
+                return result
+            except Exception as e:
+                if not is_connection_error(e) and session.usable:
+                    raise
+                if retried or not idempotent:
+                    self._record_failure(e)
+                    await self._discard(session)
+                    raise
+                NacosMcpRouteLogger.get_logger().warning(f"mcp session to {self.name} is gone, reconnecting: {e!r}")
+                retried = True
+                self.reconnects += 1
+                await self._discard(session)
+            finally:
+                await self._release(session)
+
+    def _record_failure(self, e: BaseException) -> None:
+        if self.health is not None:
+            self.health.record_failure(e)
+
+    async def _acquire(self, headers: dict[str, str]) -> PooledSession:
+        """A session of the headers' partition, counted in flight for the caller until `_release`."""
+        key = self.partition_key(headers)
+        session = self._sessions.get(key)
+        if session is not None:
+            if session.usable:
+                self._sessions.move_to_end(key)
+                self.reused += 1
+                session.in_flight += 1
+                return session
+            await self._discard(session)
+
+        # concurrent requests of a partition wait for the same session to open
+        opening = self._opening.get(key)
+        if opening is None:
+            opening = _Opening(asyncio.create_task(self._open(key, headers)))
+            self._opening[key] = opening
+        opening.waiters += 1
+        try:
+            return await asyncio.shield(opening.task)
+        except asyncio.CancelledError:
+            if not opening.task.done():
+                opening.waiters -= 1
+            elif not opening.task.cancelled() and opening.task.exception() is None:
+                await self._release(opening.task.result())
+            raise
+
+    async def _open(self, key: str, headers: dict[str, str]) -> PooledSession:
+        try:
+            pooled = await self._make_room()
+            session = PooledSession(key, lambda: self._connect(headers), self._message_handler)
+            session.pooled = pooled
+            await session.open(self.connect_timeout)
+        finally:
+            opening = self._opening.pop(key)
+        # the waiters are in flight before any of them resumes: the session can't be evicted, nor closed
+        # by the first of them to finish, in between
+        session.in_flight += opening.waiters
+        self.created += 1
+        if not pooled and session.in_flight == 0:
+            await session.close()
+        if pooled:
+            self._sessions[key] = session
+            if self._health_task is None or self._health_task.done():
+                self._health_task = asyncio.create_task(self._check_health())
+        return session
+
+    async def _release(self, session: PooledSession) -> None:
+        session.in_flight -= 1
+        session.last_used = time.monotonic()
+        if not session.pooled and session.in_flight == 0:
+            await session.close()
+
+    async def _make_room(self) -> bool:
+        """Close idle sessions until a new one fits, False when all the sessions are busy."""
+        while len(self._sessions) >= self.max_sessions:
+            victim = next((s for s in self._sessions.values() if s.in_flight == 0), None)
+            if victim is None:
+                return False
+            self.evicted += 1
+            await self._discard(victim)
+        return True
+
+    async def _discard(self, session: PooledSession) -> None:
+        if self._sessions.get(session.key) is session:
+            del self._sessions[session.key]
+        await session.close()
+
+    async def _check_health(self) -> None:
+        while self._sessions:
+            await asyncio.sleep(self.health_check_interval)
+            now = time.monotonic()
+            idle = []
+            for session in list(self._sessions.values()):
+                if not session.usable:
+                    await self._discard(session)
+                elif session.in_flight == 0:
+                    if now - session.last_used >= self.idle_timeout:
+                        await self._discard(session)
+                    else:
+                        idle.append(session)
+            healthy = await asyncio.gather(*(self._ping(session) for session in idle))
+            for session, ok in zip(idle, healthy):
+                if not ok:
+                    await self._discard(session)
+
+    async def _ping(self, session: PooledSession) -> bool:
+        start = time.perf_counter()
+        ok = await session.ping(_PING_TIMEOUT)
+        if self.health is not None:
+            if ok:
+                self.health.record_probe(time.perf_counter() - start)
+            else:
+                self.health.record_probe_failure(ConnectionError(f"ping of mcp session to {self.name} failed"))
+        return ok
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        sessions, self._sessions = list(self._sessions.values()), OrderedDict()
+        await asyncio.gather(*(session.close() for session in sessions))
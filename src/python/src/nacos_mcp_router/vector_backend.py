@@ -0,0 +1,92 @@
+#-*- coding: utf-8 -*-
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, Mapping, Optional, Protocol, Sequence
+
+from .embedding_cache import EmbeddingCache
+from .query_cache import LruCache, normalize_query
+
+# the metadata of a document, Chroma's `Metadata`
+Metadata = Mapping[str, str | int | float | bool]
+
+
+class EmbeddingFunction(Protocol):
+    """Embeds a batch of texts. Chroma's embedding functions qualify, their vectors are numpy arrays."""
+    def __call__(self, texts: list[str], /) -> Sequence[Iterable[float]]: ...
+
+
+def default_embedding_function() -> EmbeddingFunction:
+    """Chroma's default embedding model (all-MiniLM-L6-v2 on ONNX), imported only when first needed."""
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+    return DefaultEmbeddingFunction()
+
+
+class VectorBackend(ABC):
+    """
+    Storage and similarity search of the MCP server descriptions.
+
+    Backends implement `update_data`, `query_batch`, `delete_data` and `get_all_ids`. Query results
+    have the shape of Chroma's: one list of ids and one list of squared L2 distances per query, closest
+    first. The embedding of documents (through the persistent `embedding_cache`) and of queries
+    (through the in-memory `query_embedding_cache`) is shared by all backends.
+    """
+    def __init__(self, embedding_function: Optional[EmbeddingFunction] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None, embedding_batch_size: int = 32,
+                 query_embedding_cache: Optional[LruCache] = None) -> None:
+        self._embedding_function = embedding_function
+        self.embedding_cache = embedding_cache
+        self.embedding_batch_size = embedding_batch_size
+        self.query_embedding_cache = query_embedding_cache
+
+    @property
+    def embedding_function(self) -> EmbeddingFunction:
+        if self._embedding_function is None:
+            self._embedding_function = default_embedding_function()
+        return self._embedding_function
+
+    @abstractmethod
+    def update_data(self, ids: list[str], metadatas: Optional[list[Metadata]] = None,
+                    documents: Optional[list[str]] = None, keys: Optional[list[str]] = None) -> None:
+        """Insert or replace documents, `keys` are their md5 and let cached embeddings be reused."""
+
+    def query(self, query: str, count: int) -> Mapping[str, Any]:
+        return self.query_batch([query], count)
+
+    @abstractmethod
+    def query_batch(self, queries: list[str], count: int) -> Mapping[str, Any]:
+        ...
+
+    @abstractmethod
+    def delete_data(self, ids: list[str]) -> None:
+        ...
+
+    @abstractmethod
+    def get_all_ids(self) -> list[str]:
+        ...
+
+    def embed_documents(self, documents: list[str], keys: Optional[list[str]] = None) -> list:
+        if self.embedding_cache is not None and keys is not None:
+            return self.embedding_cache.embed(keys, documents, self.embedding_function, self.embedding_batch_size)
+        embeddings = []
+        batch_size = max(1, self.embedding_batch_size)
+        for start in range(0, len(documents), batch_size):
+            embeddings.extend(self.embedding_function(documents[start:start + batch_size]))
+        return embeddings
+
+    def _embed_queries(self, queries: list[str]) -> list:
+        """Embeddings of the normalized queries, from the cache when possible, the misses in one call."""
+        keys = [normalize_query(query) for query in queries]
+        cache = self.query_embedding_cache
+        if cache is None or not cache.enabled:
+            return list(self.embedding_function(keys))
+        embeddings = {}
+        for key in keys:
+            if key not in embeddings:
+                embedding = cache.get(key)
+                if embedding is not None:
+                    embeddings[key] = embedding
+        missing = [key for key in dict.fromkeys(keys) if key not in embeddings]
+        if missing:
+            for key, embedding in zip(missing, self.embedding_function(missing)):
+                embeddings[key] = embedding
+                cache.put(key, embedding)
+        return [embeddings[key] for key in keys]
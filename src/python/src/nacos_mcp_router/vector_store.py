@@ -0,0 +1,108 @@
+#-*- coding: utf-8 -*-
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from .logger import NacosMcpRouteLogger
+
+T = TypeVar("T")
+
+_RESULT_KEYS = ("ids", "distances", "documents", "metadatas", "embeddings")
+
+
+def _select(result: dict, index: int, count: int) -> dict:
+    """The result of the index-th query of a batch, in the shape of a single query result."""
+    selected = {}
+    for key in _RESULT_KEYS:
+        values = result.get(key)
+        if values is not None and len(values) > index and values[index] is not None:
+            selected[key] = [list(values[index])[:count]]
+    return selected
+
+
+class AsyncVectorStore:
+    """
+    Run the blocking calls of a vector store (embedding, ANN search, writes) on a dedicated, bounded
+    thread pool, so they never block the serving event loop.
+
+    Queries issued while another batch is being collected or executed are merged into a single
+    `query_batch` call of the store, each caller gets its own slice of the results. Stores without
+    `query_batch` are queried one by one.
+    """
+    def __init__(self, store: Any, max_workers: int = 2, max_batch_size: int = 32) -> None:
+        self.store = store
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_workers = max(1, max_workers)
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: list[tuple[str, int, asyncio.Future]] = []
+        self._flushing = False
+        self._flush_task: asyncio.Task | None = None
+        self.batches = 0
+        self.queries = 0
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Call a blocking function on the vector store thread pool."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="vector-store")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def query(self, query: str, count: int) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((query, count, future))
+        if not self._flushing:
+            self._flushing = True
+            # started on the next loop iteration, so queries issued meanwhile join the batch
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self) -> None:
+        try:
+            while self._pending:
+                batch = [item for item in self._pending[:self.max_batch_size] if not item[2].done()]
+                del self._pending[:self.max_batch_size]
+                if not batch:
+                    continue
+                try:
+                    results = await self._query_batch([query for query, _, _ in batch], max(c for _, c, _ in batch))
+                except Exception as e:
+                    NacosMcpRouteLogger.get_logger().warning("failed to query vector store", exc_info=e)
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.batches += 1
+                self.queries += len(batch)
+                for index, (_, count, future) in enumerate(batch):
+                    if not future.done():
+                        future.set_result(_select(results, index, count))
+        finally:
+            self._flushing = False
+
+    async def _query_batch(self, queries: list[str], count: int) -> dict:
+        if hasattr(self.store, "query_batch"):
+            return await self.run(self.store.query_batch, queries, count)
+        results = [await self.run(self.store.query, query, count) for query in queries]
+        return {key: [(r.get(key) or [None])[0] for r in results] for key in _RESULT_KEYS
+                if any(r.get(key) is not None for r in results)}
+
+    async def update_data(self, ids: list[str], documents: list[str] | None = None,
+                          keys: list[str] | None = None) -> None:
+        """Upsert documents, `keys` are their md5 and let the store reuse cached embeddings."""
+        if keys is None:
+            await self.run(self.store.update_data, ids=ids, documents=documents)
+        else:
+            await self.run(self.store.update_data, ids=ids, documents=documents, keys=keys)
+
+    async def get_all_ids(self) -> list[str]:
+        return await self.run(self.store.get_all_ids)
+
+    async def delete_data(self, ids: list[str]) -> None:
+        await self.run(self.store.delete_data, ids=ids)
+
+    def close(self) -> None:
+        """Shut the thread pool down, it is created again by the next call."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,226 @@
+#-*- coding: utf-8 -*-
+"""
+A local stand-in of the Nacos Server APIs used by nacos-mcp-router, so the router can be tested offline.
+
+It serves the MCP admin APIs, the config APIs the MCP servers are stored in, the long polling config
+listener and the login API (access tokens are only checked when `auth_enabled` is set). Tests use it
+in-process through `httpx.ASGITransport(app=MockNacosServer().app)`, or run it standalone with a few
+sample servers:
+
+    python -m src.tests.mock_nacos_server --port 8848
+"""
+import argparse
+import asyncio
+import json
+import time
+import urllib.parse
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from ..nacos_mcp_router.md5_util import get_md5
+from ..nacos_mcp_router.nacos_http_client import get_mcp_config_keys
+
+_WORD_SEPARATOR = "\x02"
+_LINE_SEPARATOR = "\x01"
+
+
+def _ok(data) -> JSONResponse:
+    return JSONResponse({"code": 0, "message": "success", "data": data})
+
+
+def _not_found(message: str) -> JSONResponse:
+    return JSONResponse({"code": 404, "message": message, "data": None}, status_code=404)
+
+
+class MockNacosServer:
+    def __init__(self, auth_enabled: bool = False, username: str = "nacos", password: str = "nacos",
+                 token_ttl: int = 18000) -> None:
+        self.servers: dict[str, dict] = {}
+        self.request_counts: dict[str, int] = {}
+        self.auth_enabled = auth_enabled
+        self.username = username
+        self.password = password
+        self.token_ttl = token_ttl
+        self.tokens: set[str] = set()
+        self.app = Starlette(routes=[
+            Route("/nacos/v3/auth/user/login", self._login, methods=["POST"]),
+            Route("/nacos/v3/admin/ai/mcp/list", self._guarded(self._list_mcp_servers), methods=["GET"]),
+            Route("/nacos/v3/admin/ai/mcp", self._guarded(self._get_mcp_server), methods=["GET"]),
+            Route("/nacos/v3/admin/ai/mcp", self._guarded(self._update_mcp_server), methods=["PUT"]),
+            Route("/nacos/v3/admin/cs/config/list", self._guarded(self._list_configs), methods=["GET"]),
+            Route("/nacos/v3/admin/cs/config", self._guarded(self._get_config), methods=["GET"]),
+            Route("/nacos/v1/cs/configs/listener", self._guarded(self._listen_configs), methods=["POST"]),
+        ])
+
+    def expire_tokens(self) -> None:
+        """Invalidate every issued access token, as if they expired on the server side."""
+        self.tokens.clear()
+
+    def _guarded(self, handler):
+        async def endpoint(request: Request) -> Response:
+            if self.auth_enabled and request.headers.get("accessToken") not in self.tokens:
+                self._count(request)
+                return JSONResponse({"code": 403, "message": "user not found!", "data": None}, status_code=403)
+            return await handler(request)
+        return endpoint
+
+    async def _login(self, request: Request) -> Response:
+        self._count(request)
+        form = await request.form()
+        if form.get("username") != self.username or form.get("password") != self.password:
+            return JSONResponse({"code": 403, "message": "unknown user!", "data": None}, status_code=403)
+        token = uuid.uuid4().hex
+        self.tokens.add(token)
+        return JSONResponse({"accessToken": token, "tokenTtl": self.token_ttl, "globalAdmin": True,
+                             "username": self.username})
+
+    def add_server(self, name: str, description: str, tools: list[dict] | None = None,
+                   protocol: str = "stdio", version: str = "1.0.0", enabled: bool = True) -> dict:
+        server = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "protocol": protocol,
+            "frontProtocol": protocol,
+            "description": description,
+            "version": version,
+            "versionDetail": {"version": version, "is_latest": True},
+            "enabled": enabled,
+            "remoteServerConfig": {},
+            "localServerConfig": {"mcpServers": {name: {"command": "echo", "args": [name]}}},
+            "capabilities": ["TOOL"],
+            "backendEndpoints": [],
+            "toolSpec": {"tools": tools or [], "toolsMeta": {}},
+        }
+        self.servers[name] = server
+        return server
+
+    def update_server(self, name: str, **changes) -> dict:
+        server = self.servers[name]
+        server.update(changes)
+        if "version" in changes:
+            server["versionDetail"] = {"version": changes["version"], "is_latest": True}
+        return server
+
+    def remove_server(self, name: str) -> None:
+        del self.servers[name]
+
+    def configs(self) -> dict[tuple[str, str], str]:
+        """The configs the MCP servers are stored in, keyed by (dataId, group)."""
+        configs = {}
+        for server in self.servers.values():
+            versions_key, server_key, tools_key = get_mcp_config_keys(server["id"], server["version"])
+            spec = {k: v for k, v in server.items() if k != "toolSpec"}
+            configs[versions_key] = json.dumps({"id": server["id"], "name": server["name"],
+                                                "latestPublishedVersion": server["version"],
+                                                "versionDetails": [server["versionDetail"]]}, sort_keys=True)
+            configs[server_key] = json.dumps(spec, sort_keys=True)
+            configs[tools_key] = json.dumps(server["toolSpec"], sort_keys=True)
+        return configs
+
+    def _count(self, request: Request) -> None:
+        key = f"{request.method} {request.url.path}"
+        self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+    def _find_server(self, params) -> dict | None:
+        if params.get("mcpId"):
+            return next((s for s in self.servers.values() if s["id"] == params["mcpId"]), None)
+        return self.servers.get(params.get("mcpName", ""))
+
+    async def _list_mcp_servers(self, request: Request) -> Response:
+        self._count(request)
+        page_no = int(request.query_params.get("pageNo", 1))
+        page_size = int(request.query_params.get("pageSize", 100))
+        servers = list(self.servers.values())
+        page = servers[(page_no - 1) * page_size: page_no * page_size]
+        items = [{k: v for k, v in s.items() if k not in ("toolSpec", "backendEndpoints")} for s in page]
+        return _ok({"totalCount": len(servers), "pageNumber": page_no,
+                    "pagesAvailable": (len(servers) + page_size - 1) // page_size, "pageItems": items})
+
+    async def _get_mcp_server(self, request: Request) -> Response:
+        self._count(request)
+        server = self._find_server(request.query_params)
+        if server is None:
+            return _not_found("mcp server not found")
+        return _ok(json.loads(json.dumps(server)))
+
+    async def _update_mcp_server(self, request: Request) -> Response:
+        self._count(request)
+        form = await request.form()
+        server = self.servers.get(str(form.get("mcpName", "")))
+        if server is None:
+            return _not_found("mcp server not found")
+        spec = json.loads(str(form.get("serverSpecification", "{}")))
+        tool_spec = json.loads(str(form.get("toolSpecification", "{}")))
+        server["description"] = spec.get("description", server["description"])
+        server["toolSpec"] = tool_spec
+        new_version = (spec.get("versionDetail") or {}).get("version")
+        if new_version:
+            server["version"] = new_version
+            server["versionDetail"] = {"version": new_version, "is_latest": True}
+        return _ok("ok")
+
+    async def _list_configs(self, request: Request) -> Response:
+        self._count(request)
+        group = request.query_params.get("groupName", "")
+        page_no = int(request.query_params.get("pageNo", 1))
+        page_size = int(request.query_params.get("pageSize", 100))
+        items = [{"dataId": data_id, "groupName": g, "md5": get_md5(content)}
+                 for (data_id, g), content in sorted(self.configs().items()) if not group or g == group]
+        return _ok({"totalCount": len(items), "pageNumber": page_no,
+                    "pageItems": items[(page_no - 1) * page_size: page_no * page_size]})
+
+    async def _get_config(self, request: Request) -> Response:
+        self._count(request)
+        key = (request.query_params.get("dataId", ""), request.query_params.get("groupName", ""))
+        content = self.configs().get(key)
+        if content is None:
+            return _not_found("config not found")
+        return _ok({"dataId": key[0], "groupName": key[1], "content": content, "md5": get_md5(content)})
+
+    async def _listen_configs(self, request: Request) -> Response:
+        self._count(request)
+        form = await request.form()
+        watched = {}
+        for line in str(form.get("Listening-Configs", "")).split(_LINE_SEPARATOR):
+            words = line.split(_WORD_SEPARATOR)
+            if len(words) >= 3:
+                watched[(words[0], words[1])] = words[2]
+        timeout = int(request.headers.get("Long-Pulling-Timeout", "30000")) / 1000
+
+        # hold the request until a watched config changes, polling keeps the mock independent of event loops
+        deadline = time.monotonic() + timeout
+        while True:
+            configs = self.configs()
+            changed = [key for key, md5 in watched.items()
+                       if (get_md5(configs[key]) if key in configs else "") != md5]
+            if changed or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(0.02)
+
+        body = "".join(f"{data_id}{_WORD_SEPARATOR}{group}{_LINE_SEPARATOR}" for data_id, group in changed)
+        return PlainTextResponse(urllib.parse.quote(body))
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Nacos Server for nacos-mcp-router")
+    parser.add_argument("--port", type=int, default=8848)
+    args = parser.parse_args()
+
+    server = MockNacosServer()
+    server.add_server("exact-server-name", "A test server for exact name matching exact-server-name",
+                      [{"name": "echo", "description": "echo the input", "inputSchema": {}}])
+    server.add_server("database-query-server", "Handles database queries and operations",
+                      [{"name": "query", "description": "run a sql query", "inputSchema": {}}])
+    server.add_server("file-server", "File management and operations server",
+                      [{"name": "read_file", "description": "read a file", "inputSchema": {}}])
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+import httpx
+
+from ..nacos_mcp_router.auth import AccessTokenManager
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+from .mock_nacos_server import MockNacosServer
+
+
+class TestAccessTokenManager(unittest.TestCase):
+    def test_concurrent_callers_share_one_login(self):
+        async def login():
+            await asyncio.sleep(0.01)
+            return "token", 100.0
+
+        manager = AccessTokenManager(login)
+
+        async def run():
+            return await asyncio.gather(*[manager.get_token() for _ in range(10)])
+
+        self.assertEqual(asyncio.run(run()), ["token"] * 10)
+        self.assertEqual(manager.login_count, 1)
+
+    def test_token_is_refreshed_before_expiry(self):
+        tokens = iter(["first", "second"])
+
+        async def login():
+            return next(tokens), 0.05
+
+        manager = AccessTokenManager(login, refresh_ahead_ratio=0.5)
+
+        async def run():
+            first = await manager.get_token()
+            await asyncio.sleep(0.03)
+            return first, await manager.get_token()
+
+        self.assertEqual(asyncio.run(run()), ("first", "second"))
+
+    def test_failed_login_is_not_retried_right_away(self):
+        async def login():
+            return None
+
+        manager = AccessTokenManager(login, retry_interval=30)
+
+        async def run():
+            return [await manager.get_token() for _ in range(3)]
+
+        self.assertEqual(asyncio.run(run()), [None, None, None])
+        self.assertEqual(manager.login_count, 1)
+
+
+class TestNacosHttpClientTokenAuth(unittest.TestCase):
+    def setUp(self):
+        self.nacos = MockNacosServer(auth_enabled=True, username="nacos", password="pass")
+        self.nacos.add_server("file-server", "File management and operations server")
+        params = {"nacosAddr": "localhost:8848", "userName": "nacos", "password": "pass",
+                  "namespaceId": "", "ak": "", "sk": ""}
+        self.client = NacosHttpClient(params, transport=httpx.ASGITransport(app=self.nacos.app))
+
+    def test_logs_in_once_for_many_requests(self):
+        servers = asyncio.run(self.client.get_mcp_servers())
+        self.assertEqual([s.name for s in servers], ["file-server"])
+        servers = asyncio.run(self.client.get_mcp_servers())
+        self.assertEqual(len(servers), 1)
+        self.assertEqual(self.nacos.request_counts["POST /nacos/v3/auth/user/login"], 1)
+
+    def test_rejected_token_is_renewed_and_retried_once(self):
+        asyncio.run(self.client.get_mcp_server(id="", name="file-server"))
+        self.nacos.expire_tokens()
+
+        mcp_server = asyncio.run(self.client.get_mcp_server(id="", name="file-server"))
+        self.assertEqual(mcp_server.description, "File management and operations server")
+        self.assertEqual(self.nacos.request_counts["POST /nacos/v3/auth/user/login"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import random
+import unittest
+
+from ..nacos_mcp_router.bm25 import Bm25Index, tokenize
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from .test_keyword_index import _server
+from .test_nacos_mcp_servers_fetch import FakeNacosHttpClient
+
+
+class TestBm25Index(unittest.TestCase):
+    def setUp(self):
+        self.index = Bm25Index()
+        self.index.update({
+            "amap-maps": _server("amap-maps", "高德地图 MCP Server，提供路径规划、POI 搜索和天气查询",
+                                 ["驾车路径规划", "地理编码"]),
+            "weather": _server("weather", "Weather forecast server", ["查询天气预报"]),
+            "file-server": _server("file-server", "File management and operations server", ["读取本地文件"]),
+            "everything": _server("everything", "A generic server for maps, files, weather, search and more"),
+        })
+
+    def _search(self, query: str, k: int = 10) -> list[str]:
+        return [server.name for server, _ in self.index.search(query, k)]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("高德地图 MCP，Ｆｉｌｅ_read v2"), ["高德", "德地", "地图", "mcp", "file", "read", "v2"])
+        self.assertEqual(tokenize("图"), ["图"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_strong_matches_rank_first(self):
+        self.assertEqual(self._search("地图 路径规划")[0], "amap-maps")
+        self.assertEqual(self._search("weather")[:2], ["weather", "everything"])
+        self.assertEqual(self._search("file", k=1), ["file-server"])
+        self.assertEqual(self._search("no such thing"), [])
+
+    def test_incremental_updates(self):
+        self.index.remove("weather")
+        self.assertEqual(self._search("weather"), ["everything"])
+        self.index.add("weather", _server("weather", "天气 forecast"))
+        self.assertEqual(self._search("天气")[0], "weather")
+        self.assertEqual(len(self.index), 4)
+
+    def test_pruned_search_matches_exhaustive_scoring(self):
+        rng = random.Random(3)
+        words = [f"word{i}" for i in range(200)] + ["地图", "天气", "文件搜索"]
+        index = Bm25Index()
+        index.update({f"s{i}": _server(f"s{i}", " ".join(rng.choices(words, k=30))) for i in range(2000)})
+        for query in ("word1 word2 地图", "word199 天气 word0 word3", "文件搜索"):
+            scores = index.score(query, (f"s{i}" for i in range(2000)))
+            expected = sorted(scores.values(), reverse=True)[:5]
+            self.assertEqual([round(score, 9) for _, score in index.search(query, 5)],
+                             [round(score, 9) for score in expected])
+
+    def test_updater_ranks_keyword_matches(self):
+        updater = McpUpdater(FakeNacosHttpClient(server_count=0), enable_vector_db=False)
+        updater._publish({"everything": _server("everything", "A generic server for maps and weather"),
+                          "weather": _server("weather", "Weather forecast and weather alerts")})
+        servers = asyncio.run(updater.search_mcp_by_keywords(["weather"], "天气预报"))
+        self.assertEqual([s.name for s in servers], ["weather", "everything"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+
+import anyio
+import mcp.types
+from mcp.server import Server
+
+from ..nacos_mcp_router.capability_cache import CapabilityCache, is_tools_changed
+from ..nacos_mcp_router.router_types import CustomServer
+from .test_query_cache import FakeClock
+from .test_session_pool import InMemoryConnector, InMemoryTransport
+
+
+def _tools(*names: str) -> list[mcp.types.Tool]:
+    return [mcp.types.Tool(name=name, description=name, inputSchema={"type": "object"}) for name in names]
+
+
+def _changing_server() -> Server:
+    """Adds a tool for every call of `grow`, and tells the clients its tools changed."""
+    server = Server("changing")
+    names = ["grow"]
+
+    @server.list_tools()
+    async def list_tools() -> list[mcp.types.Tool]:
+        return _tools(*names)
+
+    @server.call_tool()
+    async def call_tool(name: str, arguments: dict) -> list[mcp.types.TextContent]:
+        names.append(f"tool-{len(names)}")
+        await server.request_context.session.send_tool_list_changed()
+        return [mcp.types.TextContent(type="text", text="grown")]
+
+    return server
+
+
+class TestCapabilityCache(unittest.TestCase):
+    def test_entries_expire_and_are_copied(self):
+        clock = FakeClock()
+        cache = CapabilityCache(ttl=10, clock=clock)
+        cache.put_tools("a", _tools("echo"), cache.generation)
+        tools = cache.get_tools("a")
+        assert tools is not None
+        tools[0].description = "rewritten by the registry"
+        self.assertEqual([tool.description for tool in cache.get_tools("a") or []], ["echo"])
+        self.assertIsNone(cache.get_tools("b"))
+        clock.now = 10
+        self.assertIsNone(cache.get_tools("a"))
+
+    def test_registry_version_and_stale_results(self):
+        cache = CapabilityCache()
+        cache.check_registry_version("1.0.0")
+        cache.put_tools("", _tools("echo"), cache.generation)
+        cache.check_registry_version("1.0.0")
+        self.assertIsNotNone(cache.get_tools(""))
+        cache.check_registry_version("1.0.1")
+        self.assertIsNone(cache.get_tools(""))
+
+        # a result fetched while the entries were dropped isn't cached
+        generation = cache.generation
+        cache.invalidate()
+        cache.put_tools("", _tools("echo"), generation)
+        self.assertIsNone(cache.get_tools(""))
+
+    def test_is_tools_changed(self):
+        self.assertTrue(is_tools_changed(mcp.types.ServerNotification(
+            mcp.types.ToolListChangedNotification(method="notifications/tools/list_changed"))))
+        self.assertFalse(is_tools_changed(mcp.types.ServerNotification(
+            mcp.types.ResourceListChangedNotification(method="notifications/resources/list_changed"))))
+        self.assertFalse(is_tools_changed(anyio.EndOfStream()))
+
+
+class TestCustomServerCapabilities(unittest.TestCase):
+    def _server(self, connector: InMemoryConnector) -> CustomServer:
+        server = CustomServer("echo", {"mcpServers": {"echo": {"protocol": "mcp-sse", "url": "memory://echo",
+                                                                "headers": {}}}})
+        server._mcp_transport = InMemoryTransport(connector)
+        server._mcp_transport.on_tools_changed = server.capabilities.invalidate
+        return server
+
+    def test_tool_lists_are_served_from_memory_until_they_change(self):
+        connector = InMemoryConnector()
+        connector.server = _changing_server()
+
+        async def run():
+            server = self._server(connector)
+            listed = [await server.list_tools_with_headers({"authorization": "a"}) for _ in range(3)]
+            init = await server.get_initialized_response({"authorization": "a"})
+            await server.get_initialized_response({"authorization": "a"})
+            # another partition of headers gets its own entries
+            await server.list_tools_with_headers({"authorization": "b"})
+            stats = server.capabilities.stats()
+
+            await server.call_tool("grow", {}, {"authorization": "a"})
+            grown = await server.list_tools_with_headers({"authorization": "a"})
+            server.check_registry_version("2.0.0")
+            await server.list_tools_with_headers({"authorization": "a"})
+            after_version = server.capabilities.stats()
+            await server.cleanup()
+            return listed, init, stats, grown, after_version
+
+        listed, init, stats, grown, after_version = asyncio.run(run())
+        self.assertEqual([[t.name for t in tools] for tools in listed], [["grow"]] * 3)
+        self.assertEqual(init.serverInfo.name, "changing")
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 3))
+        self.assertEqual([t.name for t in grown], ["grow", "tool-1"])
+        self.assertEqual((after_version["generation"], after_version["size"]), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
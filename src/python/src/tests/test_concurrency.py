@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+
+from ..nacos_mcp_router.concurrency import AdaptiveConcurrencyLimiter
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    def test_in_flight_never_exceeds_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=4, initial_limit=4)
+        observed = []
+
+        async def fetch():
+            async with limiter.slot():
+                observed.append(limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*[fetch() for _ in range(20)])
+
+        asyncio.run(run())
+        self.assertLessEqual(max(observed), 4)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.stats.total, 20)
+        self.assertEqual(limiter.stats.succeeded, 20)
+
+    def test_errors_shrink_the_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=16, initial_limit=16)
+
+        async def run():
+            async with limiter.slot() as permit:
+                permit.fail()
+
+        asyncio.run(run())
+        self.assertEqual(limiter.limit, 8)
+        self.assertEqual(limiter.stats.failed, 1)
+
+        async def raise_error():
+            async with limiter.slot():
+                raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(raise_error())
+        self.assertEqual(limiter.limit, 4)
+
+    def test_healthy_responses_grow_the_limit_up_to_max(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=4, initial_limit=1)
+
+        async def run():
+            for _ in range(50):
+                async with limiter.slot():
+                    pass
+
+        asyncio.run(run())
+        self.assertEqual(limiter.limit, 4)
+
+    def test_reset_stats_starts_a_new_window(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=2)
+
+        async def run():
+            async with limiter.slot():
+                pass
+
+        asyncio.run(run())
+        previous = limiter.reset_stats()
+        self.assertEqual(previous.total, 1)
+        self.assertEqual(limiter.stats.total, 0)
+        self.assertIn("total: 1", previous.summary())
+
+    def test_cancelled_waiter_releases_its_place(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=1, initial_limit=1)
+
+        async def run():
+            await limiter.acquire()
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            self.assertEqual(limiter.in_flight, 1)
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from ..nacos_mcp_router.embedding_cache import EmbeddingCache
+from ..nacos_mcp_router.md5_util import get_md5
+
+
+class CountingEmbedder:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __call__(self, documents: list[str]) -> list[list[float]]:
+        self.calls.append(list(documents))
+        return [[float(len(d)), 0.5] for d in documents]
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cache", "embeddings.sqlite3")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _embed(self, cache: EmbeddingCache, documents: list[str], embedder, batch_size: int = 2):
+        return cache.embed([get_md5(d) for d in documents], documents, embedder, batch_size)
+
+    def test_only_misses_are_embedded_in_batches(self):
+        cache = EmbeddingCache(self.path)
+        embedder = CountingEmbedder()
+        self.assertEqual(self._embed(cache, ["a", "bb"], embedder), [[1.0, 0.5], [2.0, 0.5]])
+
+        vectors = self._embed(cache, ["bb", "ccc", "a", "dddd", "eeeee", "ccc"], embedder)
+        self.assertEqual([v[0] for v in vectors], [2.0, 3.0, 1.0, 4.0, 5.0, 3.0])
+        self.assertEqual(embedder.calls, [["a", "bb"], ["ccc", "dddd"], ["eeeee"]])
+        self.assertEqual((cache.hits, cache.misses), (3, 5))
+        self.assertEqual(len(cache), 5)
+        cache.close()
+
+    def test_persists_across_instances(self):
+        cache = EmbeddingCache(self.path)
+        self._embed(cache, ["weather forecast"], CountingEmbedder())
+        cache.close()
+
+        embedder = CountingEmbedder()
+        reopened = EmbeddingCache(self.path)
+        self.assertEqual(self._embed(reopened, ["weather forecast"], embedder), [[16.0, 0.5]])
+        self.assertEqual(embedder.calls, [])
+        # another embedding model doesn't reuse the vectors
+        other = EmbeddingCache(self.path, model="other")
+        self._embed(other, ["weather forecast"], embedder)
+        self.assertEqual(len(embedder.calls), 1)
+        reopened.close()
+        other.close()
+
+    def test_mismatched_keys(self):
+        cache = EmbeddingCache(":memory:")
+        with self.assertRaises(ValueError):
+            cache.embed(["k"], [], CountingEmbedder())
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import sys
+import unittest
+from typing import Optional
+
+from ..nacos_mcp_router.health_monitor import HEALTH_CLOSED, HEALTH_HEALTHY, HEALTH_UNHEALTHY, HealthMonitor
+from ..nacos_mcp_router.router_types import CustomServer
+from ..nacos_mcp_router.session_pool import SessionPool
+from .test_query_cache import FakeClock
+from .test_session_pool import InMemoryConnector
+
+# a stdio MCP server whose `exit` tool ends the process
+_STDIO_SERVER = '''
+import os
+import anyio
+import mcp.types
+from mcp.server import Server
+from mcp.server.stdio import stdio_server
+
+server = Server("exiting")
+
+@server.list_tools()
+async def list_tools():
+    return [mcp.types.Tool(name="exit", description="exit the process", inputSchema={"type": "object"})]
+
+@server.call_tool()
+async def call_tool(name, arguments):
+    os._exit(0)
+
+async def main():
+    async with stdio_server() as (read, write):
+        await server.run(read, write, server.create_initialization_options())
+
+anyio.run(main)
+'''
+
+
+class Probe:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.error: Optional[BaseException] = None
+
+    async def __call__(self) -> None:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+
+
+class TestHealthMonitor(unittest.TestCase):
+    def test_probe_failures_and_recovery(self):
+        clock, probe = FakeClock(), Probe()
+        monitor = HealthMonitor("echo", probe, interval=10, failure_threshold=2, clock=clock)
+
+        async def run():
+            await monitor.probe_once()
+            self.assertEqual(monitor.probes, 1)
+            self.assertIsNotNone(monitor.probe_latency)
+            # a recent success makes the ping unnecessary
+            await monitor.probe_once()
+            self.assertEqual(probe.calls, 1)
+
+            probe.error = TimeoutError()
+            clock.now = 10
+            await monitor.probe_once()
+            self.assertTrue(monitor.healthy)
+            await monitor.probe_once()
+            self.assertEqual(monitor.state, HEALTH_UNHEALTHY)
+
+            probe.error = None
+            await monitor.probe_once()
+            self.assertTrue(monitor.healthy)
+
+        asyncio.run(run())
+        self.assertEqual([t.state for t in monitor.transitions], [HEALTH_UNHEALTHY, HEALTH_HEALTHY])
+        stats = monitor.stats()
+        self.assertEqual((stats["probes"], stats["probe_failures"], stats["transition_count"]), (4, 2, 2))
+
+    def test_connection_errors_and_closed_sessions(self):
+        monitor = HealthMonitor("echo", failure_threshold=3)
+        monitor.record_failure(ValueError("bad request"))
+        self.assertTrue(monitor.healthy)
+        monitor.record_failure(ConnectionResetError())
+        self.assertEqual(monitor.state, HEALTH_UNHEALTHY)
+        monitor.record_success()
+        monitor.mark_closed("process exited")
+        monitor.record_success()
+        self.assertEqual(monitor.state, HEALTH_CLOSED)
+
+    def test_session_pool_reports_requests_and_pings(self):
+        connector = InMemoryConnector()
+        monitor = HealthMonitor("echo")
+        pool = SessionPool("echo", connector, health_check_interval=0.05, health=monitor)
+
+        async def run():
+            connector.fail_next = True
+            with self.assertRaises(ConnectionError):
+                await pool.run({}, lambda session: session.client.send_ping())
+            self.assertEqual(monitor.state, HEALTH_UNHEALTHY)
+            await pool.run({}, lambda session: session.client.send_ping())
+            self.assertTrue(monitor.healthy)
+            await asyncio.sleep(0.12)
+            await pool.close()
+
+        asyncio.run(run())
+        self.assertGreaterEqual(monitor.probes, 1)
+        self.assertIsNotNone(monitor.probe_latency_avg)
+
+
+class TestCustomServerHealth(unittest.TestCase):
+    def test_stdio_process_exit(self):
+        async def run():
+            server = CustomServer("exiting", {"mcpServers": {"exiting": {
+                "command": sys.executable, "args": ["-c", _STDIO_SERVER], "env": {}}}})
+            await server.wait_for_initialization()
+            healthy = await server.healthy()
+            await server.health.probe_once()
+            with self.assertRaises(Exception):
+                await server.call_tool("exit", {})
+            for _ in range(50):
+                if not await server.healthy():
+                    break
+                await asyncio.sleep(0.1)
+            stats = server.health_stats()
+            await server.cleanup()
+            return healthy, stats, await server.healthy()
+
+        healthy, stats, healthy_after_exit = asyncio.run(run())
+        self.assertTrue(healthy)
+        self.assertFalse(healthy_after_exit)
+        self.assertEqual(stats["state"], HEALTH_CLOSED)
+        self.assertEqual(stats["probes"], 1)
+        self.assertIn("exited", stats["transitions"][-1][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import unittest
+from typing import Sequence
+
+from ..nacos_mcp_router.keyword_index import KeywordIndex, normalize_text
+from ..nacos_mcp_router.nacos_mcp_server_config import NacosMcpServerConfig
+from ..nacos_mcp_router.router_types import McpServer
+
+
+def _server(name: str, description: str, tools: Sequence[str] = ()) -> McpServer:
+    server = McpServer(name=name, description=description, agentConfig={}, id=name, version="1.0.0")
+    server.mcp_config_detail = NacosMcpServerConfig.from_dict({
+        "name": name, "protocol": "stdio", "description": description, "version": "1.0.0", "id": name,
+        "remoteServerConfig": {},
+        "toolSpec": {"tools": [{"name": f"tool-{i}", "description": d, "inputSchema": {}}
+                               for i, d in enumerate(tools)]},
+    })
+    return server
+
+
+class TestKeywordIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = KeywordIndex()
+        self.servers = {
+            "amap": _server("amap", "高德地图 MCP Server，提供 路径规划 和 POI 搜索"),
+            "file": _server("file", "File management and operations server", ["读取本地文件"]),
+            "db": _server("db", "Handles DATABASE queries", ["run a SQL query"]),
+            "empty": _server("empty", "", ["地图"]),
+        }
+        self.index.update(self.servers)
+
+    def _search(self, keyword: str) -> list[str]:
+        return [s.name for s in self.index.search(keyword)]
+
+    def test_matches_like_a_normalized_substring(self):
+        self.assertEqual(self._search("地图"), ["amap", "empty"])
+        self.assertEqual(self._search("路径 规划"), ["amap"])
+        self.assertEqual(self._search("ＰＯＩ"), ["amap"])
+        self.assertEqual(self._search("database"), ["db"])
+        self.assertEqual(self._search("图"), ["amap", "empty"])
+        self.assertEqual(self._search("地球"), [])
+
+    def test_description_matches_come_before_tool_matches(self):
+        self.assertEqual(self._search("query"), ["db"])
+        self.assertEqual(self._search("文件"), ["file"])
+        self.assertEqual(self._search("ser"), ["amap", "file"])
+        self.assertEqual(self._search("s"), ["amap", "file", "db"])
+
+    def test_update_reindexes_changed_and_drops_removed_servers(self):
+        servers = dict(self.servers)
+        servers["amap"] = _server("amap", "百度地图")
+        del servers["db"]
+        self.index.update(servers)
+        self.assertEqual(self._search("高德"), [])
+        self.assertEqual(self._search("百度"), ["amap"])
+        self.assertEqual(self._search("database"), [])
+        self.assertEqual(len(self.index), 3)
+        # replaced servers keep their position
+        self.assertEqual(self._search("s"), ["file"])
+        self.assertEqual(self._search("地图"), ["amap", "empty"])
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text(" Ａｂ  c\t中 文 "), "abc中文")
+        self.assertEqual(normalize_text(None), "")
+
+    def test_search_matches_a_scan(self):
+        rng = random.Random(7)
+        words = ["地图", "天气", "文件", "数据库", "搜索", "翻译", "weather", "file", "database", "search",
+                 "browser", "github", "slack", "email", "calendar", "image", "video", "payment", "stock", "news"]
+        servers = {}
+        for i in range(1000):
+            description = " ".join(rng.choices(words, k=20)) + f" server{i}"
+            servers[f"server-{i}"] = _server(f"server-{i}", description,
+                                             [" ".join(rng.choices(words, k=8)) for _ in range(5)])
+        index = KeywordIndex()
+        index.update(servers)
+        for keyword in ["地图", "数据库", "weather", "server42", "github search", "不存在的关键词"]:
+            by_scan = [s.name for s in servers.values() if normalize_text(keyword) in normalize_text(s.description)]
+            by_index = [s.name for s in index.search(keyword)]
+            self.assertEqual(by_index[:len(by_scan)], by_scan)
+
+if __name__ == '__main__':
+    unittest.main()
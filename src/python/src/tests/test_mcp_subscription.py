@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+
+import httpx
+
+from ..nacos_mcp_router.constants import REFRESH_MODE_SUBSCRIBE
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient, get_mcp_config_keys
+from .mock_nacos_server import MockNacosServer
+
+
+async def _wait_for(condition, timeout: float = 3.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.02)
+
+
+class TestMcpSubscription(unittest.TestCase):
+    def setUp(self):
+        self.nacos = MockNacosServer()
+        self.nacos.add_server("file-server", "File management and operations server",
+                              [{"name": "read_file", "description": "read a file", "inputSchema": {}}])
+        self.nacos.add_server("database-query-server", "Handles database queries and operations")
+        params = {"nacosAddr": "localhost:8848", "userName": "nacos", "password": "pass",
+                  "namespaceId": "", "ak": "", "sk": ""}
+        self.client = NacosHttpClient(params, transport=httpx.ASGITransport(app=self.nacos.app))
+        self.updater = McpUpdater(self.client, chromaDbService=None, enable_vector_db=False,
+                                  refresh_mode=REFRESH_MODE_SUBSCRIBE, safety_refresh_interval=300)
+
+    def _run_subscribed(self, scenario):
+        async def run():
+            task = asyncio.create_task(self.updater.subscribe())
+            try:
+                await _wait_for(lambda: len(self.updater._watched_configs) == 6)
+                await scenario()
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await self.client.aclose()
+
+        asyncio.run(run())
+
+    def test_changed_server_is_refreshed_without_polling_the_registry(self):
+        async def scenario():
+            list_calls = self.nacos.request_counts["GET /nacos/v3/admin/ai/mcp/list"]
+            self.nacos.update_server("file-server", description="Read and write local files")
+
+            await _wait_for(lambda: self.updater._cache["file-server"].description == "Read and write local files")
+            self.assertEqual(self.nacos.request_counts["GET /nacos/v3/admin/ai/mcp/list"], list_calls)
+
+        self._run_subscribed(scenario)
+
+    def test_new_version_is_watched_after_refresh(self):
+        async def scenario():
+            server = self.nacos.update_server("file-server", version="2.0.0")
+
+            await _wait_for(lambda: self.updater._cache["file-server"].version == "2.0.0")
+            await _wait_for(lambda: all(key in self.updater._watched_configs
+                                        for key in get_mcp_config_keys(server["id"], "2.0.0")))
+
+        self._run_subscribed(scenario)
+
+    def test_deleted_server_leaves_the_cache(self):
+        async def scenario():
+            self.nacos.remove_server("database-query-server")
+            await _wait_for(lambda: "database-query-server" not in self.updater._cache)
+            self.assertIn("file-server", self.updater._cache)
+
+        self._run_subscribed(scenario)
+
+    def test_refresh_now_interrupts_long_polling(self):
+        async def run():
+            self.updater.start()
+            try:
+                await _wait_for(lambda: len(self.updater._watched_configs) == 6)
+                self.nacos.add_server("search-server", "Search the web")
+                await asyncio.wait_for(self.updater.refresh_now(), 3)
+                self.assertIn("search-server", self.updater._cache)
+            finally:
+                await self.updater.stop()
+
+        asyncio.run(run())
+
+    def test_listen_configs_returns_nothing_on_timeout(self):
+        async def run():
+            _, md5s = await self.client.list_config_md5s("mcp-server-versions")
+            configs = {(data_id, "mcp-server-versions"): md5 for data_id, md5 in md5s.items()}
+            return await self.client.listen_configs(configs, timeout_ms=100)
+
+        self.assertEqual(asyncio.run(run()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
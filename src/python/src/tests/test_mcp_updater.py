@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+from typing import Any, Optional
+
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.vector_backend import Metadata, VectorBackend
+from .test_nacos_mcp_servers_fetch import FakeNacosHttpClient
+
+
+class TestIncrementalRefresh(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeNacosHttpClient(server_count=150)
+        self.updater = McpUpdater(self.client, chromaDbService=None, enable_vector_db=False,
+                                  incremental_refresh=True, full_refresh_every=3)
+
+    def test_unchanged_servers_are_not_fetched_again(self):
+        asyncio.run(self.updater.refresh())
+        self.assertEqual(self.client.detail_requests, 150)
+
+        self.client.versions["server-7"] = "1.0.1"
+        asyncio.run(self.updater.refresh())
+        self.assertEqual(self.client.detail_requests, 151)
+        self.assertEqual(len(self.updater._cache), 150)
+
+        server = asyncio.run(self.updater.get_mcp_server_by_name("server-7"))
+        self.assertIsNotNone(server)
+
+    def test_full_refresh_runs_periodically(self):
+        for _ in range(3):
+            asyncio.run(self.updater.refresh())
+        self.assertEqual(self.client.detail_requests, 150)
+
+        asyncio.run(self.updater.refresh())
+        self.assertEqual(self.client.detail_requests, 300)
+
+    def test_deleted_servers_leave_the_cache(self):
+        asyncio.run(self.updater.refresh())
+        self.client.names = self.client.names[:100]
+        asyncio.run(self.updater.refresh())
+        self.assertEqual(len(self.updater._cache), 100)
+        self.assertIsNone(asyncio.run(self.updater.get_mcp_server_by_name("server-120")))
+
+
+class RecordingVectorStore(VectorBackend):
+    """Keeps the ids in a dict and records the calls the updater makes."""
+    def __init__(self) -> None:
+        super().__init__()
+        self.ids = {"stale-server": "left over from a previous run"}
+        self.calls = []
+
+    def update_data(self, ids: list[str], metadatas: Optional[list[Metadata]] = None,
+                    documents: Optional[list[str]] = None, keys: Optional[list[str]] = None) -> None:
+        self.calls.append("update")
+        self.ids.update(zip(ids, documents or []))
+
+    def query_batch(self, queries: list[str], count: int) -> dict[str, Any]:
+        return {"ids": [[] for _ in queries], "distances": [[] for _ in queries]}
+
+    def get_all_ids(self) -> list[str]:
+        self.calls.append("get_all_ids")
+        return list(self.ids)
+
+    def delete_data(self, ids: list[str]) -> None:
+        self.calls.append(("delete", sorted(ids)))
+        for id in ids:
+            self.ids.pop(id, None)
+
+
+class TestVectorIdTracking(unittest.TestCase):
+    def test_ids_are_loaded_once_and_deletes_batched(self):
+        client = FakeNacosHttpClient(server_count=5)
+        store = RecordingVectorStore()
+        updater = McpUpdater(client, chromaDbService=store, enable_vector_db=True, incremental_refresh=False)
+
+        asyncio.run(updater.refresh())
+        self.assertEqual(store.calls, ["update", "get_all_ids", ("delete", ["stale-server"])])
+        self.assertEqual(len(store.ids), 5)
+
+        store.calls.clear()
+        client.names = client.names[:2]
+        client.versions[client.names[0]] = "1.0.1"
+        asyncio.run(updater.refresh())
+        self.assertNotIn("get_all_ids", store.calls)
+        self.assertEqual(store.calls[-1], ("delete", ["server-2", "server-3", "server-4"]))
+        self.assertEqual(sorted(store.ids), ["server-0", "server-1"])
+        self.assertEqual(updater._vector_ids, set(store.ids))
+
+
+class TestUpdaterTask(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeNacosHttpClient(server_count=10)
+        self.updater = McpUpdater(self.client, chromaDbService=None, update_interval=3600, enable_vector_db=False)
+
+    def test_refresh_now_wakes_up_the_task(self):
+        async def run():
+            self.updater.start()
+            try:
+                await self.updater.refresh_now()
+                self.assertEqual(len(self.updater._cache), 10)
+                snapshot = self.updater._cache
+
+                self.client.names.append("server-new")
+                await self.updater.refresh_now()
+                self.assertIn("server-new", self.updater._cache)
+                # readers holding the previous snapshot are not affected
+                self.assertNotIn("server-new", snapshot)
+                self.assertTrue(self.updater.running)
+            finally:
+                await self.updater.stop()
+            self.assertFalse(self.updater.running)
+
+        asyncio.run(run())
+
+    def test_refresh_now_without_task(self):
+        asyncio.run(self.updater.refresh_now())
+        self.assertEqual(len(self.updater._cache), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
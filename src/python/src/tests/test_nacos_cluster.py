@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+import httpx
+
+from ..nacos_mcp_router.nacos_cluster import NacosCluster
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+
+
+class TestNacosCluster(unittest.TestCase):
+    def test_parse_addresses(self):
+        self.assertEqual(NacosCluster.parse_addresses(" a:8848, b:8848 ,,a:8848"), ["a:8848", "b:8848"])
+
+    def test_prefers_the_fastest_node(self):
+        cluster = NacosCluster(["a:8848", "b:8848"], explore_ratio=0)
+        a, b = cluster.nodes
+        cluster.record_success(a, 0.2)
+        cluster.record_success(b, 0.01)
+        self.assertEqual(cluster.candidates()[0].address, "b:8848")
+
+    def test_errors_outweigh_latency(self):
+        cluster = NacosCluster(["a:8848", "b:8848"], explore_ratio=0)
+        a, b = cluster.nodes
+        cluster.record_success(a, 0.05)
+        for _ in range(5):
+            cluster.record_error(b, 0.01)
+        self.assertEqual(cluster.candidates()[0].address, "a:8848")
+
+    def test_unreachable_node_cools_down(self):
+        cluster = NacosCluster(["a:8848", "b:8848"], cooldown=30, explore_ratio=0)
+        a, _ = cluster.nodes
+        cluster.record_unreachable(a)
+        self.assertEqual([n.address for n in cluster.candidates()], ["b:8848", "a:8848"])
+        self.assertTrue(cluster.snapshot()[0]["cooling_down"])
+
+        cluster.record_unreachable(a)
+        self.assertEqual(a.consecutive_failures, 2)
+        cluster.record_success(a, 0.01)
+        self.assertFalse(cluster.snapshot()[0]["cooling_down"])
+
+
+class TestNacosHttpClientFailover(unittest.TestCase):
+    def setUp(self):
+        self.hosts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.hosts.append(request.url.host)
+            if request.url.host == "down":
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, json={"code": 0, "data": {"ok": True}})
+
+        params = {"nacosAddr": "down:8848,up:8848", "userName": "nacos", "password": "pass",
+                  "namespaceId": "", "ak": "", "sk": ""}
+        self.client = NacosHttpClient(params, transport=httpx.MockTransport(handler))
+        self.client.cluster.explore_ratio = 0
+        self.client.token_manager = None
+
+    def test_fails_over_and_skips_the_node_afterwards(self):
+        async def run():
+            first = await self.client.request_nacos("/nacos/v3/admin/ai/mcp/list")
+            second = await self.client.request_nacos("/nacos/v3/admin/ai/mcp/list")
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first, (True, {"ok": True}))
+        self.assertEqual(second, (True, {"ok": True}))
+        self.assertEqual(self.hosts, ["down", "up", "up"])
+
+    def test_all_nodes_down(self):
+        self.client.cluster.nodes.pop()
+        self.assertEqual(asyncio.run(self.client.request_nacos("/nacos/v3/admin/ai/mcp/list")), (False, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
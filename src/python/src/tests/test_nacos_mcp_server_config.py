@@ -0,0 +1,72 @@
+import json
+import unittest
+
+from ..nacos_mcp_router import json_util
+from ..nacos_mcp_router.nacos_mcp_server_config import NacosMcpServerConfig
+
+
+def _server_detail(index: int, tool_count: int = 10) -> dict:
+    return {
+        "id": f"id-{index}",
+        "name": f"server-{index}",
+        "protocol": "mcp-sse",
+        "frontProtocol": "mcp-sse",
+        "description": f"server {index} description",
+        "version": "1.0.0",
+        "enabled": True,
+        "remoteServerConfig": {"serviceRef": {"namespaceId": "public", "groupName": "DEFAULT_GROUP",
+                                              "serviceName": f"server-{index}"}, "exportPath": "/sse"},
+        "localServerConfig": {},
+        "capabilities": ["TOOL"],
+        "backendEndpoints": [{"address": "127.0.0.1", "port": 8080}],
+        "toolSpec": {
+            "tools": [{"name": f"tool-{t}", "description": f"tool {t} of server {index}",
+                       "inputSchema": {"type": "object", "properties": {"path": {"type": "string",
+                                                                                "description": "file path"}}}}
+                      for t in range(tool_count)],
+            "toolsMeta": {f"tool-{t}": {"enabled": t % 2 == 0, "invokeContext": {}, "templates": {}}
+                          for t in range(tool_count)},
+        },
+    }
+
+
+class TestNacosMcpServerConfig(unittest.TestCase):
+    def test_tools_are_built_on_first_access(self):
+        config = NacosMcpServerConfig.from_dict(_server_detail(1, tool_count=2))
+        self.assertNotIn("tool_spec", config.__dict__)
+        self.assertEqual(config.get_tool_description(), "server 1 description\ntool 0 of server 1\ntool 1 of server 1")
+        self.assertNotIn("tools", config.tool_spec.__dict__)
+
+        self.assertEqual([t.name for t in config.tool_spec.tools], ["tool-0", "tool-1"])
+        self.assertIs(config.tool_spec.tools_dict["tool-1"], config.tool_spec.tools[1])
+        self.assertFalse(config.tool_spec.tools_meta["tool-1"].enabled)
+        self.assertEqual(config.backend_endpoints[0].port, 8080)
+
+    def test_missing_tool_spec(self):
+        detail = _server_detail(1)
+        detail["toolSpec"] = None
+        detail["backendEndpoints"] = None
+        config = NacosMcpServerConfig.from_dict(detail)
+        self.assertEqual(config.tool_spec.tools, [])
+        self.assertEqual(config.tool_spec.tools_dict, {})
+        self.assertEqual(config.backend_endpoints, [])
+        self.assertEqual(config.get_tool_description(), "server 1 description")
+
+    def test_loads(self):
+        self.assertEqual(json_util.loads(b'{"a": [1, "\xc3\xa9"]}'), {"a": [1, "é"]})
+        self.assertEqual(json_util.loads('{"a": null}'), {"a": None})
+
+    def test_lazy_parse_matches_eager_parse(self):
+        payloads = [json.dumps({"code": 0, "data": _server_detail(i, tool_count=3)}).encode("utf-8") for i in range(20)]
+        eager = [NacosMcpServerConfig.from_dict(json.loads(p.decode("utf-8"))["data"]) for p in payloads]
+        lazy = [NacosMcpServerConfig.from_dict(json_util.loads(p)["data"]) for p in payloads]
+        for a, b in zip(eager, lazy):
+            self.assertEqual(a.get_tool_description(), b.get_tool_description())
+            self.assertEqual([(t.name, t.input_schema) for t in a.tool_spec.tools],
+                             [(t.name, t.input_schema) for t in b.tool_spec.tools])
+            self.assertEqual({n: m.enabled for n, m in a.tool_spec.tools_meta.items()},
+                             {n: m.enabled for n, m in b.tool_spec.tools_meta.items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+import urllib.parse
+
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+
+
+def _server_detail(name: str) -> dict:
+    return {
+        "name": name,
+        "protocol": "stdio",
+        "description": f"{name} description",
+        "version": "1.0.0",
+        "remoteServerConfig": {},
+        "localServerConfig": {"mcpServers": {name: {"command": "echo"}}},
+        "toolSpec": {"tools": [{"name": "tool", "description": "tool of " + name, "inputSchema": {}}]},
+    }
+
+
+class FakeNacosHttpClient(NacosHttpClient):
+    """Serves the admin mcp list and detail api from memory."""
+    def __init__(self, server_count: int, detail_delay: float = 0.0, last_page_delay: float = 0.0):
+        super().__init__({"nacosAddr": "localhost:8848", "userName": "nacos", "password": "pass",
+                          "namespaceId": "", "ak": "", "sk": ""})
+        self.names = [f"server-{i}" for i in range(server_count)]
+        self.detail_delay = detail_delay
+        self.last_page_delay = last_page_delay
+        self.requested_pages = []
+        self.detail_requests = 0
+        self.versions: dict[str, str] = {}
+
+    async def request_nacos(self, uri, method='GET', data=None, content_type=None) -> tuple[bool, dict]:
+        path, _, query = uri.partition("?")
+        params = dict(urllib.parse.parse_qsl(query))
+        if path == "/nacos/v3/admin/ai/mcp/list":
+            page_no, page_size = int(params["pageNo"]), int(params["pageSize"])
+            self.requested_pages.append(page_no)
+            if page_no * page_size >= len(self.names):
+                await asyncio.sleep(self.last_page_delay)
+            names = self.names[(page_no - 1) * page_size: page_no * page_size]
+            return True, {"totalCount": len(self.names),
+                          "pageItems": [{"name": n, "id": n, "protocol": "stdio", "enabled": True,
+                                         "version": self.versions.get(n, "1.0.0")} for n in names]}
+        self.detail_requests += 1
+        await asyncio.sleep(self.detail_delay)
+        return True, _server_detail(params["mcpId"])
+
+
+class TestGetMcpServers(unittest.TestCase):
+    def test_pipelined_fetch_returns_every_server(self):
+        client = FakeNacosHttpClient(server_count=250)
+        servers = asyncio.run(client.get_mcp_servers())
+        self.assertEqual(sorted(s.name for s in servers), sorted(client.names))
+        self.assertEqual(sorted(client.requested_pages), [1, 2, 3])
+        stats = client.last_fetch_stats
+        assert stats is not None
+        self.assertEqual(stats.total, 250)
+
+    def test_sequential_fetch_returns_every_server(self):
+        client = FakeNacosHttpClient(server_count=250)
+        client.pipelined_fetch = False
+        servers = asyncio.run(client.get_mcp_servers())
+        self.assertEqual([s.name for s in servers], client.names)
+        self.assertEqual(client.requested_pages, [1, 2, 3])
+
+    def test_pipelined_fetch_streams_before_last_page(self):
+        client = FakeNacosHttpClient(server_count=250, last_page_delay=0.5)
+
+        async def first_server():
+            async for mcp_server in client.iter_mcp_servers():
+                return mcp_server
+
+        async def run():
+            return await asyncio.wait_for(first_server(), timeout=0.4)
+
+        self.assertIsNotNone(asyncio.run(run()))
+
+    def test_empty_registry(self):
+        client = FakeNacosHttpClient(server_count=0)
+        self.assertEqual(asyncio.run(client.get_mcp_servers()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
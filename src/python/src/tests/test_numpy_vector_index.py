@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ..nacos_mcp_router.numpy_vector_index import DTYPE_INT8, NumpyVectorIndex
+from ..nacos_mcp_router.query_cache import LruCache
+
+
+class TableEmbedder:
+    """Looks the documents up in a fixed table of vectors, random for unknown texts."""
+    def __init__(self, vectors: dict[str, list[float]], dim: int = 4) -> None:
+        self.vectors = vectors
+        self.dim = dim
+        self.calls = 0
+
+    def __call__(self, documents: list[str]) -> list[list[float]]:
+        self.calls += 1
+        rng = np.random.default_rng(len(documents))
+        return [self.vectors[d] if d in self.vectors else rng.standard_normal(self.dim).tolist() for d in documents]
+
+
+class TestNumpyVectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.embedder = TableEmbedder({
+            "maps": [1, 0, 0, 0], "routes": [0.9, 0.1, 0, 0], "weather": [0, 1, 0, 0],
+            "files": [0, 0, 1, 0], "route planning": [1, 0.05, 0, 0],
+        })
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _index(self, **kwargs) -> NumpyVectorIndex:
+        return NumpyVectorIndex(self.dir.name, embedding_function=self.embedder, **kwargs)
+
+    def test_query_returns_nearest_first(self):
+        index = self._index()
+        index.update_data(ids=["amap", "baidu", "weather", "file"], documents=["maps", "routes", "weather", "files"])
+        result = index.query_batch(["route planning", "weather"], 2)
+        self.assertEqual(result["ids"], [["amap", "baidu"], ["weather", "baidu"]])
+        self.assertAlmostEqual(result["distances"][1][0], 0.0, places=5)
+        self.assertAlmostEqual(result["distances"][1][1], 2 - 2 * 0.1 / np.hypot(0.9, 0.1), places=5)
+        self.assertEqual(index.query("maps", 10)["ids"][0][:1], ["amap"])
+
+    def test_updates_deletes_and_reload(self):
+        index = self._index()
+        index.update_data(ids=["amap", "weather", "file"], documents=["maps", "weather", "files"])
+        index.update_data(ids=["amap"], documents=["files"])
+        index.delete_data(ids=["weather", "missing"])
+        self.assertEqual(sorted(index.get_all_ids()), ["amap", "file"])
+        result = index.query("files", 2)
+        self.assertEqual(sorted(result["ids"][0]), ["amap", "file"])
+        self.assertAlmostEqual(max(result["distances"][0]), 0.0, places=5)
+
+        reloaded = self._index()
+        self.assertEqual(sorted(reloaded.get_all_ids()), ["amap", "file"])
+        self.assertEqual(reloaded.query("maps", 2)["distances"], index.query("maps", 2)["distances"])
+        self.assertNotIn("weather", reloaded.query("weather", 3)["ids"][0])
+
+    def test_int8_matches_float32_ranking(self):
+        rng = np.random.default_rng(5)
+        vectors = {f"doc{i}": rng.standard_normal(16).tolist() for i in range(3000)}
+        embedder = TableEmbedder(vectors, dim=16)
+        ids, docs = list(vectors), list(vectors)
+        exact = NumpyVectorIndex(os.path.join(self.dir.name, "f32"), embedding_function=embedder)
+        quantized = NumpyVectorIndex(os.path.join(self.dir.name, "i8"), dtype=DTYPE_INT8, embedding_function=embedder)
+        exact.update_data(ids=ids, documents=docs)
+        quantized.update_data(ids=ids, documents=docs)
+        queries = [f"doc{i}" for i in range(0, 3000, 300)]
+        self.assertEqual([ids[0] for ids in quantized.query_batch(queries, 1)["ids"]], queries)
+        overlap = [len(set(a) & set(b)) for a, b in zip(exact.query_batch(queries, 10)["ids"],
+                                                         quantized.query_batch(queries, 10)["ids"])]
+        self.assertGreaterEqual(min(overlap), 8)
+
+    def test_query_embeddings_are_cached(self):
+        index = self._index(query_embedding_cache=LruCache(4))
+        index.update_data(ids=["amap"], documents=["maps"])
+        calls = self.embedder.calls
+        index.query("Maps", 1)
+        index.query("maps ", 1)
+        self.assertEqual(self.embedder.calls, calls + 1)
+
+    def test_rejects_other_dimensions(self):
+        index = self._index()
+        index.update_data(ids=["amap"], documents=["maps"])
+        with self.assertRaises(ValueError):
+            NumpyVectorIndex(self.dir.name, embedding_function=TableEmbedder({}, dim=8)).update_data(
+                ids=["x"], documents=["unknown"])
+        with self.assertRaises(ValueError):
+            index.update_data(ids=["a", "b"], documents=["maps"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.query_cache import LruCache, normalize_query
+from ..nacos_mcp_router.router_types import ChromaDb
+from .test_keyword_index import _server
+from .test_nacos_mcp_servers_fetch import FakeNacosHttpClient
+from .test_rerank import FakeVectorDb
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLruCache(unittest.TestCase):
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Plan a  ROUTE\tto the 机场 "), "plan a route to the 机场")
+        self.assertEqual(normalize_query("Ｗｅａｔｈｅｒ"), "weather")
+
+    def test_evicts_least_recently_used(self):
+        cache = LruCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats(), {"size": 2, "max_size": 2, "hits": 2, "misses": 1, "evictions": 1,
+                                         "hit_rate": 2 / 3})
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = LruCache(10, ttl=5, clock=clock)
+        cache.put("a", 1)
+        clock.now = 4.9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 5
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self):
+        cache = LruCache(0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertFalse(cache.enabled)
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def test_only_new_queries_are_embedded(self):
+        calls = []
+
+        def embed(texts):
+            calls.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+        chroma = object.__new__(ChromaDb)
+        chroma._embedding_function = embed
+        chroma.query_embedding_cache = LruCache(8)
+        self.assertEqual(chroma._embed_queries(["Maps", "maps ", "weather"]), [[4.0], [4.0], [7.0]])
+        self.assertEqual(chroma._embed_queries(["MAPS", "file"]), [[4.0], [4.0]])
+        self.assertEqual(calls, [["maps", "weather"], ["file"]])
+
+
+class TestSearchResultCache(unittest.TestCase):
+    def test_repeated_queries_hit_until_the_snapshot_changes(self):
+        vector_db = FakeVectorDb(["weather"], [0.5])
+        updater = McpUpdater(FakeNacosHttpClient(server_count=0), chromaDbService=vector_db, enable_vector_db=True,
+                             search_result_cache_size=8)
+        updater._publish({"weather": _server("weather", "天气预报")})
+
+        async def run():
+            first = await updater._vector_hits("Weather  forecast", 3)
+            second = await updater._vector_hits("weather forecast", 3)
+            updater._publish({"weather": _server("weather", "天气预报和预警")})
+            third = await updater._vector_hits("weather forecast", 3)
+            return first, second, third
+
+        first, second, third = asyncio.run(run())
+        self.assertEqual(len(vector_db.queries), 2)
+        self.assertEqual([s.name for s, _ in first], ["weather"])
+        self.assertIs(first[0][0], second[0][0])
+        # hits are resolved against the current snapshot
+        self.assertEqual(third[0][0].description, "天气预报和预警")
+        stats = updater.cache_stats()["search_results"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
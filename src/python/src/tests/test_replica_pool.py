@@ -0,0 +1,172 @@
+import asyncio
+import unittest
+from typing import Any, Optional
+
+import mcp.types
+
+from ..nacos_mcp_router.health_monitor import HealthMonitor
+from ..nacos_mcp_router.replica_pool import StdioReplicaPool, create_mcp_server, replica_bounds
+from ..nacos_mcp_router.router_types import CustomServer
+
+
+class FakeReplica:
+    """Stands in for the CustomServer of one stdio process, a tool call sleeps for `sleep` seconds."""
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.health = HealthMonitor(f"replica-{number}")
+        self.calls = 0
+        self.closed = False
+        self.registry_version = None
+
+    async def wait_for_initialization(self) -> None:
+        await asyncio.sleep(0)
+
+    async def healthy(self) -> bool:
+        return not self.closed and self.health.healthy
+
+    def check_registry_version(self, version: Optional[str]) -> None:
+        self.registry_version = version
+
+    async def get_initialized_response(self, client_headers: dict[str, str] = {}) -> mcp.types.InitializeResult:
+        raise NotImplementedError
+
+    async def list_tools_with_headers(self, client_headers: dict[str, str] = {}) -> list[mcp.types.Tool]:
+        return []
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any], client_headers: dict[str, str] = {}) -> Any:
+        return await self.execute_tool(tool_name, arguments, client_headers=client_headers)
+
+    async def execute_tool(self, tool_name: str, arguments: dict[str, Any], retries: int = 2, delay: float = 1.0,
+                           client_headers: dict[str, str] = {}) -> Any:
+        self.calls += 1
+        await asyncio.sleep(arguments.get("sleep", 0))
+        return self.number
+
+    def health_stats(self) -> dict:
+        return self.health.stats()
+
+    async def cleanup(self) -> None:
+        self.closed = True
+
+
+class TestReplicaPool(unittest.TestCase):
+    def setUp(self):
+        self.replicas: list[FakeReplica] = []
+        self.broken = False
+
+    def _pool(self, **kwargs) -> StdioReplicaPool:
+        def factory() -> FakeReplica:
+            replica = FakeReplica(len(self.replicas))
+            if self.broken:
+                replica.health.mark_closed("process exited")
+            self.replicas.append(replica)
+            return replica
+        return StdioReplicaPool("fake", {}, factory=factory, **kwargs)
+
+    def test_least_outstanding_dispatch(self):
+        async def run():
+            pool = self._pool(min_replicas=2, max_replicas=2)
+            await pool.wait_for_initialization()
+            slow = [asyncio.create_task(pool.execute_tool("t", {"sleep": 0.1})) for _ in range(4)]
+            await asyncio.sleep(0.01)
+            # the replicas have two requests each, the fast one doesn't wait behind them
+            in_flight = pool.stats()["in_flight"]
+            served_by = await pool.execute_tool("t", {})
+            results = await asyncio.gather(*slow)
+            await pool.cleanup()
+            return in_flight, served_by, results
+
+        in_flight, served_by, results = asyncio.run(run())
+        self.assertEqual(in_flight, [2, 2])
+        self.assertIn(served_by, (0, 1))
+        self.assertEqual(sorted(results), [0, 0, 1, 1])
+        self.assertTrue(all(replica.closed for replica in self.replicas))
+
+    def test_scales_up_with_queue_depth_and_down_when_idle(self):
+        async def run():
+            pool = self._pool(min_replicas=1, max_replicas=3, scale_up_outstanding=2,
+                              idle_timeout=0.05, check_interval=0.02)
+            await pool.wait_for_initialization()
+            calls = []
+            for _ in range(8):
+                calls.append(asyncio.create_task(pool.execute_tool("t", {"sleep": 0.1})))
+                await asyncio.sleep(0.005)
+            await asyncio.gather(*calls)
+            scaled_up = pool.stats()
+            await asyncio.sleep(0.2)
+            scaled_down = pool.stats()
+            await pool.cleanup()
+            return scaled_up, scaled_down
+
+        scaled_up, scaled_down = asyncio.run(run())
+        self.assertEqual((scaled_up["replicas"], scaled_up["scale_ups"]), (3, 2))
+        self.assertTrue(all(replica.calls for replica in self.replicas))
+        self.assertEqual((scaled_down["replicas"], scaled_down["scale_downs"]), (1, 2))
+
+    def test_unhealthy_replicas_are_replaced(self):
+        async def run():
+            pool = self._pool(min_replicas=2, max_replicas=2, check_interval=0.02)
+            await pool.wait_for_initialization()
+            pool.check_registry_version("1.0.0")
+            self.replicas[0].health.mark_closed("process exited")
+            served_by = {await pool.execute_tool("t", {}) for _ in range(3)}
+            await asyncio.sleep(0.1)
+            stats = pool.stats()
+            healthy = await pool.healthy()
+            await pool.cleanup()
+            return served_by, stats, healthy
+
+        served_by, stats, healthy = asyncio.run(run())
+        self.assertEqual(served_by, {1})
+        self.assertEqual((stats["replicas"], stats["replaced"]), (2, 1))
+        self.assertTrue(healthy)
+        self.assertEqual(self.replicas[2].registry_version, "1.0.0")
+
+    def test_requests_without_a_healthy_replica_share_one_start_up(self):
+        async def run():
+            pool = self._pool(min_replicas=1, max_replicas=2, check_interval=3600)
+            await pool.wait_for_initialization()
+            self.replicas[0].health.mark_closed("process exited")
+            served_by = await asyncio.gather(*(pool.execute_tool("t", {}) for _ in range(5)))
+            # the crashed replica still counts: the pool is full and the next crash isn't replaced on demand
+            self.replicas[1].health.mark_closed("process exited")
+            with self.assertRaises(RuntimeError):
+                await pool.execute_tool("t", {})
+            await pool.cleanup()
+            return served_by
+
+        self.assertEqual(asyncio.run(run()), [1] * 5)
+        self.assertEqual(len(self.replicas), 2)
+
+    def test_pool_that_never_started_a_replica_stays_down(self):
+        async def run():
+            self.broken = True
+            pool = self._pool(min_replicas=1, max_replicas=2, check_interval=0.01)
+            await pool.wait_for_initialization()
+            await asyncio.sleep(0.1)
+            healthy = await pool.healthy()
+            await pool.cleanup()
+            return healthy
+
+        self.assertFalse(asyncio.run(run()))
+        self.assertEqual(len(self.replicas), 1)
+
+    def test_replica_bounds(self):
+        async def run():
+            stdio = {"mcpServers": {"fs": {"command": "true", "maxReplicas": 4}}}
+            remote = {"mcpServers": {"web": {"protocol": "mcp-sse", "url": "http://localhost:1/sse", "headers": {},
+                                             "maxReplicas": 4}}}
+            self.assertEqual(replica_bounds("fs", stdio), (1, 4))
+            pool = create_mcp_server("fs", stdio)
+            server = create_mcp_server("web", remote)
+            await pool.cleanup()
+            await server.cleanup()
+            return pool, server
+
+        pool, server = asyncio.run(run())
+        self.assertIsInstance(pool, StdioReplicaPool)
+        self.assertIsInstance(server, CustomServer)
+
+
+if __name__ == '__main__':
+    unittest.main()
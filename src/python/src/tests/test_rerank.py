@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+from unittest import mock
+from typing import Any, Optional
+
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.rerank import FUSION_WEIGHTED, SOURCE_KEYWORD, SOURCE_VECTOR, FusionOptions, fuse
+from ..nacos_mcp_router.vector_backend import Metadata, VectorBackend
+from .test_keyword_index import _server
+from .test_nacos_mcp_servers_fetch import FakeNacosHttpClient
+
+
+class FakeVectorDb(VectorBackend):
+    """Returns fixed ids and distances, whatever the query."""
+    def __init__(self, ids: list[str], distances: list[float]) -> None:
+        super().__init__()
+        self.ids = ids
+        self.distances = distances
+        self.queries: list[tuple[str, int]] = []
+
+    def update_data(self, ids: list[str], metadatas: Optional[list[Metadata]] = None,
+                    documents: Optional[list[str]] = None, keys: Optional[list[str]] = None) -> None:
+        pass
+
+    def query_batch(self, queries: list[str], count: int) -> dict[str, Any]:
+        self.queries.extend((query, count) for query in queries)
+        return {"ids": [self.ids[:count] for _ in queries], "distances": [self.distances[:count] for _ in queries]}
+
+    def delete_data(self, ids: list[str]) -> None:
+        pass
+
+    def get_all_ids(self) -> list[str]:
+        return []
+
+
+class TestFuse(unittest.TestCase):
+    def setUp(self):
+        self.a, self.b, self.c = _server("a", "a"), _server("b", "b"), _server("c", "c")
+
+    def _names(self, fused) -> list[str]:
+        return [server.name for server, _ in fused]
+
+    def test_reciprocal_rank_fusion(self):
+        fused = fuse({SOURCE_KEYWORD: [(self.a, 9.0), (self.b, 5.0)],
+                      SOURCE_VECTOR: [(self.b, 0.9), (self.c, 0.8), (self.b, 0.1)]}, FusionOptions())
+        self.assertEqual(self._names(fused), ["b", "a", "c"])
+        self.assertAlmostEqual(fused[0][1], 1 / 62 + 1 / 61)
+
+    def test_weights_and_limit(self):
+        options = FusionOptions(limit=1, weights={SOURCE_KEYWORD: 0.1, SOURCE_VECTOR: 1.0})
+        fused = fuse({SOURCE_KEYWORD: [(self.a, 9.0)], SOURCE_VECTOR: [(self.c, 0.8)]}, options)
+        self.assertEqual(self._names(fused), ["c"])
+
+    def test_weighted_scores_and_threshold(self):
+        options = FusionOptions(strategy=FUSION_WEIGHTED, min_score=0.5)
+        fused = fuse({SOURCE_KEYWORD: [(self.a, 10.0), (self.b, 2.0)],
+                      SOURCE_VECTOR: [(self.b, 0.5), (self.c, 0.2)]}, options)
+        self.assertEqual(self._names(fused), ["b", "a"])
+        self.assertAlmostEqual(fused[0][1], 1.2)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            FusionOptions(strategy="max")
+
+
+class TestHybridSearch(unittest.TestCase):
+    def test_combines_keyword_and_vector_hits(self):
+        vector_db = FakeVectorDb(["weather", "amap"], [0.2, 0.4])
+        updater = McpUpdater(FakeNacosHttpClient(server_count=0), chromaDbService=vector_db, enable_vector_db=True,
+                             search_options=FusionOptions(limit=3))
+        updater._publish({
+            "amap": _server("amap", "高德地图，路径规划"),
+            "weather": _server("weather", "天气预报"),
+            "file": _server("file", "File management", ["读取地图文件"]),
+            "slack": _server("slack", "Slack messages"),
+        })
+
+        servers = asyncio.run(updater.search("规划去机场的路线", ["地图"]))
+        self.assertEqual([s.name for s in servers], ["amap", "weather", "file"])
+        self.assertEqual(vector_db.queries, [("规划去机场的路线", 10)])
+
+    def test_keyword_errors_leave_the_vector_hits(self):
+        vector_db = FakeVectorDb(["weather"], [0.2])
+        updater = McpUpdater(FakeNacosHttpClient(server_count=0), chromaDbService=vector_db, enable_vector_db=True)
+        updater._publish({"weather": _server("weather", "天气预报")})
+
+        with mock.patch.object(updater, "_keyword_hits", side_effect=RuntimeError("broken index")), \
+                self.assertLogs("nacos_mcp_router", "WARNING"):
+            servers = asyncio.run(updater.search("明天的天气", ["天气"]))
+        self.assertEqual([s.name for s in servers], ["weather"])
+
+
+if __name__ == '__main__':
+    unittest.main()
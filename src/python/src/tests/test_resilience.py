@@ -0,0 +1,93 @@
+import asyncio
+import time
+import unittest
+
+import httpx
+
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+from ..nacos_mcp_router.resilience import (CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker,
+                                           RetryPolicy)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CIRCUIT_CLOSED)
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CIRCUIT_OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.snapshot()["rejected"], 1)
+
+    def test_half_open_admits_one_probe(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CIRCUIT_HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CIRCUIT_OPEN)
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CIRCUIT_CLOSED)
+        self.assertEqual(breaker.snapshot()["times_opened"], 2)
+
+    def test_retry_delay_is_capped(self):
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.5)
+        self.assertTrue(all(0 <= policy.delay(retry) <= 0.5 for retry in range(10)))
+
+
+class TestNacosHttpClientResilience(unittest.TestCase):
+    def setUp(self):
+        self.responses = []
+        self.requests = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests += 1
+            status = self.responses.pop(0) if self.responses else 200
+            if status == 0:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(status, json={"code": 0, "data": {"ok": True}})
+
+        params = {"nacosAddr": "localhost:8848", "userName": "nacos", "password": "pass",
+                  "namespaceId": "", "ak": "", "sk": ""}
+        self.client = NacosHttpClient(params, transport=httpx.MockTransport(handler))
+        self.client.token_manager = None
+        self.client.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+        self.client.circuit_breaker = CircuitBreaker("nacos", failure_threshold=4, reset_timeout=30)
+
+    def test_get_is_retried(self):
+        self.responses = [503, 0]
+        self.assertEqual(asyncio.run(self.client.request_nacos("/nacos/v3/admin/ai/mcp/list")), (True, {"ok": True}))
+        self.assertEqual(self.requests, 3)
+        self.assertEqual(self.client.stats()["circuit_breaker"]["state"], CIRCUIT_CLOSED)
+
+    def test_put_is_not_retried(self):
+        self.responses = [503]
+        result = asyncio.run(self.client.request_nacos("/nacos/v3/admin/ai/mcp", method="PUT", data={}))
+        self.assertEqual(result, (False, {}))
+        self.assertEqual(self.requests, 1)
+
+    def test_open_circuit_short_circuits_requests(self):
+        self.responses = [503] * 12
+
+        async def run():
+            return [await self.client.request_nacos("/nacos/v3/admin/ai/mcp/list") for _ in range(5)]
+
+        self.assertEqual(asyncio.run(run()), [(False, {})] * 5)
+        # a request is one failure, whatever its number of attempts
+        self.assertEqual(self.requests, 12)
+        self.assertEqual(self.client.stats()["circuit_breaker"]["state"], CIRCUIT_OPEN)
+        self.assertEqual(self.client.stats()["circuit_breaker"]["consecutive_failures"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+import asyncio
+import contextlib
+import unittest
+
+import anyio
+import mcp.types
+from mcp.server import Server
+from mcp.shared.memory import create_client_server_memory_streams
+
+from ..nacos_mcp_router.mcp_transport import McpTransport
+from ..nacos_mcp_router.session_pool import SessionPool, is_connection_error, parse_header_allow_list
+
+
+def _echo_server() -> Server:
+    server = Server("echo")
+
+    @server.list_tools()
+    async def list_tools() -> list[mcp.types.Tool]:
+        return [mcp.types.Tool(name="echo", description="echo the text", inputSchema={"type": "object"})]
+
+    @server.call_tool()
+    async def call_tool(name: str, arguments: dict) -> list[mcp.types.TextContent]:
+        if arguments.get("slow"):
+            await anyio.sleep(0.2)
+        return [mcp.types.TextContent(type="text", text=arguments.get("text", ""))]
+
+    return server
+
+
+def _text(result: mcp.types.CallToolResult) -> str:
+    content = result.content[0]
+    assert isinstance(content, mcp.types.TextContent)
+    return content.text
+
+
+class InMemoryConnector:
+    """Connects to an in-process MCP server, like `sse_client` does over http, and counts connections."""
+    def __init__(self) -> None:
+        self.server = _echo_server()
+        self.headers = []
+        self.open = 0
+        self.fail_next = False
+
+    @contextlib.asynccontextmanager
+    async def __call__(self, headers: dict[str, str]):
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("connection refused")
+        self.headers.append(headers)
+        async with create_client_server_memory_streams() as (client_streams, server_streams):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(lambda: self.server.run(server_streams[0], server_streams[1],
+                                                      self.server.create_initialization_options()))
+                self.open += 1
+                try:
+                    yield client_streams
+                finally:
+                    self.open -= 1
+                    tg.cancel_scope.cancel()
+
+
+class InMemoryTransport(McpTransport):
+    def __init__(self, connector: InMemoryConnector, **kwargs) -> None:
+        self.connector = connector
+        super().__init__("memory://echo", {}, **kwargs)
+
+    def connect(self, headers: dict[str, str]):
+        return self.connector(headers)
+
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.connector = InMemoryConnector()
+
+    def test_sessions_are_reused_per_header_partition(self):
+        transport = InMemoryTransport(self.connector)
+
+        async def run():
+            results = await asyncio.gather(*(transport.handle_tool_call({"text": str(i)}, {"authorization": "a"}, "echo")
+                                             for i in range(5)))
+            await transport.handle_list_tools({"authorization": "a", "Content-Length": "12", "mcp-session-id": "1"})
+            init = await transport.handle_initialize({"Authorization": "a", "mcp-session-id": "1"})
+            await transport.handle_tool_call({"text": "b"}, {"authorization": "b"}, "echo")
+            stats = transport.pool.stats()
+            await transport.close()
+            return results, init, stats
+
+        results, init, stats = asyncio.run(run())
+        self.assertEqual([_text(r) for r in results], ["0", "1", "2", "3", "4"])
+        self.assertEqual(init.serverInfo.name, "echo")
+        self.assertEqual(self.connector.headers, [{"authorization": "a"}, {"authorization": "b"}])
+        self.assertEqual((stats["sessions"], stats["created"]), (2, 2))
+        self.assertEqual(self.connector.open, 0)
+
+    def test_forwarded_header_allow_list(self):
+        self.assertEqual(parse_header_allow_list(" Authorization, x-tenant-id ,"),
+                         frozenset({"authorization", "x-tenant-id"}))
+        self.assertIsNone(parse_header_allow_list("*"))
+
+        everything = InMemoryTransport(self.connector)
+        self.assertEqual(everything.clean_headers({"authorization": "a", "host": "h", "mcp-session-id": "1",
+                                                   "x-custom": "c"}),
+                         {"authorization": "a", "x-custom": "c"})
+        # per-request tracing headers don't split the sessions
+        self.assertEqual(everything.partition_key({"authorization": "a", "traceparent": "00-1-1-01", "X-Request-Id": "1"}),
+                         everything.partition_key({"authorization": "a", "traceparent": "00-2-2-01", "X-Request-Id": "2"}))
+
+        transport = InMemoryTransport(self.connector, forwarded_headers=frozenset({"x-tenant-id"}))
+        with self.assertLogs("nacos_mcp_router", "WARNING") as logs:
+            self.assertEqual(transport.clean_headers({"X-Tenant-Id": "t1", "authorization": "a", "host": "h"}),
+                             {"X-Tenant-Id": "t1"})
+            transport.clean_headers({"x-tenant-id": "t2", "Authorization": "b"})
+        # the dropped header names are logged once per server
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("authorization", logs.output[0])
+
+        async def run():
+            for tenant in ("t1", "t2", "t1"):
+                await transport.handle_tool_call({"text": tenant}, {"x-tenant-id": tenant, "x-request-id": tenant},
+                                                 "echo")
+            await transport.close()
+
+        asyncio.run(run())
+        self.assertEqual(self.connector.headers, [{"x-tenant-id": "t1"}, {"x-tenant-id": "t2"}])
+
+    def test_max_sessions_and_idle_sessions(self):
+        pool = SessionPool("echo", self.connector, max_sessions=1, health_check_interval=0.05, idle_timeout=0.1)
+
+        async def echo(session):
+            return await session.client.call_tool("echo", {"text": "x", "slow": True})
+
+        async def run():
+            await pool.run({"x-user": "a"}, echo)
+            # the idle session of "a" makes room for "b"
+            await pool.run({"x-user": "b"}, echo)
+            evicted = pool.evicted
+            # all the sessions are busy: "c" runs on a session of its own
+            await asyncio.gather(pool.run({"x-user": "b"}, echo), pool.run({"x-user": "c"}, echo))
+            sessions = len(pool)
+            await asyncio.sleep(0.3)
+            return evicted, sessions, len(pool)
+
+        evicted, sessions, idle_left = asyncio.run(run())
+        self.assertEqual((evicted, sessions, idle_left), (1, 1, 0))
+        self.assertEqual(self.connector.open, 0)
+
+    def test_overflow_session_is_closed_by_its_last_request(self):
+        pool = SessionPool("echo", self.connector, max_sessions=1)
+
+        async def echo(session, text, slow):
+            result = await session.client.call_tool("echo", {"text": text, "slow": slow})
+            return _text(result)
+
+        async def run():
+            busy = asyncio.create_task(pool.run({"x-user": "a"}, lambda s: echo(s, "busy", True)))
+            await asyncio.sleep(0.05)
+            # both requests of "b" wait for the same session of their own, the fast one finishes first
+            results = await asyncio.wait_for(asyncio.gather(pool.run({"x-user": "b"}, lambda s: echo(s, "fast", False)),
+                                                            pool.run({"x-user": "b"}, lambda s: echo(s, "slow", True))),
+                                             timeout=2)
+            await busy
+            open_after = self.connector.open
+            await pool.close()
+            return results, open_after
+
+        results, open_after = asyncio.run(run())
+        self.assertEqual(results, ["fast", "slow"])
+        # only the pooled session of "a" is left open
+        self.assertEqual(open_after, 1)
+        self.assertEqual(self.connector.open, 0)
+
+    def test_new_session_is_not_evicted_before_its_requests_run(self):
+        pool = SessionPool("echo", self.connector, max_sessions=1)
+        idle_when_opened = []
+
+        async def run():
+            requests = [asyncio.create_task(pool.run({"x-user": "a"}, lambda s: s.client.send_ping()))
+                        for _ in range(2)]
+            await asyncio.sleep(0)
+            # when the opening task resolves, before its waiters resume, `_make_room` finds no idle session
+            opening = next(iter(pool._opening.values())).task
+            opening.add_done_callback(lambda _: idle_when_opened.append(
+                [s.in_flight for s in pool._sessions.values() if s.in_flight == 0]))
+            await asyncio.gather(*requests)
+            stats = pool.stats()
+            await pool.close()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(idle_when_opened, [[]])
+        self.assertEqual((stats["created"], stats["in_flight"]), (1, 0))
+
+    def test_reconnects_when_the_session_is_gone(self):
+        pool = SessionPool("echo", self.connector)
+
+        async def run():
+            async def echo(session):
+                return await session.client.call_tool("echo", {"text": "x"})
+
+            await pool.run({}, echo)
+            # the connection drops: the next request fails once and is retried on a new session
+            first = next(iter(pool._sessions.values()))
+            await first.client._write_stream.aclose()
+            result = await pool.run({}, echo)
+            reconnects = pool.reconnects
+            await pool.close()
+            return result, reconnects
+
+        result, reconnects = asyncio.run(run())
+        self.assertEqual(result.content[0].text, "x")
+        self.assertEqual(reconnects, 1)
+
+    def test_tool_calls_are_not_retried(self):
+        transport = InMemoryTransport(self.connector)
+
+        async def run():
+            await transport.handle_tool_call({"text": "x"}, {}, "echo")
+            first = next(iter(transport.pool._sessions.values()))
+            await first.client._write_stream.aclose()
+            # the server may have run the tool before the connection dropped
+            with self.assertRaises(Exception) as raised:
+                await transport.handle_tool_call({"text": "y"}, {}, "echo")
+            self.assertTrue(is_connection_error(raised.exception))
+            result = await transport.handle_tool_call({"text": "z"}, {}, "echo")
+            stats = transport.pool.stats()
+            await transport.close()
+            return result, stats
+
+        result, stats = asyncio.run(run())
+        self.assertEqual(_text(result), "z")
+        self.assertEqual((stats["reconnects"], stats["created"]), (0, 2))
+
+    def test_connect_errors_and_tool_errors_are_raised(self):
+        pool = SessionPool("echo", self.connector)
+
+        async def run():
+            self.connector.fail_next = True
+            with self.assertRaises(ConnectionError):
+                await pool.run({}, lambda session: session.client.send_ping())
+
+            async def fail(session):
+                raise ValueError("bad arguments")
+            with self.assertRaises(ValueError):
+                await pool.run({}, fail)
+            self.assertEqual(pool.reconnects, 0)
+            await pool.close()
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
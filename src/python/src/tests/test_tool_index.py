@@ -0,0 +1,85 @@
+import asyncio
+import tempfile
+import unittest
+
+from ..nacos_mcp_router.constants import INDEX_GRANULARITY_TOOL, TOOL_POOLING_SUM
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.numpy_vector_index import NumpyVectorIndex
+from .test_keyword_index import _server
+from .test_nacos_mcp_servers_fetch import FakeNacosHttpClient
+
+_VOCABULARY = ["map", "route", "driving", "places", "weather", "forecast", "alerts", "file", "delete"]
+
+
+def _embed(documents: list[str]) -> list[list[float]]:
+    """Bag of words over a tiny vocabulary, plus a constant so no vector is zero."""
+    return [[float(text.lower().count(word)) for word in _VOCABULARY] + [0.1] for text in documents]
+
+
+def _amap():
+    server = _server("amap", "Map server", ["plan a driving route", "search places on the map",
+                                            "weather forecast", "delete everything"])
+    server.mcp_config_detail.tool_spec.data["toolsMeta"] = {"tool-3": {"enabled": False}}
+    return server
+
+
+class TestToolIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.index = NumpyVectorIndex(self.dir.name, embedding_function=_embed)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _updater(self, **kwargs) -> McpUpdater:
+        updater = McpUpdater(FakeNacosHttpClient(server_count=0), chromaDbService=self.index, enable_vector_db=True,
+                             index_granularity=INDEX_GRANULARITY_TOOL, **kwargs)
+
+        async def apply():
+            for server in (_amap(), _server("weather", "Weather server", ["weather forecast", "weather alerts"]),
+                           _server("file", "File server")):
+                await updater._apply_server(server)
+        asyncio.run(apply())
+        return updater
+
+    def test_indexes_enabled_tools(self):
+        self._updater()
+        self.assertEqual(sorted(self.index.get_all_ids()),
+                         ["amap", "amap::tool-0", "amap::tool-1", "amap::tool-2", "file",
+                          "weather", "weather::tool-0", "weather::tool-1"])
+
+    def test_search_names_matching_tools(self):
+        updater = self._updater()
+        matched = {}
+        hits = asyncio.run(updater._vector_hits("driving route", 2, matched))
+        self.assertEqual(hits[0][0].name, "amap")
+        self.assertEqual(matched["amap"][0], "tool-0")
+
+        matched = {}
+        servers = asyncio.run(updater.search("weather forecast", [], matched))
+        self.assertEqual(servers[0].name, "weather")
+        self.assertIn("tool-2", matched["amap"])
+        self.assertEqual(matched["weather"][0], "tool-0")
+
+    def test_sum_pooling_adds_tool_scores(self):
+        max_hits = asyncio.run(self._updater()._vector_hits("weather", 3))
+        sum_hits = asyncio.run(self._updater(tool_pooling=TOOL_POOLING_SUM)._vector_hits("weather", 3))
+        self.assertEqual(max_hits[0][0].name, "weather")
+        self.assertGreater(sum_hits[0][1], max_hits[0][1])
+
+    def test_removed_tools_and_servers_leave_the_index(self):
+        updater = self._updater()
+
+        async def update():
+            await updater._apply_server(_server("weather", "Weather server", ["weather forecast"]))
+            await updater._remove_server("amap")
+        asyncio.run(update())
+        self.assertEqual(sorted(self.index.get_all_ids()), ["file", "weather", "weather::tool-0"])
+
+    def test_unknown_granularity(self):
+        with self.assertRaises(ValueError):
+            McpUpdater(FakeNacosHttpClient(server_count=0), index_granularity="sentence")
+
+
+if __name__ == '__main__':
+    unittest.main()
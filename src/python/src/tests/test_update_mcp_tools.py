@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+
+import httpx
+from mcp.types import Tool
+
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+from .mock_nacos_server import MockNacosServer
+
+_PUT = "PUT /nacos/v3/admin/ai/mcp"
+
+
+def _tools(*names: str) -> list[Tool]:
+    return [Tool(name=name, description=f"{name} tool", inputSchema={"type": "object", "properties": {}})
+            for name in names]
+
+
+class TestUpdateMcpTools(unittest.TestCase):
+    def setUp(self):
+        self.nacos = MockNacosServer()
+        self.nacos.add_server("file-server", "File management and operations server")
+        params = {"nacosAddr": "localhost:8848", "userName": "nacos", "password": "pass",
+                  "namespaceId": "", "ak": "", "sk": ""}
+        self.client = NacosHttpClient(params, transport=httpx.ASGITransport(app=self.nacos.app))
+
+    def _update(self, *tool_lists: list[Tool], version: str = "1.0.0") -> list[bool]:
+        async def run():
+            return await asyncio.gather(*[self.client.update_mcp_tools("file-server", tools, version, "")
+                                          for tools in tool_lists])
+        return asyncio.run(run())
+
+    def test_unchanged_tools_are_not_written_again(self):
+        self.assertEqual(self._update(_tools("write_file", "read_file")), [True])
+        self.assertEqual(self.nacos.request_counts[_PUT], 1)
+        # the tools are stored in the order of the server
+        self.assertEqual([t["name"] for t in self.nacos.servers["file-server"]["toolSpec"]["tools"]],
+                         ["write_file", "read_file"])
+
+        # the order of the tools doesn't matter
+        self.assertEqual(self._update(_tools("read_file", "write_file")), [True])
+        self.assertEqual(self.nacos.request_counts[_PUT], 1)
+
+        self.assertEqual(self._update(_tools("read_file")), [True])
+        self.assertEqual(self.nacos.request_counts[_PUT], 2)
+
+    def test_new_version_is_written(self):
+        self._update(_tools("read_file"))
+        self._update(_tools("read_file"), version="1.1.0")
+        self.assertEqual(self.nacos.request_counts[_PUT], 2)
+        self.assertEqual(self.nacos.servers["file-server"]["version"], "1.1.0")
+
+    def test_concurrent_updates_are_coalesced(self):
+        self.assertEqual(self._update(*[_tools("read_file")] * 5), [True] * 5)
+        self.assertEqual(self.nacos.request_counts[_PUT], 1)
+        self.assertEqual(self.nacos.request_counts["GET /nacos/v3/admin/ai/mcp"], 1)
+
+    def test_concurrent_update_with_other_tools_runs_after(self):
+        self._update(_tools("read_file"), _tools("read_file", "write_file"))
+        self.assertEqual(self.nacos.request_counts[_PUT], 2)
+        self.assertEqual([t["name"] for t in self.nacos.servers["file-server"]["toolSpec"]["tools"]],
+                         ["read_file", "write_file"])
+
+
+if __name__ == '__main__':
+    unittest.main()
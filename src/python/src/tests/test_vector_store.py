@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import unittest
+
+from ..nacos_mcp_router.vector_store import AsyncVectorStore
+
+
+class SingleQueryVectorDb:
+    """Has no `query_batch`, returns fixed ids and distances for one query at a time."""
+    def __init__(self, ids: list[str], distances: list[float]) -> None:
+        self.ids = ids
+        self.distances = distances
+        self.queries = []
+
+    def query(self, query: str, count: int) -> dict:
+        self.queries.append((query, count))
+        return {"ids": [self.ids[:count]], "distances": [self.distances[:count]]}
+
+
+class BatchVectorDb:
+    """Returns the query text as id, records the batches and the threads they ran on."""
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.batches = []
+        self.threads = set()
+        self.ids = []
+
+    def query_batch(self, queries: list[str], count: int) -> dict:
+        self.threads.add(threading.get_ident())
+        self.batches.append((queries, count))
+        if self.fail:
+            raise RuntimeError("query failed")
+        return {"ids": [[f"{q}-{i}" for i in range(count)] for q in queries],
+                "distances": [[float(i) for i in range(count)] for _ in queries]}
+
+    def get_all_ids(self) -> list[str]:
+        self.threads.add(threading.get_ident())
+        return list(self.ids)
+
+    def update_data(self, ids: list[str], documents: list[str] | None = None) -> None:
+        self.ids.extend(ids)
+
+    def delete_data(self, ids: list[str]) -> None:
+        self.ids = [i for i in self.ids if i not in ids]
+
+
+class TestAsyncVectorStore(unittest.TestCase):
+    def test_concurrent_queries_are_batched(self):
+        db = BatchVectorDb()
+        store = AsyncVectorStore(db)
+
+        async def run():
+            return await asyncio.gather(store.query("a", 1), store.query("b", 3), store.query("c", 2))
+
+        a, b, c = asyncio.run(run())
+        self.assertEqual(db.batches, [(["a", "b", "c"], 3)])
+        self.assertEqual(a, {"ids": [["a-0"]], "distances": [[0.0]]})
+        self.assertEqual(b["ids"], [["b-0", "b-1", "b-2"]])
+        self.assertEqual(c["distances"], [[0.0, 1.0]])
+        self.assertEqual((store.batches, store.queries), (1, 3))
+        self.assertNotIn(threading.get_ident(), db.threads)
+        store.close()
+
+    def test_batch_size_is_bounded(self):
+        db = BatchVectorDb()
+        store = AsyncVectorStore(db, max_batch_size=2)
+
+        async def run():
+            return await asyncio.gather(*(store.query(q, 1) for q in "abcde"))
+
+        results = asyncio.run(run())
+        self.assertEqual([r["ids"][0][0] for r in results], ["a-0", "b-0", "c-0", "d-0", "e-0"])
+        self.assertEqual([queries for queries, _ in db.batches], [["a", "b"], ["c", "d"], ["e"]])
+        store.close()
+
+    def test_store_without_batch_query(self):
+        db = SingleQueryVectorDb(["x", "y"], [0.1, 0.2])
+        store = AsyncVectorStore(db)
+
+        async def run():
+            return await asyncio.gather(store.query("a", 1), store.query("b", 2))
+
+        a, b = asyncio.run(run())
+        self.assertEqual(a, {"ids": [["x"]], "distances": [[0.1]]})
+        self.assertEqual(b, {"ids": [["x", "y"]], "distances": [[0.1, 0.2]]})
+        self.assertEqual(db.queries, [("a", 2), ("b", 2)])
+        store.close()
+
+    def test_errors_reach_every_caller(self):
+        store = AsyncVectorStore(BatchVectorDb(fail=True))
+
+        async def run():
+            return await asyncio.gather(store.query("a", 1), store.query("b", 1), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        store.close()
+
+    def test_writes_run_on_the_pool(self):
+        db = BatchVectorDb()
+        store = AsyncVectorStore(db)
+
+        async def run():
+            await store.update_data(ids=["a", "b"], documents=["A", "B"])
+            await store.delete_data(ids=["a"])
+            return await store.get_all_ids()
+
+        self.assertEqual(asyncio.run(run()), ["b"])
+        self.assertNotIn(threading.get_ident(), db.threads)
+        store.close()
+        # the pool is created again after close
+        self.assertEqual(asyncio.run(store.get_all_ids()), ["b"])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()